@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark do classificador de atividades (parse + classificação).
+
+Compara o classificador antigo (BeautifulSoup/html.parser, get_text e seis
+select de badges por bloco) com o atual (lxml, uma passada por bloco e
+regex pré-compiladas), sobre as páginas salvas em fixtures/curso_*.html e
+páginas sintéticas do stub com milhares de atividades. Também confere se
+os dois produzem o mesmo resultado.
+
+    python benchmarks/bench_classificador.py --atividades 100 1000 5000
+"""
+import argparse
+import sys
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+RAIZ = Path(__file__).resolve().parent
+sys.path.insert(0, str(RAIZ.parent / "core"))
+
+import stub_moodle
+from atividades import Atividade, extrair_cmid, extrair_tipo, extrair_vencimento, resolver_url
+from classificador import KW_ENTREGUE, KW_PENDENTE, classificar_html
+
+SELETORES_BADGES = [".badge", ".badge-status", ".status", ".submissionstatus", ".label", ".activity-status"]
+
+
+# ===============================
+# 🐢 CLASSIFICADOR ANTIGO (referência)
+# ===============================
+
+def _safe_text(el):
+    return el.get_text(" ", strip=True).lower() if el is not None else ""
+
+def _has_any(text, keywords):
+    t = (text or "").lower()
+    return any(k.lower() in t for k in keywords)
+
+def classificar_legado(nome_materia, html, url_base=None):
+    """Cópia do classificador com BeautifulSoup, só com o resultado por atividade."""
+    soup = BeautifulSoup(html, "html.parser")
+    atividades = soup.select("li.activity, div.activity")
+    if not atividades:
+        atividades = soup.select(".activityinstance, .assign, .modtype_assign, .activityitem")
+    detalhe = []
+    for bloco in atividades:
+        texto = _safe_text(bloco)
+        badges = []
+        for sel in SELETORES_BADGES:
+            for b in bloco.select(sel):
+                t = _safe_text(b)
+                if t:
+                    badges.append(t)
+        texto_status = " ".join(filter(None, [texto] + badges)).lower()
+
+        situacao = "indefinido"
+        if _has_any(texto_status, KW_PENDENTE):
+            situacao = "pendente"
+        elif _has_any(texto_status, KW_ENTREGUE):
+            situacao = "entregue"
+        else:
+            cls_join = " ".join(bloco.get("class") or []).lower()
+            if _has_any(cls_join, ["notattempted", "submissionnotgraded", "overdue"]):
+                situacao = "pendente"
+            elif _has_any(cls_join, ["completed", "submissionstatussubmitted", "submitted"]):
+                situacao = "entregue"
+
+        nome = bloco.select_one(".instancename, .activityname, .aalink")
+        link = bloco.select_one("a[href]")
+        url = resolver_url(link["href"] if link is not None else None, url_base)
+        datas = [d.get_text(" ", strip=True) for d in bloco.select('[data-region="activity-dates"] div, .activity-dates div')]
+        detalhe.append(Atividade(
+            nome_materia,
+            extrair_cmid(bloco.get("id"), url, bloco.get("data-id")),
+            extrair_tipo(" ".join(bloco.get("class") or [])),
+            nome.get_text(" ", strip=True) if nome is not None else texto[:80],
+            extrair_vencimento(datas or [bloco.get_text(" ", strip=True)]),
+            situacao,
+            url,
+        ).como_dict())
+    return detalhe
+
+
+# ===============================
+# ⏱️ MEDIÇÃO
+# ===============================
+
+def paginas_de_teste(quantidades):
+    paginas = {p.name: p.read_text(encoding="utf-8") for p in sorted((RAIZ / "fixtures").glob("curso_*.html"))}
+    for n in quantidades:
+        paginas[f"sintetica_{n}"] = stub_moodle.gerar_pagina_curso(1, n)
+    return paginas
+
+def medir(funcao, html, repeticoes):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            funcao("bench", html, "https://moodle.exemplo/course/view.php?id=1")
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--atividades", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'página':>22} {'ativ.':>6} {'antigo (ms)':>12} {'atual (ms)':>11} {'ganho':>7}  iguais")
+    for nome, html in paginas_de_teste(args.atividades).items():
+        with redirect_stdout(StringIO()):
+            esperado = classificar_legado("bench", html)
+            obtido = classificar_html("bench", html)["detalhe_atividades"]
+        antigo = medir(classificar_legado, html, args.repeticoes)
+        atual = medir(classificar_html, html, args.repeticoes)
+        print(f"{nome:>22} {len(obtido):>6} {antigo * 1000:>12.1f} {atual * 1000:>11.1f} "
+              f"{antigo / atual:>6.1f}x  {'sim' if esperado == obtido else 'NÃO'}")
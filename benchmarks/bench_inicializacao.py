@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Tempo de inicialização do bot: do início do processo até a primeira
+requisição chegar ao Moodle falso, para cada motor.
+
+Cada medição é um processo Python novo (imports frios, como numa varredura
+agendada). A coluna "antes" repete a medição carregando primeiro os módulos
+que o bot_visual importava no topo (selenium, webdriver_manager, bs4), para
+comparar com o carregamento sob demanda atual.
+
+    python benchmarks/bench_inicializacao.py --repeticoes 5
+    python benchmarks/bench_inicializacao.py --driver    # resolução do chromedriver (precisa do Chrome)
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent
+CORE = RAIZ.parent / "core"
+sys.path.insert(0, str(CORE))
+
+import stub_moodle
+
+IMPORTS_LEGADOS = (
+    "import selenium.webdriver, selenium.webdriver.support.ui, selenium.webdriver.support.expected_conditions; "
+    "import webdriver_manager.chrome, bs4; "
+)
+
+# Roda só o motor (sem relatório nem armazém, para não mexer em logs/ e dados/)
+FILHO = """
+import sys, time
+sys.path.insert(0, {core!r})
+{legado}
+import bot_visual
+bot_visual.CONFIGURACOES["materias"] = {materias!r}
+bot_visual.MOTORES[{motor!r}](None)
+print("selenium" in sys.modules)
+"""
+
+
+def medir(url_login, materias, motor, legado, estado):
+    env = dict(os.environ, MOODLE_URL=url_login, MOODLE_USER="bench", MOODLE_PASS="bench",
+               MOODLE_CACHE_SESSAO="0", MOODLE_WS_TOKEN="", PYTHONDONTWRITEBYTECODE="1")
+    codigo = FILHO.format(core=str(CORE), legado=IMPORTS_LEGADOS if legado else "", materias=materias, motor=motor)
+    estado.primeira_requisicao = None
+    inicio = time.time()
+    saida = subprocess.run([sys.executable, "-c", codigo], env=env, capture_output=True, text=True, check=True).stdout
+    total = time.time() - inicio
+    return estado.primeira_requisicao - inicio, total, saida.strip().splitlines()[-1] == "True"
+
+def medir_driver():
+    """Resolução do chromedriver em processos novos: sem manifesto (rede) e com manifesto."""
+    codigo = (f"import sys, time; sys.path.insert(0, {str(CORE)!r}); t = time.perf_counter(); "
+              f"from driver_chrome import resolver_chromedriver; c = resolver_chromedriver(sys.argv[1]); "
+              f"print(time.perf_counter() - t, c)")
+    with tempfile.TemporaryDirectory() as pasta:
+        for rotulo in ("sem manifesto", "com manifesto"):
+            tempo, caminho = subprocess.run([sys.executable, "-c", codigo, pasta], capture_output=True,
+                                            text=True, check=True).stdout.split()[-2:]
+            print(f"   {rotulo:<14}: {float(tempo) * 1000:8.1f} ms  ({caminho})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--motores", nargs="+", default=["http", "async", "ws"])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--driver", action="store_true", help="mede também a resolução do chromedriver")
+    args = parser.parse_args()
+
+    servidor = stub_moodle.iniciar_em_thread()
+    estado = servidor.RequestHandlerClass.estado
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    url_login = f"{base}/login/index.php"
+    materias = {f"Curso{i}": f"{base}/course/view.php?id={i}" for i in range(1, 4)}
+
+    print(f"{'motor':>6} {'1ª req. antes':>14} {'1ª req. agora':>14} {'total agora':>12}  selenium carregado")
+    for motor in args.motores:
+        antes = [medir(url_login, materias, motor, True, estado)[0] for _ in range(args.repeticoes)]
+        agora = [medir(url_login, materias, motor, False, estado) for _ in range(args.repeticoes)]
+        print(f"{motor:>6} {statistics.median(antes) * 1000:>11.0f} ms "
+              f"{statistics.median(a[0] for a in agora) * 1000:>11.0f} ms "
+              f"{statistics.median(a[1] for a in agora) * 1000:>9.0f} ms  {'sim' if agora[0][2] else 'não'}")
+
+    if args.driver:
+        print("\n🚗 chromedriver")
+        medir_driver()
+    servidor.shutdown()
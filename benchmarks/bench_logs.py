@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da leitura do histórico de relatórios .txt.
+
+Gera históricos sintéticos (30 matérias por relatório) e compara:
+  - legado : loader original do dashboard (regex por linha + lista de dicts)
+  - lote   : ingestao.historico_de_relatorios (regex multilinha por arquivo,
+             colunas montadas de uma vez, categorias desde o início)
+  - banco  : importação completa para o armazém SQLite (armazem.importar_logs)
+  - segmentos: a mesma importação com o histórico compactado em segmentos
+             mensais (core/compactacao.py), sem um .txt por execução
+
+    python benchmarks/bench_logs.py --linhas 10000 100000 1000000
+"""
+import argparse
+import gc
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ / "core"))
+sys.path.insert(0, str(RAIZ / "dashboard"))
+
+import armazem
+import compactacao
+from ingestao import STATUS_ORDER, historico_de_relatorios
+
+MATERIAS_POR_RELATORIO = 30
+
+
+def gerar_historico(pasta, linhas):
+    """Escreve relatórios de 15 em 15 minutos até somar `linhas` linhas de status."""
+    inicio = datetime(2025, 1, 1)
+    icones = ["❌", "✅", "🔍"]
+    for n in range(max(1, linhas // MATERIAS_POR_RELATORIO)):
+        datahora = inicio + timedelta(minutes=15 * n)
+        corpo = [f"RELATÓRIO MOODLE BOT - {datahora:%d/%m/%Y %H:%M:%S}", "=" * 60]
+        for m in range(MATERIAS_POR_RELATORIO):
+            icone = icones[(n + m) % 3]
+            corpo.append(f"{icone} Materia{m:02d} - {(n * m) % 7} pendência(s) detectada(s) em 12 atividade(s) visível(is)")
+        (pasta / f"relatorio_{datahora:%Y%m%d_%H%M%S}.txt").write_text("\n".join(corpo) + "\n", encoding="utf-8")
+
+
+def carregar_legado(pasta):
+    """Cópia do loader original de dashboard/app.py (sem Streamlit)."""
+    historico = []
+    filename_pattern = re.compile(
+        r"(?:log_|relatorio_)?(\d{4})[-_]?(\d{2})[-_]?(\d{2})[-_]?(\d{2})(\d{2})(\d{2})\.txt"
+    )
+    line_pattern = re.compile(r"^(?P<icon>❌|✅|🔍)\s*(?P<materia>.+?)(?:\s*-\s*(?P<detalhes>.+))?$")
+    for filepath in pasta.glob("*.txt"):
+        match = filename_pattern.match(filepath.name)
+        if not match:
+            continue
+        timestamp = datetime(*(int(g) for g in match.groups()))
+        with open(filepath, "r", encoding="utf-8") as f:
+            for linha in f:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                line_match = line_pattern.match(linha)
+                if line_match:
+                    historico.append({
+                        "DataHora": timestamp,
+                        "Matéria": line_match.group("materia").strip(),
+                        "Status": armazem.ICONES_STATUS.get(line_match.group("icon"), "Desconhecido"),
+                        "Detalhes": (line_match.group("detalhes") or "").strip(),
+                    })
+    df = pd.DataFrame(historico)
+    df["Status"] = pd.Categorical(df["Status"], categories=STATUS_ORDER, ordered=True)
+    return df.sort_values("DataHora", ascending=False)
+
+def carregar_lote(pasta):
+    return historico_de_relatorios(sorted(str(p) for p in pasta.glob("*.txt")))
+
+def importar_banco(pasta):
+    banco = pasta.parent / f"bench_{time.perf_counter_ns()}.db"
+    con = armazem.conectar(str(banco))
+    try:
+        armazem.importar_logs(con, pasta)
+    finally:
+        con.close()
+        for sufixo in ("", "-wal", "-shm"):
+            Path(f"{banco}{sufixo}").unlink(missing_ok=True)
+
+
+def medir(funcao, pasta):
+    """(segundos, pico de memória em MB). O pico vem de uma segunda execução com tracemalloc."""
+    gc.collect()
+    inicio = time.perf_counter()
+    funcao(pasta)
+    segundos = time.perf_counter() - inicio
+
+    gc.collect()
+    tracemalloc.start()
+    funcao(pasta)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / 1024 / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--linhas", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--sem-banco", action="store_true", help="pula a importação para o SQLite")
+    args = parser.parse_args()
+
+    estrategias = {"legado": carregar_legado, "lote": carregar_lote}
+    if not args.sem_banco:
+        estrategias["banco"] = importar_banco
+        estrategias["segmentos"] = importar_banco
+
+    print(f"{'linhas':>10} {'estratégia':>10} {'tempo (s)':>10} {'pico (MB)':>10} {'ganho':>7}")
+    for linhas in args.linhas:
+        temporario = Path(tempfile.mkdtemp(prefix="bench_logs_"))
+        pasta = temporario / "logs"
+        pasta.mkdir()
+        try:
+            gerar_historico(pasta, linhas)
+            referencia = None
+            for nome, funcao in estrategias.items():
+                if nome == "segmentos":
+                    # Última estratégia: compacta a própria pasta (todos os relatórios)
+                    compactacao.compactar(pasta, manter_dias=0)
+                segundos, pico = medir(funcao, pasta)
+                referencia = referencia or segundos
+                print(f"{linhas:>10} {nome:>10} {segundos:>10.3f} {pico:>10.1f} {referencia / segundos:>6.1f}x")
+        finally:
+            shutil.rmtree(temporario, ignore_errors=True)
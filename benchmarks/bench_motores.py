@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Compara o motor HTTP (threads) com o motor async contra o Moodle falso.
+
+    python benchmarks/bench_motores.py --cursos 200 --latencia 0.15 --concorrencia 20
+"""
+import argparse
+import asyncio
+import sys
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import stub_moodle
+from motor_async import executar_varredura_async
+from motor_http import SessaoMoodleHTTP, verificar_materias_http
+
+
+def medir_http(url_login, materias, concorrencia):
+    sessao = SessaoMoodleHTTP(url_login, tamanho_pool=concorrencia)
+    inicio = time.perf_counter()
+    sessao.login("bench", "bench")
+    verificar_materias_http(sessao, materias, concorrencia)
+    sessao.fechar()
+    return time.perf_counter() - inicio
+
+def medir_async(url_login, materias, concorrencia, taxa):
+    inicio = time.perf_counter()
+    asyncio.run(executar_varredura_async(url_login, "bench", "bench", materias, concorrencia, taxa))
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cursos", type=int, default=100)
+    parser.add_argument("--latencia", type=float, default=0.1)
+    parser.add_argument("--atividades", type=int, default=30)
+    parser.add_argument("--concorrencia", type=int, default=20)
+    parser.add_argument("--taxa", type=float, default=0, help="req/s por host no motor async (0 = sem limite)")
+    args = parser.parse_args()
+
+    servidor = stub_moodle.iniciar_em_thread(latencia=args.latencia, atividades=args.atividades)
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    url_login = f"{base}/login/index.php"
+    materias = {f"Curso{i}": f"{base}/course/view.php?id={i}" for i in range(1, args.cursos + 1)}
+
+    with redirect_stdout(StringIO()):
+        t_http = medir_http(url_login, materias, args.concorrencia)
+        t_async = medir_async(url_login, materias, args.concorrencia, args.taxa)
+
+    print(f"📊 {args.cursos} cursos, latência {args.latencia}s, concorrência {args.concorrencia}")
+    print(f"   http  : {t_http:7.2f}s  ({args.cursos / t_http:6.1f} cursos/s)")
+    print(f"   async : {t_async:7.2f}s  ({args.cursos / t_async:6.1f} cursos/s)")
+    servidor.shutdown()
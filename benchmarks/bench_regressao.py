@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+Suíte de desempenho e regressão contra o Moodle falso (stub_moodle.py).
+
+Cada cenário roda num processo novo (imports frios e pico de memória
+isolado) e é repetido `--repeticoes` vezes; vale a mediana de cada métrica.
+
+  http       login, download, parse, classificação e gravação do relatório
+             por etapa, e a vazão do motor HTTP de ponta a ponta
+  async      vazão do motor async de ponta a ponta
+  capturas   custo do screenshot no caminho crítico (enfileirar) e em segundo
+             plano (reduzir, dHash, WebP)
+  selenium   carregamento, rolagem, classificação e screenshot no Chrome
+             (só com --selenium; precisa do Chrome instalado)
+  dashboard  carga do histórico do painel (IngestorHistorico, o mesmo de
+             carregar_historico_logs): fria, com snapshot e incremental
+
+As páginas são as sintéticas do stub, geradas igual em qualquer máquina;
+--fixtures usa páginas gravadas (gravar_fixtures.py), e o resultado só se
+compara com outro medido com elas.
+
+Tempos absolutos só valem na máquina em que foram medidos: cada rodada
+grava sua saída em benchmarks/resultados/ (fora do git), e o baseline é
+uma dessas saídas, da mesma máquina e com os mesmos parâmetros. Latência e
+memória que piorarem mais que a tolerância (ou vazão que cair mais que
+ela) contam como regressão, e o script sai com código 1.
+
+    python benchmarks/bench_regressao.py --gravar-baseline  # antes da mudança
+    python benchmarks/bench_regressao.py                    # depois: compara com o baseline
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent
+sys.path.insert(0, str(RAIZ.parent / "core"))
+sys.path.insert(0, str(RAIZ.parent / "dashboard"))
+sys.path.insert(0, str(RAIZ))
+
+import stub_moodle
+
+PASTA_RESULTADOS = RAIZ / "resultados"
+ARQUIVO_BASELINE = PASTA_RESULTADOS / "baseline.json"
+# Folga absoluta por unidade, para métricas pequenas não oscilarem por ruído
+FOLGAS = {"_ms": 2.0, "_mb": 10.0, "_por_s": 0.0}
+
+
+def pico_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024, 1)
+
+def _p(valores, fracao):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(fracao * (len(ordenados) - 1))))]
+
+def _ms(segundos):
+    return round(segundos * 1000, 2)
+
+def _distribuicao(prefixo, duracoes):
+    return {f"{prefixo}_p50_ms": _ms(_p(duracoes, 0.5)), f"{prefixo}_p95_ms": _ms(_p(duracoes, 0.95))}
+
+def descrever_maquina():
+    """O que precisa ser igual para dois resultados serem comparáveis."""
+    return {
+        "sistema": platform.platform(), "processador": platform.processor() or platform.machine(),
+        "nucleos": os.cpu_count(), "python": platform.python_version(),
+    }
+
+
+# ===============================
+# 🧪 CENÁRIOS (cada um roda num processo próprio)
+# ===============================
+
+def cenario_http(cfg):
+    from bot_visual import gerar_relatorio
+    from classificador import classificar_documento, ler_documento
+    from motor_http import SessaoMoodleHTTP, verificar_materias_http
+
+    metricas = {}
+    sessao = SessaoMoodleHTTP(cfg["url_login"], tamanho_pool=cfg["concorrencia"])
+    inicio = time.perf_counter()
+    sessao.login("bench", "bench")
+    metricas["login_ms"] = _ms(time.perf_counter() - inicio)
+
+    def baixar(url):
+        inicio = time.perf_counter()
+        html = sessao.obter_html(url)
+        return html, time.perf_counter() - inicio
+    with ThreadPoolExecutor(max_workers=cfg["concorrencia"]) as executor:
+        paginas = dict(zip(cfg["materias"], executor.map(baixar, cfg["materias"].values())))
+    metricas.update(_distribuicao("download", [d for _, d in paginas.values()]))
+
+    leituras, classificacoes, resultados = [], [], {}
+    for nome, (html, _) in paginas.items():
+        inicio = time.perf_counter()
+        raiz = ler_documento(html)
+        meio = time.perf_counter()
+        resultados[nome] = classificar_documento(nome, raiz, cfg["materias"][nome])
+        leituras.append(meio - inicio)
+        classificacoes.append(time.perf_counter() - meio)
+    metricas.update(_distribuicao("parse", leituras))
+    metricas.update(_distribuicao("classificacao", classificacoes))
+    sessao.fechar()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        inicio = time.perf_counter()
+        gerar_relatorio("http", resultados, pasta, os.path.join(pasta, "bench.db"))
+        metricas["relatorio_ms"] = _ms(time.perf_counter() - inicio)
+
+    # Ponta a ponta: sessão nova, login e todas as matérias
+    inicio = time.perf_counter()
+    sessao = SessaoMoodleHTTP(cfg["url_login"], tamanho_pool=cfg["concorrencia"])
+    sessao.login("bench", "bench")
+    verificar_materias_http(sessao, cfg["materias"], cfg["concorrencia"])
+    duracao = time.perf_counter() - inicio
+    sessao.fechar()
+    metricas["total_ms"] = _ms(duracao)
+    metricas["vazao_cursos_por_s"] = round(len(cfg["materias"]) / duracao, 2)
+    return metricas
+
+def cenario_async(cfg):
+    import asyncio
+    from motor_async import executar_varredura_async
+
+    inicio = time.perf_counter()
+    asyncio.run(executar_varredura_async(cfg["url_login"], "bench", "bench", cfg["materias"],
+                                         concorrencia=cfg["concorrencia"], taxa_por_host=0))
+    duracao = time.perf_counter() - inicio
+    return {"total_ms": _ms(duracao), "vazao_cursos_por_s": round(len(cfg["materias"]) / duracao, 2)}
+
+def cenario_capturas(cfg):
+    import random
+    from PIL import Image
+    from capturas import GravadorCapturas
+
+    class DriverFalso:
+        def __init__(self, png):
+            self.png = png
+
+        def get_screenshot_as_png(self):
+            return self.png
+
+    def tela(semente):
+        rnd = random.Random(semente)
+        imagem = Image.new("RGB", (32, 18))
+        imagem.putdata([(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(32 * 18)])
+        saida = io.BytesIO()
+        imagem.resize((1920, 1080)).save(saida, "PNG")
+        return saida.getvalue()
+
+    telas = [tela(i) for i in range(cfg["capturas"])]
+    enfileirar, processar = [], []
+    with tempfile.TemporaryDirectory() as pasta:
+        gravador = GravadorCapturas(pasta, modo="sempre", max_por_materia=cfg["capturas"])
+        for i, png in enumerate(telas):
+            inicio = time.perf_counter()
+            gravador.capturar(DriverFalso(png), "Bench")
+            enfileirar.append(time.perf_counter() - inicio)
+            gravador.fila.join()
+            processar.append(time.perf_counter() - inicio)
+        gravador.fechar()
+    return {**_distribuicao("enfileirar", enfileirar), **_distribuicao("segundo_plano", processar)}
+
+def cenario_selenium(cfg):
+    os.environ.update(MOODLE_URL=cfg["url_login"], MOODLE_USER="bench", MOODLE_PASS="bench",
+                      MOODLE_CACHE_SESSAO="0", MOODLE_CAPTURAS="sempre")
+    import bot_visual
+
+    materias = dict(list(cfg["materias"].items())[:cfg["selenium_cursos"]])
+    tempos = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        bot_visual.CONFIGURACOES["moodle"]["url_login"] = cfg["url_login"]
+        bot_visual.obter_caminho_completo = lambda nome_pasta, nome_arquivo="": os.path.join(pasta, nome_pasta, nome_arquivo)
+        inicio = time.perf_counter()
+        sessoes = bot_visual.criar_pool_sessoes(1)
+        tempos["login"] = [time.perf_counter() - inicio]
+        try:
+            for nome, url in materias.items():
+                status = bot_visual.verificar_materia(sessoes[0][0], nome, url)
+                for etapa, duracao in status["tempos"].items():
+                    tempos.setdefault(etapa, []).append(duracao)
+        finally:
+            bot_visual.encerrar_pool_sessoes(sessoes)
+            bot_visual.encerrar_capturas()
+    metricas = {"login_ms": _ms(tempos.pop("login")[0])}
+    for etapa, duracoes in tempos.items():
+        metricas.update(_distribuicao(etapa, duracoes))
+    return metricas
+
+def cenario_dashboard(cfg):
+    from bench_logs import gerar_historico
+    from ingestao import IngestorHistorico
+
+    metricas = {}
+    with tempfile.TemporaryDirectory() as pasta:
+        pasta = Path(pasta)
+        logs = pasta / "logs"
+        logs.mkdir()
+        gerar_historico(logs, cfg["linhas_historico"])
+
+        def carregar():
+            # O mesmo caminho de carregar_historico_logs/obter_ingestor, sem Streamlit
+            ingestor = IngestorHistorico(pasta / "dados" / "bench.db", logs, pasta / "cache")
+            ingestor.atualizar()
+            ingestor.historico()
+            ingestor.rollup("diario")
+            return ingestor
+
+        inicio = time.perf_counter()
+        ingestor = carregar()
+        duracao = time.perf_counter() - inicio
+        metricas["frio_ms"] = _ms(duracao)
+        metricas["vazao_linhas_por_s"] = round(len(ingestor.historico()) / duracao)
+
+        inicio = time.perf_counter()
+        carregar()
+        metricas["snapshot_ms"] = _ms(time.perf_counter() - inicio)
+
+        (logs / "relatorio_20990101_000000.txt").write_text(
+            "RELATÓRIO MOODLE BOT - 01/01/2099 00:00:00\n" + "=" * 60 + "\n❌ Nova - 1 pendência(s)\n",
+            encoding="utf-8",
+        )
+        inicio = time.perf_counter()
+        ingestor.atualizar()
+        ingestor.historico()
+        metricas["incremental_ms"] = _ms(time.perf_counter() - inicio)
+    return metricas
+
+CENARIOS = {
+    "http": cenario_http,
+    "async": cenario_async,
+    "capturas": cenario_capturas,
+    "selenium": cenario_selenium,
+    "dashboard": cenario_dashboard,
+}
+
+
+def _executar_no_filho(nome, cfg, fila):
+    # Silencia os prints do bot no processo do cenário e nos que ele criar (pool de parse do async)
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    try:
+        metricas = CENARIOS[nome](cfg)
+        metricas["rss_pico_mb"] = pico_rss_mb()
+        fila.put(("ok", {k: v for k, v in metricas.items() if v is not None}))
+    except Exception as e:
+        fila.put(("erro", f"{e.__class__.__name__}: {e}"))
+
+def executar_cenario(nome, cfg, repeticoes):
+    """Mediana de cada métrica em `repeticoes` processos novos."""
+    contexto = multiprocessing.get_context("spawn")
+    rodadas = []
+    for _ in range(repeticoes):
+        fila = contexto.Queue()
+        processo = contexto.Process(target=_executar_no_filho, args=(nome, cfg, fila))
+        processo.start()
+        situacao, dados = fila.get()
+        processo.join()
+        if situacao == "erro":
+            raise RuntimeError(dados)
+        rodadas.append(dados)
+    return {chave: statistics.median(r[chave] for r in rodadas) for chave in rodadas[0]}
+
+
+# ===============================
+# 📏 COMPARAÇÃO COM O BASELINE
+# ===============================
+
+def comparar(metricas, baseline, tolerancia):
+    """Lista de (métrica, antes, agora, variação, situação); situação em {'ok', 'regressao', 'melhora', 'nova'}."""
+    linhas = []
+    for chave, atual in sorted(metricas.items()):
+        anterior = baseline.get(chave)
+        if anterior is None:
+            linhas.append((chave, None, atual, None, "nova"))
+            continue
+        sufixo = next((s for s in FOLGAS if chave.endswith(s)), "_ms")
+        variacao = (atual - anterior) / anterior if anterior else 0.0
+        if sufixo == "_por_s":
+            pior = atual < anterior * (1 - tolerancia)
+            melhor = atual > anterior * (1 + tolerancia)
+        else:
+            pior = atual > anterior * (1 + tolerancia) + FOLGAS[sufixo]
+            melhor = atual < anterior * (1 - tolerancia) - FOLGAS[sufixo]
+        linhas.append((chave, anterior, atual, variacao, "regressao" if pior else "melhora" if melhor else "ok"))
+    return linhas
+
+def imprimir(linhas):
+    simbolos = {"ok": "✅", "regressao": "❌", "melhora": "🚀", "nova": "🆕"}
+    print(f"\n{'métrica':<40} {'baseline':>12} {'atual':>12} {'variação':>9}")
+    for chave, anterior, atual, variacao, situacao in linhas:
+        antes = f"{anterior:>12.2f}" if anterior is not None else f"{'—':>12}"
+        delta = f"{variacao:>+8.0%}" if variacao is not None else f"{'':>8}"
+        print(f"{chave:<40} {antes} {atual:>12.2f} {delta}  {simbolos[situacao]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de regressão contra o Moodle falso")
+    parser.add_argument("--cenarios", nargs="+", choices=sorted(CENARIOS), default=["http", "async", "capturas", "dashboard"])
+    parser.add_argument("--selenium", action="store_true", help="inclui o cenário selenium (precisa do Chrome)")
+    parser.add_argument("--cursos", type=int, default=40)
+    parser.add_argument("--atividades", type=int, default=60, help="atividades por página (tamanho da página)")
+    parser.add_argument("--latencia", type=float, default=0.02, help="atraso do stub por requisição, em segundos")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--linhas-historico", type=int, default=100_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="piora relativa aceita (0.25 = 25%%)")
+    parser.add_argument("--fixtures", type=Path, default=None,
+                        help="pasta com páginas gravadas (padrão: páginas sintéticas do stub)")
+    parser.add_argument("--baseline", type=Path, default=ARQUIVO_BASELINE,
+                        help="resultado de referência (o baseline local ou qualquer saída em resultados/)")
+    parser.add_argument("--gravar-baseline", action="store_true")
+    args = parser.parse_args()
+
+    cenarios = list(args.cenarios) + (["selenium"] if args.selenium and "selenium" not in args.cenarios else [])
+    servidor = stub_moodle.iniciar_em_thread(latencia=args.latencia, atividades=args.atividades, fixtures=args.fixtures)
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    parametros = {
+        "cursos": args.cursos, "atividades": args.atividades, "latencia": args.latencia,
+        "concorrencia": args.concorrencia, "linhas_historico": args.linhas_historico,
+        "paginas": "gravadas" if args.fixtures else "sinteticas",
+    }
+    cfg = dict(parametros, url_login=f"{base}/login/index.php", capturas=10, selenium_cursos=5,
+               materias={f"Curso{i}": f"{base}/course/view.php?id={i}" for i in range(1, args.cursos + 1)})
+
+    metricas, falhas = {}, []
+    for nome in cenarios:
+        print(f"⏱️ {nome}...", flush=True)
+        try:
+            for chave, valor in executar_cenario(nome, cfg, args.repeticoes).items():
+                metricas[f"{nome}.{chave}"] = valor
+        except RuntimeError as e:
+            print(f"❌ Cenário {nome} falhou: {e}")
+            falhas.append(nome)
+    servidor.shutdown()
+    if falhas:
+        sys.exit(f"\n❌ Cenário(s) com falha: {', '.join(falhas)}")
+
+    # Toda rodada fica registrada; o baseline é só uma delas
+    resultado = {"parametros": parametros, "maquina": descrever_maquina(), "metricas": metricas}
+    PASTA_RESULTADOS.mkdir(exist_ok=True)
+    saida = PASTA_RESULTADOS / f"regressao_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    saida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"💾 Resultado em {saida}")
+
+    if args.gravar_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+        imprimir(comparar(metricas, {}, args.tolerancia))
+        print(f"\n💾 Baseline desta máquina gravado em {args.baseline}")
+        sys.exit(0)
+
+    if not args.baseline.exists():
+        imprimir(comparar(metricas, {}, args.tolerancia))
+        sys.exit(f"\n⚠️ Sem baseline em {args.baseline}; rode com --gravar-baseline antes da mudança.")
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline["parametros"] != parametros:
+        sys.exit(f"⚠️ Parâmetros diferentes dos do baseline ({baseline['parametros']}); as medições não são comparáveis.")
+    if baseline.get("maquina") != resultado["maquina"]:
+        sys.exit(f"⚠️ Baseline medido em outra máquina ({baseline.get('maquina')}); grave um nesta com --gravar-baseline.")
+
+    linhas = comparar(metricas, baseline["metricas"], args.tolerancia)
+    imprimir(linhas)
+    regressoes = [l[0] for l in linhas if l[4] == "regressao"]
+    if regressoes:
+        print(f"\n❌ {len(regressoes)} regressão(ões) acima de {args.tolerancia:.0%}: {', '.join(regressoes)}")
+        sys.exit(1)
+    print(f"\n✅ Nenhuma regressão acima de {args.tolerancia:.0%}.")
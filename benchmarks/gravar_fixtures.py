@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Grava páginas reais do Moodle em benchmarks/fixtures/ para o stub servir:
+login.html (o formulário de login) e curso_<id>.html para cada matéria de
+CONFIGURACOES. Usa as credenciais do .env e o motor HTTP.
+
+Os endereços absolutos do Moodle viram relativos, para que o bot rodando
+contra o stub nunca saia do 127.0.0.1. As páginas trazem nomes e dados da
+conta usada: a pasta fixtures/ fica fora do git.
+
+    python benchmarks/gravar_fixtures.py
+"""
+import os
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent
+sys.path.insert(0, str(RAIZ.parent / "core"))
+
+from bot_visual import CONFIGURACOES
+from cache_sessao import url_base_moodle
+from motor_http import SessaoMoodleHTTP
+from motor_ws import id_do_curso
+from stub_moodle import FIXTURES_DIR, LOGIN_GRAVADO
+
+
+def relativizar(html, url_base):
+    """'https://x/moodle/course/view.php' -> '/course/view.php' (o stub responde na raiz)."""
+    return html.replace(url_base + "/", "/").replace(url_base.replace("/", "\\/") + "\\/", "\\/")
+
+
+if __name__ == "__main__":
+    url_login = CONFIGURACOES["moodle"]["url_login"]
+    url_base = url_base_moodle(url_login)
+    FIXTURES_DIR.mkdir(exist_ok=True)
+
+    sessao = SessaoMoodleHTTP(url_login)
+    LOGIN_GRAVADO.write_text(relativizar(sessao.session.get(url_login, timeout=sessao.timeout).text, url_base),
+                             encoding="utf-8")
+    print(f"💾 {LOGIN_GRAVADO}")
+
+    if not sessao.login(os.getenv("MOODLE_USER"), os.getenv("MOODLE_PASS")):
+        sys.exit("❌ Falha no login.")
+    for nome, url in CONFIGURACOES["materias"].items():
+        destino = FIXTURES_DIR / f"curso_{id_do_curso(url)}.html"
+        destino.write_text(relativizar(sessao.obter_html(url), url_base), encoding="utf-8")
+        print(f"💾 {nome} -> {destino}")
+    sessao.fechar()
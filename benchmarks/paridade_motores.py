@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Confere que os motores http, async e ws chegam ao mesmo resultado contra o
+Moodle falso: mesma quantidade de pendentes e entregues por curso e a mesma
+situação em cada atividade. Também roda o caminho do `bot_visual.py
+--engine=ws` (com e sem --retomar): os cursos fora da configuração têm de
+ser descobertos pela API. Sai com código 1 se algo divergir.
+
+    python benchmarks/paridade_motores.py --cursos 5 --atividades 30
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "core"))
+
+import bot_visual
+import stub_moodle
+from motor_async import executar_varredura_async
+from motor_http import SessaoMoodleHTTP, verificar_materias_http
+from motor_ws import ClienteMoodleWS, varrer_cursos_ws
+from resiliencia import Checkpoint
+
+
+def rodar_http(url_login, materias):
+    sessao = SessaoMoodleHTTP(url_login)
+    sessao.login("bench", "bench")
+    resultados = verificar_materias_http(sessao, materias, 4)
+    sessao.fechar()
+    return resultados
+
+def rodar_async(url_login, materias):
+    return asyncio.run(executar_varredura_async(url_login, "bench", "bench", materias, 4))
+
+def rodar_ws(base, nomes_por_id):
+    cliente = ClienteMoodleWS(base)
+    cliente.obter_token("bench", "bench")
+    return varrer_cursos_ws(cliente, nomes_por_id)
+
+def conferir_execucao_ws(url_login, cursos):
+    """
+    Caminho do __main__ do bot_visual no motor ws, com só o primeiro curso
+    configurado: a execução normal descobre todos; a retomada depois de um
+    relatório com erro consulta só o curso que falhou. Retorna os problemas.
+    """
+    os.environ.update(MOODLE_USER="bench", MOODLE_PASS="bench")
+    bot_visual.CONFIGURACOES["moodle"]["url_login"] = url_login
+    bot_visual.CONFIGURACOES["materias"] = {"C1": url_login.replace("login/index.php", "course/view.php?id=1")}
+    checkpoint = Checkpoint(tempfile.mkdtemp())
+    problemas = []
+
+    bot_visual.status_materias.clear()
+    materias = bot_visual.materias_da_execucao("ws", checkpoint)
+    bot_visual.executar_ws(None, materias, checkpoint.registrar)
+    if len(bot_visual.status_materias) != cursos:
+        problemas.append(f"execução ws trouxe {sorted(bot_visual.status_materias)} (esperado: {cursos} cursos)")
+
+    falhou = next(nome for nome in bot_visual.status_materias if nome != "C1")
+    checkpoint.registrar(falhou, {"trabalho_encontrado": False, "pendente": False, "observacao": "Erro (teste)"})
+    checkpoint.registrar_relatorio()
+    bot_visual.status_materias.clear()
+    materias = bot_visual.materias_da_execucao("ws", checkpoint, retomar=True)
+    bot_visual.executar_ws(None, materias, checkpoint.registrar)
+    if sorted(bot_visual.status_materias) != [falhou]:
+        problemas.append(f"--retomar no ws trouxe {sorted(bot_visual.status_materias)} (esperado: só {falhou})")
+    return problemas
+
+def resumo(status):
+    """(pendentes, entregues, {id da atividade: situação}) de um curso."""
+    situacoes = {a["cmid"]: a["status"] for a in status.get("detalhe_atividades", [])}
+    return status.get("pendentes", 0), status.get("entregues", 0), situacoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara o resultado dos motores contra o Moodle falso")
+    parser.add_argument("--cursos", type=int, default=5)
+    parser.add_argument("--atividades", type=int, default=30)
+    args = parser.parse_args()
+
+    servidor = stub_moodle.iniciar_em_thread(atividades=args.atividades, cursos=args.cursos)
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+    url_login = f"{base}/login/index.php"
+    nomes_por_id = {i: f"C{i}" for i in range(1, args.cursos + 1)}
+    materias = {nome: f"{base}/course/view.php?id={i}" for i, nome in nomes_por_id.items()}
+
+    with redirect_stdout(StringIO()):
+        por_motor = {
+            "http": rodar_http(url_login, materias),
+            "async": rodar_async(url_login, materias),
+            "ws": rodar_ws(base, nomes_por_id),
+        }
+        problemas = conferir_execucao_ws(url_login, args.cursos)
+    servidor.shutdown()
+
+    divergencias = 0
+    for nome in materias:
+        referencia = resumo(por_motor["http"].get(nome, {}))
+        for motor, resultados in por_motor.items():
+            pendentes, entregues, situacoes = resumo(resultados.get(nome, {}))
+            print(f"   {nome:<4} {motor:<6} {pendentes:3d} pendente(s)  {entregues:3d} entregue(s)")
+            if (pendentes, entregues, situacoes) != referencia:
+                divergencias += 1
+                diferentes = sorted(i for i in situacoes.keys() | referencia[2].keys()
+                                    if situacoes.get(i) != referencia[2].get(i))
+                print(f"❌ {nome}: {motor} diverge do http nas atividades {diferentes[:10]}")
+
+    for problema in problemas:
+        print(f"❌ {problema}")
+    if divergencias or problemas:
+        sys.exit(1)
+    print(f"✅ Os {len(por_motor)} motores concordam em {len(materias)} curso(s), "
+          f"e o bot_visual no motor ws descobre os cursos e retoma só o que falhou.")
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor Moodle falso para testar e medir os motores do bot sem tocar no
+Moodle da instituição.
+
+Serve o formulário de login (com logintoken), cria o cookie MoodleSession e
+entrega páginas de curso geradas com N atividades sintéticas (as mesmas em
+qualquer máquina). Com uma pasta de fixtures (padrão na linha de comando:
+benchmarks/fixtures/, gravada com benchmarks/gravar_fixtures.py e fora do
+git), `curso_<id>.html` e `login.html` de lá substituem as geradas; quem
+importa o módulo só usa páginas gravadas se passar `fixtures`.
+
+Também responde como a API REST de Web Services (/login/token.php e
+/webservice/rest/server.php) para as funções usadas pelo motor `ws`, com
+as mesmas atividades sintéticas das páginas.
+
+    python benchmarks/stub_moodle.py --porta 8765 --latencia 0.2 --atividades 40
+
+Com --falhas, uma fração das páginas de curso responde 503, para exercitar
+as novas tentativas, o disjuntor e o --retomar do bot.
+
+No .env do bot:
+    MOODLE_URL=http://127.0.0.1:8765/login/index.php
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+ARQUIVO_LOGIN = "login.html"
+LOGIN_GRAVADO = FIXTURES_DIR / ARQUIVO_LOGIN
+RE_LOGINTOKEN = re.compile(r'(name="logintoken"\s+value=")[^"]*(")')
+
+PAGINA_LOGIN = """<!DOCTYPE html><html><body id="page-login-index">
+<form class="login-form" action="/login/index.php" method="post" id="login">
+<input type="hidden" name="logintoken" value="{token}">
+<input type="text" name="username" id="username">
+<input type="password" name="password" id="password">
+<button type="submit" id="loginbtn">Acessar</button>
+</form>{erro}</body></html>"""
+
+PAGINA_PAINEL = """<!DOCTYPE html><html><body id="page-my-index">
+<div id="region-main"><h2>Painel</h2></div></body></html>"""
+
+STATUS_SINTETICOS = [
+    ('<span class="badge badge-danger">Não enviado</span>', "notattempted"),
+    ('<span class="badge badge-success">Enviado para avaliação</span>', "submitted"),
+    ('<div class="activity-status">Concluído</div>', "completed"),
+    ("", ""),
+]
+# Material com conclusão acompanhada e ainda não visto: a página só mostra a condição
+BADGE_MATERIAL = ('<div class="automatic-completion-conditions">'
+                  '<span class="badge badge-light">A fazer: Visualizar</span></div>')
+
+
+def atividades_sinteticas(id_curso, atividades, semente=None):
+    """
+    As atividades de um curso sintético; as mesmas na página HTML e na API
+    REST. A última é sempre um material (resource) sem vencimento, com
+    conclusão acompanhada e incompleta: não é entrega pendente.
+    """
+    rnd = random.Random(semente if semente is not None else id_curso)
+    lista = []
+    for i in range(atividades):
+        badge, classe = rnd.choice(STATUS_SINTETICOS)
+        modtype = rnd.choice(["assign", "quiz", "resource", "forum"])
+        lista.append({
+            "cmid": id_curso * 1000 + i, "modtype": modtype, "nome": f"Atividade {i + 1}",
+            "dia": rnd.randint(1, 28), "badge": badge, "classe": classe,
+        })
+    lista.append({
+        "cmid": id_curso * 1000 + atividades, "modtype": "resource", "nome": "Material de apoio",
+        "dia": None, "badge": BADGE_MATERIAL, "classe": "", "conclusao": 0,
+    })
+    return lista
+
+def gerar_pagina_curso(id_curso, atividades, semente=None):
+    """Gera o HTML de um curso no formato do tema Boost (Moodle 4)."""
+    itens = []
+    for a in atividades_sinteticas(id_curso, atividades, semente):
+        cmid, modtype, classe = a["cmid"], a["modtype"], a["classe"]
+        datas = (f'<div data-region="activity-dates"><div><strong>Vencimento:</strong> '
+                 f'{a["dia"]} nov. 2025, 23:59</div></div>') if a["dia"] else ""
+        itens.append(
+            f'<li class="activity activity-wrapper {modtype} modtype_{modtype} {classe}" '
+            f'id="module-{cmid}" data-id="{cmid}">'
+            f'<div class="activity-item"><div class="activityname">'
+            f'<a href="/mod/{modtype}/view.php?id={cmid}"><span class="instancename">{a["nome"]}</span></a></div>'
+            f'{datas}{a["badge"]}</div></li>'
+        )
+    return (
+        '<!DOCTYPE html><html><body id="page-course-view-topics">'
+        f'<div id="region-main"><div class="course-content"><ul class="topics">'
+        f'<li class="section main" id="section-0"><ul class="section img-text">{"".join(itens)}</ul></li>'
+        "</ul></div></div></body></html>"
+    )
+
+
+# ===============================
+# 🔌 API REST (WEB SERVICES)
+# ===============================
+
+ID_USUARIO = 2
+DESLOCAMENTO_ASSIGN = 500000  # id da instância do assign = cmid + deslocamento
+
+
+def desachatar_parametros(dados):
+    """'courseids[0]=1&requests[0][function]=x' -> {'courseids': [1], 'requests': [{'function': 'x'}]}."""
+    resultado = {}
+    for chave, valores in dados.items():
+        partes = chave.replace("]", "").split("[")
+        alvo = resultado
+        for atual, proxima in zip(partes, partes[1:]):
+            alvo = alvo.setdefault(atual, {})
+        alvo[partes[-1]] = valores[0]
+
+    def listas(valor):
+        if isinstance(valor, dict):
+            if valor and all(k.isdigit() for k in valor):
+                return [listas(valor[k]) for k in sorted(valor, key=int)]
+            return {k: listas(v) for k, v in valor.items()}
+        return valor
+    return listas(resultado)
+
+def _vencimento(atividade):
+    return int(datetime(2025, 11, atividade["dia"], 23, 59).timestamp())
+
+def _funcoes_ws(estado):
+    def atividades(id_curso):
+        return atividades_sinteticas(int(id_curso), estado.atividades)
+
+    def site_info():
+        return {"userid": ID_USUARIO, "username": "bench", "sitename": "Moodle falso"}
+
+    def cursos_do_usuario(userid):
+        return [
+            {"id": c, "shortname": f"C{c}", "fullname": f"Curso {c}", "visible": 1}
+            for c in estado.cursos
+        ]
+
+    def conteudo_curso(courseid):
+        modulos = [
+            {"id": a["cmid"], "name": a["nome"], "modname": a["modtype"], "uservisible": True,
+             "url": f"http://{estado.host}/mod/{a['modtype']}/view.php?id={a['cmid']}",
+             "dates": [{"label": "Vencimento:", "timestamp": _vencimento(a)}] if a["dia"] else []}
+            for a in atividades(courseid)
+        ]
+        return [{"id": 0, "name": "Geral", "modules": modulos}]
+
+    def tarefas(courseids):
+        return {"courses": [
+            {"id": int(c), "assignments": [
+                {"id": a["cmid"] + DESLOCAMENTO_ASSIGN, "cmid": a["cmid"], "name": a["nome"], "duedate": _vencimento(a)}
+                for a in atividades(c) if a["modtype"] == "assign"
+            ]}
+            for c in courseids
+        ], "warnings": []}
+
+    def status_envio(assignid):
+        cmid = int(assignid) - DESLOCAMENTO_ASSIGN
+        a = next(x for x in atividades(cmid // 1000) if x["cmid"] == cmid)
+        enviado = a["classe"] in ("submitted", "completed")
+        return {"lastattempt": {
+            "submission": {"status": "submitted" if enviado else "new"},
+            "gradingstatus": "notgraded",
+        }}
+
+    def conclusao(courseid, userid):
+        return {"statuses": [
+            {"cmid": a["cmid"], "modname": a["modtype"], "instance": a["cmid"], "tracking": 1,
+             "state": a.get("conclusao", 0 if a["classe"] == "notattempted" else 1)}
+            for a in atividades(courseid) if a["classe"] or "conclusao" in a
+        ], "warnings": []}
+
+    return {
+        "core_webservice_get_site_info": site_info,
+        "core_enrol_get_users_courses": cursos_do_usuario,
+        "core_course_get_contents": conteudo_curso,
+        "mod_assign_get_assignments": tarefas,
+        "mod_assign_get_submission_status": status_envio,
+        "core_completion_get_activities_completion_status": conclusao,
+    }
+
+
+class EstadoStub:
+    def __init__(self, latencia=0.0, atividades=30, cursos=5, falhas=0.0, fixtures=None):
+        self.latencia = latencia
+        # Pasta com páginas gravadas (None = só páginas sintéticas)
+        self.fixtures = Path(fixtures) if fixtures else None
+        self.falhas = falhas
+        self.atividades = atividades
+        self.cursos = list(range(1, cursos + 1))
+        self.host = ""
+        self.tokens = set()
+        self.tokens_ws = set()
+        self.chamadas_ws = 0
+        self.sessoes = set()
+        self.requisicoes = 0
+        # time.time() da primeira requisição (bench_inicializacao.py)
+        self.primeira_requisicao = None
+        self.trava = threading.Lock()
+
+
+class ManipuladorMoodle(BaseHTTPRequestHandler):
+    estado = None  # preenchido por criar_servidor
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _esperar(self):
+        with self.estado.trava:
+            self.estado.requisicoes += 1
+            if self.estado.primeira_requisicao is None:
+                self.estado.primeira_requisicao = time.time()
+        if self.estado.latencia:
+            time.sleep(self.estado.latencia)
+
+    def _sessao_valida(self):
+        cookies = self.headers.get("Cookie", "")
+        for parte in cookies.split(";"):
+            nome, _, valor = parte.strip().partition("=")
+            if nome == "MoodleSession" and valor in self.estado.sessoes:
+                return True
+        return False
+
+    def _responder(self, codigo, corpo="", cabecalhos=None):
+        dados = corpo.encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        for chave, valor in (cabecalhos or {}).items():
+            self.send_header(chave, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _redirecionar(self, destino, cabecalhos=None):
+        self._responder(303, "", {"Location": destino, **(cabecalhos or {})})
+
+    def _pagina_login(self, erro=""):
+        token = secrets.token_hex(16)
+        with self.estado.trava:
+            self.estado.tokens.add(token)
+        gravada = self.estado.fixtures / ARQUIVO_LOGIN if self.estado.fixtures else None
+        if gravada and gravada.exists():
+            # Página real gravada: só o logintoken é trocado pelo do stub
+            corpo = RE_LOGINTOKEN.sub(rf'\g<1>{token}\g<2>', gravada.read_text(encoding="utf-8")) + erro
+        else:
+            corpo = PAGINA_LOGIN.format(token=token, erro=erro)
+        self._responder(200, corpo)
+
+    def _responder_json(self, dados):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _token_ws(self, dados):
+        if not dados.get("username") or not dados.get("password"):
+            return self._responder_json({"error": "Usuário ou senha inválidos", "errorcode": "invalidlogin"})
+        token = secrets.token_hex(16)
+        with self.estado.trava:
+            self.estado.tokens_ws.add(token)
+        self._responder_json({"token": token})
+
+    def _executar_funcao(self, funcao, argumentos):
+        implementacao = _funcoes_ws(self.estado).get(funcao)
+        if implementacao is None:
+            raise LookupError(funcao)
+        return implementacao(**argumentos)
+
+    def _rest(self, dados):
+        with self.estado.trava:
+            self.estado.chamadas_ws += 1
+            token_ok = dados.pop("wstoken", "") in self.estado.tokens_ws
+        if not token_ok:
+            return self._responder_json({"exception": "moodle_exception", "errorcode": "invalidtoken",
+                                         "message": "Token inválido - token não encontrado"})
+        funcao = dados.pop("wsfunction", "")
+        dados.pop("moodlewsrestformat", None)
+
+        if funcao == "tool_mobile_call_external_functions":
+            respostas = []
+            for pedido in dados.get("requests", []):
+                try:
+                    resultado = self._executar_funcao(pedido["function"], json.loads(pedido.get("arguments") or "{}"))
+                    respostas.append({"error": False, "data": json.dumps(resultado)})
+                except Exception as e:
+                    respostas.append({"error": True, "exception": json.dumps(
+                        {"exception": type(e).__name__, "errorcode": "erro", "message": str(e)})})
+            return self._responder_json({"responses": respostas})
+
+        try:
+            self._responder_json(self._executar_funcao(funcao, dados))
+        except LookupError:
+            self._responder_json({"exception": "dml_missing_record_exception", "errorcode": "invalidrecord",
+                                  "message": f"Função inexistente: {funcao}"})
+
+    def do_GET(self):
+        self._esperar()
+        url = urlparse(self.path)
+        consulta = parse_qs(url.query)
+        self.estado.host = self.headers.get("Host", "")
+
+        if url.path == "/login/token.php":
+            return self._token_ws({k: v[0] for k, v in consulta.items()})
+        if url.path == "/webservice/rest/server.php":
+            return self._rest(desachatar_parametros(consulta))
+
+        if url.path == "/login/index.php":
+            if "testsession" in consulta and self._sessao_valida():
+                return self._redirecionar("/my/")
+            return self._pagina_login()
+
+        if not self._sessao_valida():
+            return self._redirecionar("/login/index.php")
+
+        if url.path.rstrip("/") == "/my":
+            return self._responder(200, PAGINA_PAINEL)
+
+        if url.path == "/course/view.php":
+            if self.estado.falhas and random.random() < self.estado.falhas:
+                return self._responder(503, "<h1>503 Service Unavailable</h1>")
+            id_curso = int(consulta.get("id", ["0"])[0])
+            fixture = self.estado.fixtures / f"curso_{id_curso}.html" if self.estado.fixtures else None
+            if fixture and fixture.exists():
+                corpo = fixture.read_text(encoding="utf-8")
+            else:
+                corpo = gerar_pagina_curso(id_curso, self.estado.atividades)
+            etag = '"%s"' % hashlib.sha1(corpo.encode("utf-8")).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            return self._responder(200, corpo, {"ETag": etag})
+
+        self._responder(404, "<h1>404</h1>")
+
+    def do_POST(self):
+        self._esperar()
+        caminho = urlparse(self.path).path
+        self.estado.host = self.headers.get("Host", "")
+        tamanho = int(self.headers.get("Content-Length", "0"))
+        dados = parse_qs(self.rfile.read(tamanho).decode("utf-8"))
+
+        if caminho == "/login/token.php":
+            return self._token_ws({k: v[0] for k, v in dados.items()})
+        if caminho == "/webservice/rest/server.php":
+            return self._rest(desachatar_parametros(dados))
+        if caminho != "/login/index.php":
+            return self._responder(404, "<h1>404</h1>")
+        token = dados.get("logintoken", [""])[0]
+
+        with self.estado.trava:
+            token_ok = token in self.estado.tokens
+            self.estado.tokens.discard(token)
+        if not token_ok or not dados.get("username") or not dados.get("password"):
+            return self._pagina_login('<div id="loginerrormessage">Login inválido</div>')
+
+        sessao = secrets.token_hex(16)
+        with self.estado.trava:
+            self.estado.sessoes.add(sessao)
+        self._redirecionar(
+            f"/login/index.php?testsession={secrets.randbelow(10000)}",
+            {"Set-Cookie": f"MoodleSession={sessao}; Path=/; HttpOnly"},
+        )
+
+
+def criar_servidor(porta=0, latencia=0.0, atividades=30, cursos=5, falhas=0.0, fixtures=None):
+    """Cria o servidor (porta 0 = escolhida pelo sistema). Use `iniciar_em_thread` para testes."""
+    estado = EstadoStub(latencia, atividades, cursos, falhas, fixtures)
+    manipulador = type("ManipuladorStub", (ManipuladorMoodle,), {"estado": estado})
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), manipulador)
+    servidor.daemon_threads = True
+    servidor.estado = estado
+    return servidor
+
+def iniciar_em_thread(**kwargs):
+    servidor = criar_servidor(**kwargs)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Moodle falso para testes locais")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=0.0, help="atraso por requisição, em segundos")
+    parser.add_argument("--atividades", type=int, default=30, help="atividades por curso sintético")
+    parser.add_argument("--cursos", type=int, default=5, help="cursos em que o usuário da API está inscrito")
+    parser.add_argument("--falhas", type=float, default=0.0, help="fração das páginas de curso que responde 503")
+    parser.add_argument("--fixtures", default=str(FIXTURES_DIR),
+                        help="pasta com páginas gravadas ('' = só páginas sintéticas)")
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args.porta, args.latencia, args.atividades, args.cursos, args.falhas, args.fixtures)
+    print(f"🧪 Moodle falso em http://127.0.0.1:{args.porta}/login/index.php")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+"""
+Armazém estruturado dos resultados (SQLite).
+
+Cada execução do bot vira uma linha em `execucoes` e uma linha por matéria
+em `resultados`, com contagens e o detalhe de cada atividade. O dashboard
+consulta este banco direto, sem reprocessar os relatórios .txt.
+
+Importar relatórios antigos (só entra o que ainda não foi importado):
+    python core/armazem.py importar
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import stat
+from datetime import datetime
+
+from atividades import Atividade, comparar_atividades
+
+ARQUIVO_BANCO = "moodle_bot.db"
+# Subpasta de logs/ com os segmentos mensais da compactação (core/compactacao.py)
+PASTA_ARQUIVO = "arquivo"
+
+ICONES_STATUS = {"❌": "Pendente", "✅": "Em dia", "🔍": "Sem trabalho"}
+
+RE_ARQUIVO = re.compile(
+    r"(?:log_|relatorio_)?(\d{4})[-_]?(\d{2})[-_]?(\d{2})[-_]?(\d{2})(\d{2})(\d{2})(?:_\d+)?\.txt"
+)
+RE_LINHA = re.compile(r"^(?P<icon>❌|✅|🔍)\s*(?P<materia>.+?)(?:\s*-\s*(?P<detalhes>.+))?$")
+# Mesma regra de RE_LINHA aplicada ao arquivo inteiro de uma vez (re.M), já sem
+# os espaços das pontas. [^\S\n] = espaço que não quebra linha: um match nunca
+# atravessa linhas.
+RE_LINHAS_BLOCO = re.compile(
+    r"^[^\S\n]*(❌|✅|🔍)[^\S\n]*(\S.*?)(?:[^\S\n]*-[^\S\n]*(\S(?:.*\S)?))?[^\S\n]*$", re.M
+)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id        INTEGER PRIMARY KEY,
+    datahora  TEXT NOT NULL,
+    motor     TEXT,
+    arquivo   TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS resultados (
+    id                 INTEGER PRIMARY KEY,
+    execucao_id        INTEGER NOT NULL REFERENCES execucoes(id),
+    datahora           TEXT NOT NULL,
+    materia            TEXT NOT NULL,
+    status             TEXT NOT NULL,
+    detalhes           TEXT,
+    pendentes          INTEGER,
+    entregues          INTEGER,
+    atividades         INTEGER,
+    detalhe_atividades TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_resultados_datahora ON resultados(datahora);
+CREATE INDEX IF NOT EXISTS idx_resultados_materia ON resultados(materia, datahora);
+CREATE INDEX IF NOT EXISTS idx_resultados_status ON resultados(status, datahora);
+CREATE TABLE IF NOT EXISTS atividades (
+    materia     TEXT NOT NULL,
+    cmid        INTEGER NOT NULL,
+    tipo        TEXT,
+    nome        TEXT,
+    vencimento  TEXT,
+    status      TEXT,
+    url         TEXT,
+    atualizado_em TEXT NOT NULL,
+    PRIMARY KEY (materia, cmid)
+);
+CREATE INDEX IF NOT EXISTS idx_atividades_vencimento ON atividades(vencimento);
+CREATE TABLE IF NOT EXISTS eventos_atividades (
+    id              INTEGER PRIMARY KEY,
+    execucao_id     INTEGER NOT NULL REFERENCES execucoes(id),
+    datahora        TEXT NOT NULL,
+    materia         TEXT NOT NULL,
+    cmid            INTEGER NOT NULL,
+    evento          TEXT NOT NULL,
+    status_anterior TEXT,
+    status_novo     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_atividade ON eventos_atividades(materia, cmid, datahora);
+CREATE TABLE IF NOT EXISTS arquivos_importados (
+    arquivo     TEXT PRIMARY KEY,
+    mtime       REAL NOT NULL,
+    tamanho     INTEGER NOT NULL
+);
+"""
+
+FORMATO_DATAHORA = "%Y-%m-%d %H:%M:%S"
+# Nomes por consulta IN (...): abaixo do limite de parâmetros das versões antigas do SQLite
+LOTE_CONSULTA = 500
+
+
+def conectar(caminho):
+    """Abre (e cria, se preciso) o banco. WAL permite o dashboard ler durante a escrita do bot."""
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    con = sqlite3.connect(caminho, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.executescript(ESQUEMA)
+    return con
+
+def status_do_resultado(s):
+    """Mesma regra dos símbolos do relatório .txt."""
+    if s.get("pendente"):
+        return "Pendente"
+    return "Em dia" if s.get("trabalho_encontrado") else "Sem trabalho"
+
+def registrar_execucao(con, datahora, status_materias, motor=None, arquivo=None):
+    """Grava uma execução inteira numa única transação. Retorna o id da execução."""
+    datahora_txt = datahora.strftime(FORMATO_DATAHORA)
+    with con:
+        cursor = con.execute(
+            "INSERT INTO execucoes (datahora, motor, arquivo) VALUES (?, ?, ?)",
+            (datahora_txt, motor, arquivo),
+        )
+        execucao_id = cursor.lastrowid
+        con.executemany(
+            """INSERT INTO resultados (execucao_id, datahora, materia, status, detalhes,
+                                       pendentes, entregues, atividades, detalhe_atividades)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (
+                    execucao_id, datahora_txt, materia, status_do_resultado(s), s.get("observacao", ""),
+                    s.get("pendentes"), s.get("entregues"), s.get("atividades"),
+                    json.dumps(s["detalhe_atividades"], ensure_ascii=False) if s.get("detalhe_atividades") else None,
+                )
+                for materia, s in status_materias.items()
+            ],
+        )
+        for materia, s in status_materias.items():
+            if s.get("detalhe_atividades"):
+                sincronizar_atividades(con, execucao_id, datahora_txt, materia, s["detalhe_atividades"])
+    return execucao_id
+
+def carregar_atividades(con, materia):
+    campos = ", ".join(Atividade.CAMPOS)
+    return [Atividade(*linha) for linha in con.execute(f"SELECT {campos} FROM atividades WHERE materia = ?", (materia,))]
+
+def sincronizar_atividades(con, execucao_id, datahora_txt, materia, detalhe):
+    """
+    Atualiza a tabela `atividades` da matéria mexendo só no que mudou e
+    registra cada mudança em `eventos_atividades`. Atividades sem cmid
+    (temas sem id de módulo) ficam só no JSON de `resultados`.
+    Retorna (novas, alteradas, removidas).
+    """
+    atuais = [Atividade.de_dict(materia, d) for d in detalhe if d.get("cmid") is not None]
+    novas, alteradas, removidas = comparar_atividades(carregar_atividades(con, materia), atuais)
+
+    gravar = novas + [depois for _, depois in alteradas]
+    con.executemany(
+        """INSERT OR REPLACE INTO atividades (materia, cmid, tipo, nome, vencimento, status, url, atualizado_em)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        [a.como_tupla() + (datahora_txt,) for a in gravar],
+    )
+    con.executemany(
+        "DELETE FROM atividades WHERE materia = ? AND cmid = ?",
+        [a.chave for a in removidas],
+    )
+    eventos = (
+        [(a.cmid, "nova", None, a.status) for a in novas]
+        + [(depois.cmid, "alterada", antes.status, depois.status) for antes, depois in alteradas]
+        + [(a.cmid, "removida", a.status, None) for a in removidas]
+    )
+    con.executemany(
+        """INSERT INTO eventos_atividades (execucao_id, datahora, materia, cmid, evento, status_anterior, status_novo)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [(execucao_id, datahora_txt, materia) + evento for evento in eventos],
+    )
+    return len(novas), len(alteradas), len(removidas)
+
+def atividades_por_vencimento(con, inicio=None, fim=None, status=None):
+    """Atividades com vencimento no intervalo (texto 'AAAA-MM-DD HH:MM'), usando o índice de vencimento."""
+    condicoes, parametros = ["vencimento IS NOT NULL"], []
+    if inicio is not None:
+        condicoes.append("vencimento >= ?")
+        parametros.append(inicio)
+    if fim is not None:
+        condicoes.append("vencimento <= ?")
+        parametros.append(fim)
+    if status is not None:
+        condicoes.append("status = ?")
+        parametros.append(status)
+    campos = ", ".join(Atividade.CAMPOS)
+    sql = f"SELECT {campos} FROM atividades WHERE {' AND '.join(condicoes)} ORDER BY vencimento"
+    return [Atividade(*linha) for linha in con.execute(sql, parametros)]
+
+
+# ===============================
+# 📥 IMPORTAÇÃO DOS RELATÓRIOS .TXT
+# ===============================
+
+def datahora_do_arquivo(nome_arquivo):
+    """Data/hora codificada no nome do relatório, ou None se o nome não seguir o padrão."""
+    match = RE_ARQUIVO.match(nome_arquivo)
+    if not match:
+        return None
+    return datetime(*(int(parte) for parte in match.groups()))
+
+def ler_linhas_relatorio(linhas):
+    """Extrai (materia, status, detalhes) das linhas de um relatório."""
+    for linha in linhas:
+        match = RE_LINHA.match(linha.strip())
+        if match:
+            yield (
+                match.group("materia").strip(),
+                ICONES_STATUS.get(match.group("icon"), "Desconhecido"),
+                (match.group("detalhes") or "").strip(),
+            )
+
+def ler_bloco_relatorio(texto):
+    """Versão em bloco de `ler_linhas_relatorio`: um único finditer sobre o texto todo."""
+    return [
+        (materia, ICONES_STATUS[icone], detalhes)
+        for icone, materia, detalhes in RE_LINHAS_BLOCO.findall(texto)
+    ]
+
+def ler_relatorios_em_lote(caminhos):
+    """
+    Lê vários relatórios de uma vez e devolve colunas (listas paralelas)
+    prontas para virar DataFrame ou ir para o banco com um único executemany.
+    Arquivos com nome fora do padrão ou ilegíveis são ignorados.
+    """
+    colunas = {"arquivo": [], "datahora": [], "materia": [], "status": [], "detalhes": []}
+    for caminho in caminhos:
+        nome = os.path.basename(caminho)
+        datahora = datahora_do_arquivo(nome)
+        if datahora is None:
+            continue
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                linhas = ler_bloco_relatorio(f.read())
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"⚠️ Não foi possível ler {nome}: {e}")
+            continue
+        n = len(linhas)
+        if not n:
+            continue
+        materias, status, detalhes = zip(*linhas)
+        colunas["arquivo"].extend([nome] * n)
+        colunas["datahora"].extend([datahora] * n)
+        colunas["materia"].extend(materias)
+        colunas["status"].extend(status)
+        colunas["detalhes"].extend(detalhes)
+    return colunas
+
+def _remover_execucao_do_arquivo(con, nome):
+    for (execucao_id,) in con.execute("SELECT id FROM execucoes WHERE arquivo = ?", (nome,)).fetchall():
+        con.execute("DELETE FROM resultados WHERE execucao_id = ?", (execucao_id,))
+        con.execute("DELETE FROM eventos_atividades WHERE execucao_id = ?", (execucao_id,))
+        con.execute("DELETE FROM execucoes WHERE id = ?", (execucao_id,))
+
+def _chave_manifesto(entrada):
+    """Nome no manifesto: o do .txt, ou arquivo/<segmento> para os segmentos compactados."""
+    if entrada.name.endswith(".txt"):
+        return entrada.name
+    return f"{PASTA_ARQUIVO}/{entrada.name}"
+
+def _marcar_importados(con, entradas):
+    con.executemany(
+        "INSERT OR REPLACE INTO arquivos_importados (arquivo, mtime, tamanho) VALUES (?, ?, ?)",
+        [(_chave_manifesto(e), e.stat().st_mtime, e.stat().st_size) for e in entradas],
+    )
+
+def _consultar_nomes(con, sql, nomes):
+    """Linhas de `sql` (com um `IN ({})`) só para os nomes dados, em lotes que cabem no limite de parâmetros do SQLite."""
+    nomes = list(nomes)
+    linhas = []
+    for i in range(0, len(nomes), LOTE_CONSULTA):
+        lote = nomes[i:i + LOTE_CONSULTA]
+        linhas.extend(con.execute(sql.format(",".join("?" * len(lote))), lote))
+    return linhas
+
+def _colunas_dos_segmentos(con, segmentos, ignorar):
+    """Linhas dos segmentos cujos relatórios ainda não estão no banco (nem em `ignorar`)."""
+    from compactacao import COLUNAS, arquivos_do_segmento, ler_segmento
+
+    colunas = {coluna: [] for coluna in COLUNAS}
+    for entrada in segmentos:
+        try:
+            arquivos = arquivos_do_segmento(entrada.path)
+            no_banco = {a for (a,) in _consultar_nomes(con, "SELECT arquivo FROM execucoes WHERE arquivo IN ({})", arquivos)}
+            if set(arquivos) <= no_banco | ignorar:
+                continue
+            segmento = ler_segmento(entrada.path, no_banco | ignorar)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Não foi possível ler {entrada.name}: {e}")
+            continue
+        for coluna in COLUNAS:
+            colunas[coluna].extend(segmento[coluna])
+    return colunas
+
+def _importar_lote(con, entradas, segmentos=()):
+    """
+    Importa vários .txt (e os relatórios dos segmentos que ainda não estão
+    no banco) numa única transação, substituindo importações anteriores dos
+    mesmos .txt. Retorna (linhas, arquivos) importados.
+    """
+    colunas = ler_relatorios_em_lote(e.path for e in entradas)
+    if segmentos:
+        # Um .txt que também está num segmento (compactação interrompida) vale o .txt
+        arquivados = _colunas_dos_segmentos(con, segmentos, {e.name for e in entradas})
+        for coluna, valores in arquivados.items():
+            colunas[coluna].extend(valores)
+    with con:
+        for entrada in entradas:
+            _remover_execucao_do_arquivo(con, entrada.name)
+
+        ids = {}
+        for nome, datahora in dict(zip(colunas["arquivo"], colunas["datahora"])).items():
+            ids[nome] = con.execute(
+                "INSERT INTO execucoes (datahora, motor, arquivo) VALUES (?, ?, ?)",
+                (datahora.strftime(FORMATO_DATAHORA), "importado", nome),
+            ).lastrowid
+
+        con.executemany(
+            "INSERT INTO resultados (execucao_id, datahora, materia, status, detalhes) VALUES (?, ?, ?, ?, ?)",
+            (
+                (ids[nome], datahora.strftime(FORMATO_DATAHORA), materia, status, detalhes)
+                for nome, datahora, materia, status, detalhes in zip(
+                    colunas["arquivo"], colunas["datahora"], colunas["materia"],
+                    colunas["status"], colunas["detalhes"],
+                )
+            ),
+        )
+        _marcar_importados(con, list(entradas) + list(segmentos))
+    return len(colunas["arquivo"]), len(ids)
+
+class MemoriaImportacao:
+    """
+    O que o importador já viu da pasta de relatórios, guardado pelo chamador
+    entre uma chamada e outra (o dashboard). Nova (vazia), a próxima chamada
+    varre tudo.
+    """
+
+    def __init__(self):
+        self.nomes = set()
+        self.assinatura = None
+
+    def limpar(self):
+        self.nomes.clear()
+        self.assinatura = None
+
+
+class _Arquivo:
+    """O pouco de os.DirEntry que o importador usa, para um arquivo achado só pelo nome."""
+
+    __slots__ = ("name", "path", "_info")
+
+    def __init__(self, pasta, nome):
+        self.name = nome
+        self.path = os.path.join(pasta, nome)
+        self._info = None
+
+    def stat(self):
+        if self._info is None:
+            self._info = os.stat(self.path)
+        return self._info
+
+
+def _assinatura_pastas(pasta_logs):
+    """mtime de logs/ e de logs/arquivo/: criar, apagar ou renomear um arquivo muda a da pasta."""
+    assinatura = []
+    for pasta in (pasta_logs, os.path.join(pasta_logs, PASTA_ARQUIVO)):
+        try:
+            assinatura.append(os.stat(pasta).st_mtime_ns)
+        except OSError:
+            assinatura.append(None)
+    return tuple(assinatura)
+
+def importar_logs(con, pasta_logs, memoria=None):
+    """
+    Sincroniza a pasta de relatórios com o banco. Cada arquivo é lembrado por
+    (mtime, tamanho): só arquivos novos ou alterados são lidos, todos numa
+    única transação; os gravados pelo próprio bot já estão no banco e só
+    entram (ou são atualizados) no manifesto, nunca reimportados por cima
+    das linhas estruturadas. Manifesto e execuções são consultados só pelos
+    nomes examinados, nunca carregados inteiros.
+    Os segmentos mensais de logs/arquivo/ (core/compactacao.py) entram do
+    mesmo jeito: um segmento novo ou alterado só traz os relatórios que
+    ainda não estão no banco. Quem some da pasta (compactado ou apagado
+    pela retenção) sai do manifesto; as linhas no banco ficam.
+
+    Com uma `memoria` (MemoriaImportacao) já preenchida, pastas com o mesmo
+    mtime da última chamada nem são listadas, e de uma pasta alterada só os
+    nomes novos passam por stat e consulta. Um .txt já conhecido e editado
+    no lugar só é notado depois de `memoria.limpar()`.
+    Retorna (arquivos_importados, linhas_importadas, arquivos_substituidos).
+    """
+    from compactacao import listar_segmentos
+
+    incremental = memoria is not None and memoria.assinatura is not None
+    # Lida antes da listagem: um arquivo criado depois dela muda a assinatura de novo
+    assinatura = _assinatura_pastas(pasta_logs)
+    if incremental and assinatura == memoria.assinatura:
+        return 0, 0, 0
+
+    # Diferenças de conjuntos sobre a listagem inteira (em C); o filtro por .txt vem depois, só no que mudou
+    todos = set(os.listdir(pasta_logs))
+    segmentos_pasta = {_chave_manifesto(e): e for e in listar_segmentos(pasta_logs)}
+    if incremental:
+        candidatos = [_Arquivo(pasta_logs, nome) for nome in todos - memoria.nomes if nome.endswith(".txt")]
+        sumidos = {
+            nome for nome in memoria.nomes - todos - segmentos_pasta.keys()
+            if nome.endswith(".txt") or nome.startswith(f"{PASTA_ARQUIVO}/")
+        }
+    else:
+        nomes = {nome for nome in todos if nome.endswith(".txt")}
+        candidatos = [_Arquivo(pasta_logs, nome) for nome in nomes]
+        sumidos = {
+            a for (a,) in con.execute("SELECT arquivo FROM arquivos_importados")
+            if a not in nomes and a not in segmentos_pasta
+        }
+
+    manifesto = {
+        arquivo: (mtime, tamanho)
+        for arquivo, mtime, tamanho in _consultar_nomes(
+            con, "SELECT arquivo, mtime, tamanho FROM arquivos_importados WHERE arquivo IN ({})",
+            [e.name for e in candidatos] + list(segmentos_pasta),
+        )
+    }
+    motores = dict(_consultar_nomes(
+        con, "SELECT arquivo, motor FROM execucoes WHERE arquivo IN ({})", [e.name for e in candidatos]
+    ))
+
+    do_bot, pendentes, segmentos = [], [], []
+    substituidos = 0
+    for chave, entrada in segmentos_pasta.items():
+        info = entrada.stat()
+        if manifesto.get(chave) != (info.st_mtime, info.st_size):
+            segmentos.append(entrada)
+    for entrada in sorted(candidatos, key=lambda e: e.name):
+        try:
+            info = entrada.stat()
+        except OSError:
+            continue
+        if not stat.S_ISREG(info.st_mode):
+            continue
+        anterior = manifesto.get(entrada.name)
+        if anterior == (info.st_mtime, info.st_size):
+            continue
+        if entrada.name in motores and (anterior is None or motores[entrada.name] != "importado"):
+            do_bot.append(entrada)
+            continue
+        if anterior is not None:
+            substituidos += 1
+        pendentes.append(entrada)
+
+    if do_bot or sumidos:
+        with con:
+            _marcar_importados(con, do_bot)
+            con.executemany("DELETE FROM arquivos_importados WHERE arquivo = ?", [(a,) for a in sumidos])
+    linhas = arquivos = 0
+    if pendentes or segmentos:
+        linhas, arquivos = _importar_lote(con, pendentes, segmentos)
+
+    if memoria is not None:
+        memoria.nomes.difference_update(sumidos)
+        memoria.nomes.update(todos, segmentos_pasta.keys())
+        memoria.assinatura = assinatura
+    return arquivos, linhas, substituidos
+
+if __name__ == "__main__":
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    parser = argparse.ArgumentParser(description="Armazém SQLite do Moodle Bot")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    importar = sub.add_parser("importar", help="importa os relatorio_*.txt antigos")
+    importar.add_argument("--logs", default=os.path.join(base_dir, "logs"))
+    importar.add_argument("--banco", default=os.path.join(base_dir, "dados", ARQUIVO_BANCO))
+    args = parser.parse_args()
+
+    con = conectar(args.banco)
+    arquivos, linhas, _ = importar_logs(con, args.logs)
+    print(f"📥 {arquivos} relatório(s) importado(s), {linhas} linha(s) em {args.banco}")
+    con.close()
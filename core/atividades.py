@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Modelo por atividade extraído da página do curso.
+
+Cada atividade vira um registro compacto (`Atividade`, com __slots__)
+identificado por (matéria, cmid) — o cmid é o id do módulo no Moodle
+(`id="module-<cmid>"`). O armazém guarda esses registros como linhas, o
+que permite comparar execuções atividade por atividade e consultar por
+data de vencimento sem reprocessar texto.
+"""
+import re
+from urllib.parse import urljoin
+
+RE_CMID = re.compile(r"(?:^module-|[?&]id=)(\d+)")
+RE_MODTYPE = re.compile(r"\bmodtype_(\w+)")
+
+MESES = {
+    "jan": 1, "fev": 2, "mar": 3, "abr": 4, "mai": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "out": 10, "nov": 11, "dez": 12,
+    "feb": 2, "apr": 4, "may": 5, "aug": 8, "sep": 9, "oct": 10, "dec": 12,
+}
+# "12 nov. 2025, 23:59" (tema Boost pt-BR), "12 November 2025, 11:59 PM", "12/11/2025 23:59"
+RE_DATA_EXTENSO = re.compile(
+    r"(\d{1,2})\s+(?:de\s+)?([a-zç]{3})[a-zç]*\.?\s+(?:de\s+)?(\d{4})(?:,?\s+(\d{1,2}):(\d{2})\s*([ap]m)?)?", re.I
+)
+RE_DATA_NUMERICA = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})(?:,?\s+(\d{1,2}):(\d{2}))?")
+ROTULOS_VENCIMENTO = ("vencimento", "entrega", "due", "fecha", "prazo")
+
+
+class Atividade:
+    """Uma atividade de um curso. Comparável por conteúdo; chave = (materia, cmid)."""
+
+    __slots__ = ("materia", "cmid", "tipo", "nome", "vencimento", "status", "url")
+
+    CAMPOS = __slots__
+
+    def __init__(self, materia, cmid, tipo=None, nome="", vencimento=None, status="indefinido", url=None):
+        self.materia = materia
+        self.cmid = cmid
+        self.tipo = tipo
+        self.nome = nome
+        self.vencimento = vencimento
+        self.status = status
+        self.url = url
+
+    @property
+    def chave(self):
+        return (self.materia, self.cmid)
+
+    def como_tupla(self):
+        return tuple(getattr(self, campo) for campo in self.CAMPOS)
+
+    def como_dict(self):
+        """Formato de `detalhe_atividades` (sem a matéria, que já é a chave do status)."""
+        return {campo: getattr(self, campo) for campo in self.CAMPOS if campo != "materia"}
+
+    @classmethod
+    def de_dict(cls, materia, d):
+        return cls(materia, d.get("cmid"), d.get("tipo"), d.get("nome", ""),
+                   d.get("vencimento"), d.get("status", "indefinido"), d.get("url"))
+
+    def __eq__(self, outra):
+        return isinstance(outra, Atividade) and self.como_tupla() == outra.como_tupla()
+
+    def __hash__(self):
+        return hash(self.chave)
+
+    def __repr__(self):
+        return f"Atividade({self.materia!r}, {self.cmid}, {self.tipo!r}, {self.nome!r}, {self.status!r})"
+
+
+# ===============================
+# 🔎 EXTRAÇÃO DOS CAMPOS
+# ===============================
+
+def extrair_cmid(id_elemento=None, url=None, data_id=None):
+    """cmid pelo id do <li> (module-123), o ?id= do link da atividade ou o data-id."""
+    for valor in (id_elemento, url):
+        if valor:
+            match = RE_CMID.search(valor)
+            if match:
+                return int(match.group(1))
+    return int(data_id) if data_id and data_id.isdigit() else None
+
+def extrair_tipo(classes):
+    """Tipo do módulo a partir do atributo class (modtype_assign -> 'assign')."""
+    match = RE_MODTYPE.search(classes or "")
+    return match.group(1) if match else None
+
+def resolver_url(href, url_base=None):
+    if href is None:
+        return None
+    return urljoin(url_base, href) if url_base else href
+
+def interpretar_data(texto):
+    """Primeira data do texto como 'AAAA-MM-DD HH:MM' (ou None)."""
+    match = RE_DATA_NUMERICA.search(texto)
+    if match:
+        dia, mes, ano, hora, minuto = match.groups()
+    else:
+        match = RE_DATA_EXTENSO.search(texto)
+        if not match or match.group(2).lower()[:3] not in MESES:
+            return None
+        dia, mes, ano, hora, minuto, periodo = match.groups()
+        mes = MESES[mes.lower()[:3]]
+        if hora and periodo:
+            hora = int(hora) % 12 + (12 if periodo.lower() == "pm" else 0)
+    try:
+        return f"{int(ano):04d}-{int(mes):02d}-{int(dia):02d} {int(hora or 0):02d}:{int(minuto or 0):02d}"
+    except ValueError:
+        return None
+
+def extrair_vencimento(linhas):
+    """
+    Data de vencimento a partir das linhas do bloco de datas da atividade
+    (Moodle 4) ou, sem elas, do texto do bloco inteiro ('Vencimento: ...').
+    """
+    for texto in linhas:
+        if any(rotulo in texto.lower() for rotulo in ROTULOS_VENCIMENTO):
+            return interpretar_data(texto)
+    return None
+
+
+# ===============================
+# 🔁 COMPARAÇÃO ENTRE EXECUÇÕES
+# ===============================
+
+def comparar_atividades(anteriores, atuais):
+    """
+    Diferença entre duas listas de `Atividade` da mesma matéria.
+    Retorna (novas, alteradas, removidas); `alteradas` traz pares (antes, depois).
+    """
+    antes = {a.cmid: a for a in anteriores}
+    depois = {a.cmid: a for a in atuais}
+    novas = [a for cmid, a in depois.items() if cmid not in antes]
+    alteradas = [(antes[cmid], a) for cmid, a in depois.items() if cmid in antes and antes[cmid] != a]
+    removidas = [a for cmid, a in antes.items() if cmid not in depois]
+    return novas, alteradas, removidas
@@ -4,18 +4,24 @@ sys.stdout.reconfigure(encoding='utf-8')
 
 import os
 import time
+import argparse
+import itertools
 import shutil
+import sqlite3
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 from dotenv import load_dotenv
 
+from classificador import classificar_html
+from estado_incremental import EstadoIncremental, hash_conteudo
+import armazem
+import compactacao
+import instrumentacao
+
+# O Selenium só é importado pelas funções do motor selenium: os motores
+# http/async/ws e o modo daemon sobem sem carregá-lo.
+
 # ===============================
 # ⚙️ CONFIGURAÇÕES GERAIS
 # ===============================
@@ -25,11 +31,84 @@ CONFIGURACOES = {
     "pastas": {
         "logs": "logs",
         "screenshots": "screenshots",
+        "cache": "cache",
+        "dados": "dados",
     },
     "moodle": {
         "url_login": os.getenv("MOODLE_URL"),
         "timeout_login": 20
     },
+    "execucao": {
+        # Quantidade de navegadores mantidos abertos em paralelo
+        "sessoes": int(os.getenv("MOODLE_SESSOES", "1")),
+        # Limite de matérias verificadas ao mesmo tempo (0 = igual ao nº de sessões)
+        "concorrencia": int(os.getenv("MOODLE_CONCORRENCIA", "0")),
+        # Reaproveita os cookies do primeiro login nas demais sessões
+        "compartilhar_cookies": os.getenv("MOODLE_COMPARTILHAR_COOKIES", "1") != "0",
+        # Motor async: requisições por segundo permitidas em cada host do Moodle
+        "taxa_por_host": float(os.getenv("MOODLE_TAXA_POR_HOST", "5")),
+        # Reaproveita o status de matérias cujo conteúdo não mudou
+        "incremental": os.getenv("MOODLE_INCREMENTAL", "1") != "0",
+    },
+    "sessao": {
+        # Reaproveita a sessão (cookies + perfil do Chrome) entre execuções
+        "cache": os.getenv("MOODLE_CACHE_SESSAO", "1") != "0",
+        "validade_h": float(os.getenv("MOODLE_VALIDADE_SESSAO_H", "8")),
+    },
+    "prontidao": {
+        # A página é considerada pronta após este tempo sem mutações no DOM
+        # nem novos recursos de rede
+        "quieto_ms": int(os.getenv("MOODLE_QUIETO_MS", "400")),
+        # Teto de espera por página (e por rolagem) antes de seguir mesmo assim
+        "limite_s": float(os.getenv("MOODLE_LIMITE_PRONTIDAO", "10")),
+        "max_rolagens": 20,
+    },
+    "capturas": {
+        # desligado | mudanca (status mudou) | erro (só falhas) | sempre
+        "modo": os.getenv("MOODLE_CAPTURAS", "mudanca"),
+        # webp | jpeg | png; a imagem é reduzida para no máximo `largura_max` px
+        "formato": os.getenv("MOODLE_CAPTURAS_FORMATO", "webp"),
+        "qualidade": 70,
+        "largura_max": int(os.getenv("MOODLE_CAPTURAS_LARGURA", "1280")),
+        # Retenção: capturas mais antigas que isso (ou além do limite por matéria) são apagadas
+        "retencao_dias": float(os.getenv("MOODLE_CAPTURAS_RETENCAO_DIAS", "30")),
+        "max_por_materia": int(os.getenv("MOODLE_CAPTURAS_MAX", "20")),
+    },
+    "driver": {
+        # Caminho fixo do chromedriver (dispensa qualquer resolução)
+        "caminho": os.getenv("MOODLE_CHROMEDRIVER") or None,
+        # Versão fixa do chromedriver para o webdriver_manager baixar e o manifesto guardar
+        "versao": os.getenv("MOODLE_CHROMEDRIVER_VERSAO") or None,
+    },
+    "agendamento": {
+        # Modo daemon (core/daemon.py): intervalo padrão entre varreduras de cada matéria
+        "intervalo_min": float(os.getenv("MOODLE_INTERVALO_MIN", "30")),
+        # Variação aleatória do intervalo (0.1 = ±10%) para não bater no Moodle sempre no mesmo segundo
+        "jitter": float(os.getenv("MOODLE_JITTER", "0.1")),
+        # Intervalos por matéria, em minutos: "Redes=10,IOT=120"
+        "intervalos": os.getenv("MOODLE_INTERVALOS", ""),
+        # Endpoint local de controle (127.0.0.1)
+        "porta_controle": int(os.getenv("MOODLE_PORTA_CONTROLE", "8766")),
+    },
+    "resiliencia": {
+        # Tentativas por requisição em falhas transitórias (timeout, conexão, HTTP 429/5xx)
+        "tentativas": int(os.getenv("MOODLE_TENTATIVAS", "3")),
+        # Espera antes da 2ª tentativa; dobra a cada nova tentativa (com variação aleatória)
+        "espera_s": float(os.getenv("MOODLE_ESPERA_REPETICAO", "2")),
+        # Falhas seguidas que abrem o disjuntor e por quanto tempo as requisições ficam suspensas
+        "falhas_disjuntor": int(os.getenv("MOODLE_DISJUNTOR_FALHAS", "5")),
+        "pausa_disjuntor_s": float(os.getenv("MOODLE_DISJUNTOR_PAUSA", "60")),
+        # Checkpoints mais antigos que isso não são retomados
+        "validade_checkpoint_h": float(os.getenv("MOODLE_VALIDADE_CHECKPOINT_H", "12")),
+    },
+    "compactacao": {
+        # Compacta os relatórios antigos (core/compactacao.py) ao fim de cada execução
+        "automatica": os.getenv("MOODLE_COMPACTAR_LOGS", "0") != "0",
+        # Relatórios mais novos que isso continuam como .txt em logs/
+        "manter_dias": float(os.getenv("MOODLE_LOGS_MANTER_DIAS", "30")),
+        # Relatórios (e segmentos) de meses mais antigos que isso são apagados; 0 = guarda tudo
+        "retencao_meses": int(os.getenv("MOODLE_LOGS_RETENCAO_MESES", "0")),
+    },
     "materias": {
         "AnaliseProjeto": "https://moodle.faat.edu.br/moodle/course/view.php?id=6450",
         "Redes": "https://moodle.faat.edu.br/moodle/course/view.php?id=6545",
@@ -40,6 +119,8 @@ CONFIGURACOES = {
 }
 
 status_materias = {}
+capturas = None
+politica = None
 
 # ===============================
 # 🧠 FUNÇÕES DE SUPORTE
@@ -53,18 +134,50 @@ def criar_pastas():
     for pasta in CONFIGURACOES["pastas"].values():
         os.makedirs(obter_caminho_completo(pasta), exist_ok=True)
 
-def captura_tela(driver, nome_arquivo):
-    """Salva screenshot direto do Selenium."""
-    caminho = obter_caminho_completo(CONFIGURACOES["pastas"]["screenshots"], nome_arquivo)
-    driver.save_screenshot(caminho)
-    print(f"📸 Screenshot salvo em {caminho}")
+def obter_capturas():
+    """Gravador de screenshots compartilhado pelas sessões (thread de fundo criada sob demanda)."""
+    global capturas
+    if capturas is None:
+        from capturas import GravadorCapturas
+        config = CONFIGURACOES["capturas"]
+        capturas = GravadorCapturas(
+            obter_caminho_completo(CONFIGURACOES["pastas"]["screenshots"]),
+            config["modo"], config["formato"], config["qualidade"], config["largura_max"],
+            config["retencao_dias"], config["max_por_materia"],
+        )
+    return capturas
+
+def encerrar_capturas():
+    """Espera os screenshots pendentes serem gravados."""
+    if capturas is not None:
+        capturas.fechar()
+
+def obter_politica():
+    """Política de repetição do processo: um único disjuntor para todas as requisições ao Moodle."""
+    global politica
+    if politica is None:
+        from resiliencia import Disjuntor, PoliticaRepeticao
+        config = CONFIGURACOES["resiliencia"]
+        politica = PoliticaRepeticao(
+            config["tentativas"], config["espera_s"],
+            disjuntor=Disjuntor(config["falhas_disjuntor"], config["pausa_disjuntor_s"]),
+        )
+    return politica
 
 # ===============================
 # 🌐 LOGIN SELENIUM
 # ===============================
 
-def iniciar_driver():
-    """Inicia o Chrome com perfil temporário isolado para evitar cache e travamentos."""
+def iniciar_driver(indice=0):
+    """
+    Inicia o Chrome com perfil isolado. Com o cache de sessão ligado o perfil
+    fica em cache/ e é reaproveitado; sem ele, é temporário e removido ao final.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+    from driver_chrome import resolver_chromedriver
+
     options = Options()
     options.add_argument("--start-maximized")
     options.add_argument("--disable-gpu")
@@ -74,20 +187,44 @@ def iniciar_driver():
     options.add_argument("--no-first-run")
     options.add_argument("--no-default-browser-check")
 
-    user_data_dir = os.path.join(os.getcwd(), "chrome_temp_profile")
+    # Cada sessão do pool precisa do seu próprio perfil (o Chrome trava o diretório)
+    if CONFIGURACOES["sessao"]["cache"]:
+        nome_perfil = "chrome_profile" if indice == 0 else f"chrome_profile_{indice}"
+        user_data_dir = obter_caminho_completo(CONFIGURACOES["pastas"]["cache"], nome_perfil)
+    else:
+        nome_perfil = "chrome_temp_profile" if indice == 0 else f"chrome_temp_profile_{indice}"
+        user_data_dir = os.path.join(os.getcwd(), nome_perfil)
     os.makedirs(user_data_dir, exist_ok=True)
     options.add_argument(f"--user-data-dir={user_data_dir}")
 
-    print(f"🚀 Iniciando Chrome com perfil temporário em: {user_data_dir}")
-    service = Service(ChromeDriverManager().install())
+    print(f"🚀 Iniciando Chrome com perfil em: {user_data_dir}")
+    caminho_driver = resolver_chromedriver(
+        obter_caminho_completo(CONFIGURACOES["pastas"]["cache"], "drivers"),
+        CONFIGURACOES["driver"]["caminho"],
+        CONFIGURACOES["driver"]["versao"],
+    )
+    service = Service(caminho_driver) if caminho_driver else Service()
     driver = webdriver.Chrome(service=service, options=options)
     driver.implicitly_wait(5)
+    # Os scripts assíncronos de prontidão têm limite próprio; este é só o teto
+    driver.set_script_timeout(CONFIGURACOES["prontidao"]["limite_s"] + 5)
     return driver, user_data_dir
 
+@instrumentacao.span("login")
 def fazer_login(driver):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     print("🌐 Acessando página de login do Moodle...")
     driver.get(CONFIGURACOES["moodle"]["url_login"])
-    time.sleep(3)
+    try:
+        WebDriverWait(driver, CONFIGURACOES["moodle"]["timeout_login"]).until(
+            EC.element_to_be_clickable((By.ID, "loginbtn"))
+        )
+    except Exception:
+        # Segue mesmo assim; o find_element abaixo reporta o problema
+        pass
 
     usuario = os.getenv("MOODLE_USER")
     senha = os.getenv("MOODLE_PASS")
@@ -119,34 +256,222 @@ def fazer_login(driver):
         return True
 
 # ===============================
-# 🔍 VERIFICAR PENDÊNCIAS REAIS (ROBUSTO)
+# ♻️ CACHE DE SESSÃO
+# ===============================
+
+def restaurar_sessao_em_cache():
+    """Retorna os cookies da última sessão se ainda forem aceitos pelo Moodle."""
+    if not CONFIGURACOES["sessao"]["cache"]:
+        return None
+    from cache_sessao import carregar_sessao, sessao_valida, apagar_sessao
+
+    pasta = obter_caminho_completo(CONFIGURACOES["pastas"]["cache"])
+    cookies = carregar_sessao(pasta, os.getenv("MOODLE_USER"))
+    if not cookies:
+        return None
+    if not sessao_valida(CONFIGURACOES["moodle"]["url_login"], cookies):
+        print("⌛ Sessão em cache expirou no Moodle — fazendo login completo.")
+        apagar_sessao(pasta)
+        return None
+    print("♻️ Sessão em cache ainda válida — login dispensado.")
+    return cookies
+
+def guardar_sessao(cookies):
+    if not CONFIGURACOES["sessao"]["cache"] or not cookies:
+        return
+    from cache_sessao import salvar_sessao
+
+    pasta = obter_caminho_completo(CONFIGURACOES["pastas"]["cache"])
+    salvar_sessao(pasta, os.getenv("MOODLE_USER"), cookies, CONFIGURACOES["sessao"]["validade_h"])
+
 # ===============================
+# 🧵 POOL DE SESSÕES
+# ===============================
+
+def aplicar_cookies(driver, cookies):
+    """Injeta cookies de autenticação num driver."""
+    # O Selenium só aceita cookies do domínio que está aberto no momento
+    driver.get(CONFIGURACOES["moodle"]["url_login"])
+    for cookie in cookies:
+        cookie = dict(cookie)
+        cookie.pop("sameSite", None)
+        try:
+            driver.add_cookie(cookie)
+        except Exception as e:
+            print(f"⚠️ Cookie {cookie.get('name')} não pôde ser copiado ({e}).")
+
+def copiar_cookies(origem, destino):
+    """Copia os cookies de autenticação de um driver já logado para outro."""
+    aplicar_cookies(destino, origem.get_cookies())
+
+def criar_pool_sessoes(quantidade):
+    """
+    Abre `quantidade` navegadores e autentica todos.
+    Apenas o primeiro passa pelo formulário de login quando os cookies são
+    compartilhados; os demais recebem a sessão pronta.
+    Retorna lista de (driver, caminho_perfil) ou None se o login falhar.
+    """
+    quantidade = max(1, quantidade)
+    compartilhar = CONFIGURACOES["execucao"]["compartilhar_cookies"]
+    sessoes = []
 
-def _safe_text(el):
-    """Retorna o texto em minúsculas de um elemento (ou '' se None)."""
-    if el is None:
-        return ""
     try:
-        return el.get_text(" ", strip=True).lower()
+        principal, perfil = iniciar_driver(0)
+        sessoes.append((principal, perfil))
+        cookies = restaurar_sessao_em_cache()
+        if cookies:
+            aplicar_cookies(principal, cookies)
+        elif fazer_login(principal):
+            guardar_sessao(principal.get_cookies())
+        else:
+            encerrar_pool_sessoes(sessoes)
+            return None
+
+        for indice in range(1, quantidade):
+            driver, perfil = iniciar_driver(indice)
+            sessoes.append((driver, perfil))
+            if compartilhar:
+                copiar_cookies(principal, driver)
+            elif not fazer_login(driver):
+                encerrar_pool_sessoes(sessoes)
+                return None
     except Exception:
-        return ""
+        encerrar_pool_sessoes(sessoes)
+        raise
+
+    print(f"🧵 Pool pronto com {len(sessoes)} sessão(ões) autenticada(s).")
+    return sessoes
 
-def _has_any(text, keywords):
-    """True se qualquer palavra-chave aparece no texto (case-insensitive)."""
-    t = (text or "").lower()
-    return any(k.lower() in t for k in keywords)
+def encerrar_pool_sessoes(sessoes):
+    """Fecha todos os navegadores do pool e remove os perfis temporários."""
+    manter_perfis = CONFIGURACOES["sessao"]["cache"]
+    for driver, perfil in sessoes:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        if not manter_perfis and os.path.exists(perfil):
+            shutil.rmtree(perfil, ignore_errors=True)
+    if sessoes and not manter_perfis:
+        print("🧹 Perfis temporários do Chrome removidos.")
 
-def verificar_materia(driver, nome_materia, url_materia):
+def verificar_materias_em_paralelo(sessoes, materias, limite=0, estado=None, ao_concluir=None):
     """
-    Abre a matéria, rola toda a página, captura screenshot e
-    detecta pendências olhando títulos e badges/labels de status.
-    Evita lambdas de class_ que geravam NoneType errors.
+    Distribui as matérias entre os drivers do pool e retorna os status
+    na mesma ordem de `materias`, independente da ordem de conclusão.
+    `ao_concluir(nome, status)` é chamado assim que cada matéria termina.
     """
+    drivers_livres = queue.Queue()
+    for driver, _ in sessoes:
+        drivers_livres.put(driver)
+
+    def tarefa(nome, url):
+        driver = drivers_livres.get()
+        try:
+            status = verificar_materia(driver, nome, url, estado)
+        finally:
+            drivers_livres.put(driver)
+        if ao_concluir:
+            ao_concluir(nome, status)
+        return status
+
+    trabalhadores = min(limite or len(sessoes), len(sessoes))
+    with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+        futuros = {nome: executor.submit(tarefa, nome, url) for nome, url in materias.items()}
+        return {nome: futuros[nome].result() for nome in materias}
+
+# ===============================
+# ⏱️ PRONTIDÃO DA PÁGINA
+# ===============================
+
+# Resolve quando o documento está completo e o DOM e a rede ficam quietos por
+# `quietoMs` (MutationObserver + PerformanceObserver de recursos), ou no limite.
+JS_AGUARDAR_QUIETUDE = """
+const quietoMs = arguments[0], limiteMs = arguments[1], concluir = arguments[arguments.length - 1];
+const inicio = performance.now();
+let ultimaAtividade = inicio;
+const marcar = () => { ultimaAtividade = performance.now(); };
+const mutacoes = new MutationObserver(marcar);
+mutacoes.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+let rede = null;
+try { rede = new PerformanceObserver(marcar); rede.observe({type: 'resource'}); } catch (e) {}
+(function checar() {
+    const agora = performance.now();
+    const quieto = document.readyState === 'complete' && agora - ultimaAtividade >= quietoMs;
+    if (quieto || agora - inicio >= limiteMs) {
+        mutacoes.disconnect();
+        if (rede) rede.disconnect();
+        concluir({
+            quieto: quieto,
+            altura: document.body ? document.body.scrollHeight : 0,
+            atividades: document.querySelectorAll('li.activity, div.activity').length
+        });
+        return;
+    }
+    setTimeout(checar, 50);
+})();
+"""
+
+def aguardar_pagina_pronta(driver, quieto_ms=None, limite_s=None):
+    """
+    Espera sinais reais de prontidão em vez de sleeps fixos.
+    Retorna {"quieto", "altura", "atividades"}; em falha do script, um dict vazio.
+    """
+    prontidao = CONFIGURACOES["prontidao"]
+    quieto_ms = prontidao["quieto_ms"] if quieto_ms is None else quieto_ms
+    limite_s = prontidao["limite_s"] if limite_s is None else limite_s
+    try:
+        return driver.execute_async_script(JS_AGUARDAR_QUIETUDE, quieto_ms, int(limite_s * 1000)) or {}
+    except Exception as e:
+        print(f"⚠️ Não foi possível medir a prontidão da página ({e}).")
+        return {}
+
+def rolar_ate_o_fim(driver):
+    """
+    Rola até o fim enquanto a altura da página ou a contagem de `li.activity`
+    continuarem crescendo (conteúdo carregado sob demanda).
+    """
+    anterior = aguardar_pagina_pronta(driver)
+    for _ in range(CONFIGURACOES["prontidao"]["max_rolagens"]):
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        atual = aguardar_pagina_pronta(driver)
+        if not atual or (atual.get("altura") == anterior.get("altura")
+                         and atual.get("atividades") == anterior.get("atividades")):
+            break
+        anterior = atual
+    return anterior.get("atividades", 0)
+
+# ===============================
+# 🔍 VERIFICAR PENDÊNCIAS REAIS (ROBUSTO)
+# ===============================
+
+def verificar_materia(driver, nome_materia, url_materia, estado=None):
+    """
+    Abre a matéria, rola toda a página e entrega o HTML final para o
+    classificador de atividades; o screenshot (conforme o modo em
+    CONFIGURACOES["capturas"]) é gravado em segundo plano.
+    Com `estado`, uma página igual à da última varredura pula o
+    screenshot e a classificação.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
     print(f"\n📘 Verificando matéria: {nome_materia}")
     status = {"trabalho_encontrado": False, "pendente": False, "observacao": ""}
 
+    tempos = {}
+    inicio = marca = time.perf_counter()
+
+    def etapa(nome):
+        nonlocal marca
+        agora = time.perf_counter()
+        tempos[nome] = round(agora - marca, 3)
+        marca = agora
+
     try:
-        driver.get(url_materia)
+        # Timeout ou erro de rede do Chrome: novas tentativas com espera, sob o disjuntor
+        obter_politica().executar(driver.get, url_materia, descricao=nome_materia)
 
         # Espera um contêiner típico de conteúdo do curso
         try:
@@ -158,151 +483,372 @@ def verificar_materia(driver, nome_materia, url_materia):
         except Exception:
             # Segue mesmo assim; alguns temas demoram a sinalizar
             pass
+        etapa("carregamento")
 
         # Rola até o fim para carregar todo conteúdo dinâmico
-        last_h = driver.execute_script("return document.body.scrollHeight")
-        for _ in range(20):
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1.1)
-            new_h = driver.execute_script("return document.body.scrollHeight")
-            if new_h == last_h:
-                break
-            last_h = new_h
+        rolar_ate_o_fim(driver)
 
         # Volta pro topo (print mais útil)
         driver.execute_script("window.scrollTo(0, 0);")
-        time.sleep(0.3)
+        etapa("rolagem")
 
-        # Screenshot final da página já carregada
-        caminho_png = f"tela_{nome_materia}.png"
-        captura_tela(driver, caminho_png)
-
-        # Parse seguro
         html = driver.page_source
-        soup = BeautifulSoup(html, "html.parser")
-
-        # Seleciona atividades de forma previsível (sem lambda no class_)
-        atividades = soup.select("li.activity, div.activity")
-        if not atividades:
-            # Alternativas comuns de temas
-            atividades = soup.select(".activityinstance, .assign, .modtype_assign, .activityitem")
-
-        if not atividades:
-            status["observacao"] = "Nenhuma atividade detectada"
-            print(f"🔍 {nome_materia}: sem atividades visíveis.")
-            return status
-
-        pendentes = 0
-        entregues = 0
-        vistos = 0
-
-        # Palavras-chave de status (ajuste conforme seu tema)
-        KW_PENDENTE = ["pendente", "não enviado", "nao enviado", "não entregue", "nao entregue", "aguardando envio", "não enviado ainda", "atrasado"]
-        KW_ENTREGUE = ["enviado", "entregue", "concluído", "concluido", "em dia", "feito", "submetido", "enviada"]
-
-        for bloco in atividades:
-            vistos += 1
-
-            # Texto amplo do bloco
-            texto = _safe_text(bloco)
-
-            # Coleta badges/status labels comuns em vários temas
-            badges = []
-            for sel in [".badge", ".badge-status", ".status", ".submissionstatus", ".label", ".activity-status"]:
-                for b in bloco.select(sel):
-                    t = _safe_text(b)
-                    if t:
-                        badges.append(t)
-
-            texto_status = " ".join(filter(None, [texto] + badges)).lower()
-
-            if _has_any(texto_status, KW_PENDENTE):
-                pendentes += 1
-            elif _has_any(texto_status, KW_ENTREGUE):
-                entregues += 1
-            else:
-                # Heurísticas por classes conhecidas (sem 'in None')
-                cls = bloco.get("class") or []
-                cls_join = " ".join(cls).lower()
-                if _has_any(cls_join, ["notattempted", "submissionnotgraded", "overdue"]):
-                    pendentes += 1
-                elif _has_any(cls_join, ["completed", "submissionstatussubmitted", "submitted"]):
-                    entregues += 1
-
-        if pendentes > 0:
-            status.update({
-                "trabalho_encontrado": True,
-                "pendente": True,
-                "observacao": f"{pendentes} pendência(s) detectada(s) em {vistos} atividade(s) visível(is)"
-            })
-            print(f"❌ {nome_materia}: {pendentes} pendência(s) ({vistos} atividades analisadas).")
-        elif entregues > 0:
-            status.update({
-                "trabalho_encontrado": True,
-                "pendente": False,
-                "observacao": f"{entregues} tarefa(s) entregue(s) em {vistos} atividade(s)"
-            })
-            print(f"✅ {nome_materia}: em dia ({entregues} entregues, {vistos} atividades).")
-        else:
-            status["observacao"] = f"Sem status identificado (analisadas {vistos} atividades)"
-            print(f"🟣 {nome_materia}: sem status claro ({vistos} atividades).")
-
+        hash_atual = hash_conteudo(html) if estado else None
+        if estado:
+            reaproveitado = estado.reaproveitar(nome_materia, url_materia, hash_atual)
+            if reaproveitado is not None:
+                status = reaproveitado
+                estado.atualizar(nome_materia, url_materia, status, hash_atual)
+                return status
+
+        status = classificar_html(nome_materia, html, url_materia)
+        tempos.update(status.pop("tempos"))
+        marca = time.perf_counter()
+
+        # Screenshot da página já carregada: só os bytes aqui, o resto na thread de fundo
+        obter_capturas().capturar(driver, nome_materia, status)
+        etapa("screenshot")
+        if estado:
+            estado.atualizar(nome_materia, url_materia, status, hash_atual)
         return status
 
     except Exception as e:
         print(f"❌ Erro ao processar {nome_materia}: {e}")
-        status["observacao"] = f"Erro ({e})"
+        # Dicionário novo: a falha pode vir depois da classificação (captura, estado incremental)
+        status = {"trabalho_encontrado": False, "pendente": False, "observacao": f"Erro ({e})"}
+        obter_capturas().capturar(driver, nome_materia, erro=True)
         return status
 
+    finally:
+        tempos["total"] = round(time.perf_counter() - inicio, 3)
+        status["tempos"] = tempos
+        detalhes = ", ".join(f"{k} {v:.2f}s" for k, v in tempos.items() if k != "total")
+        print(f"⏱️ {nome_materia}: {tempos['total']:.2f}s ({detalhes})")
+
 
 # ===============================
 # 📊 RELATÓRIO FINAL
 # ===============================
 
-def gerar_relatorio():
-    caminho_log = obter_caminho_completo("logs", f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
-    data_hora = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+def registrar_com_nome_livre(con, agora, resultados, motor, pasta_logs):
+    """
+    Grava a execução no armazém com o nome do relatório e retorna esse nome.
+    O nome tem resolução de segundo: se outra execução já usou o mesmo
+    segundo (no banco ou em logs/), ganha um sufixo _2, _3...
+    """
+    base = f"relatorio_{agora.strftime('%Y%m%d_%H%M%S')}"
+    for n in itertools.count(1):
+        nome_log = f"{base}.txt" if n == 1 else f"{base}_{n}.txt"
+        if os.path.exists(os.path.join(pasta_logs, nome_log)):
+            continue
+        try:
+            armazem.registrar_execucao(con, agora, resultados, motor=motor, arquivo=nome_log)
+            return nome_log
+        except sqlite3.IntegrityError as e:
+            if "execucoes.arquivo" not in str(e):
+                raise
+
+def gerar_relatorio(motor=None, resultados=None, pasta_logs=None, caminho_banco=None):
+    """
+    Relatório .txt + armazém. `resultados` (padrão: status_materias) permite
+    gravar só parte das matérias; `pasta_logs`/`caminho_banco` separam os
+    relatórios de cada conta no modo multicontas.
+    """
+    if resultados is None:
+        resultados = status_materias
+    agora = datetime.now()
+    pasta_logs = pasta_logs or obter_caminho_completo(CONFIGURACOES["pastas"]["logs"])
+    data_hora = agora.strftime("%d/%m/%Y %H:%M:%S")
 
     print("\n" + "="*50)
     print("📊 RELATÓRIO FINAL DE PENDÊNCIAS")
     print("="*50)
     print(f"📅 Gerado em: {data_hora}")
-    print(f"📚 Total de matérias verificadas: {len(status_materias)}")
+    print(f"📚 Total de matérias verificadas: {len(resultados)}")
 
-    with open(caminho_log, "w", encoding="utf-8") as f:
-        f.write(f"RELATÓRIO MOODLE BOT - {data_hora}\n")
-        f.write("="*60 + "\n")
-        for m, s in status_materias.items():
-            simbolo = "❌" if s["pendente"] else "✅" if s["trabalho_encontrado"] else "🔍"
-            f.write(f"{simbolo} {m} - {s['observacao']}\n")
+    for m, s in resultados.items():
+        instrumentacao.registrar_materia(m, s)
+
+    # Mesma execução no armazém estruturado, ligada ao .txt pelo nome do arquivo.
+    # Vai antes do .txt para o importador do dashboard nunca o tratar como relatório avulso.
+    caminho_banco = caminho_banco or obter_caminho_completo(CONFIGURACOES["pastas"]["dados"], armazem.ARQUIVO_BANCO)
+    with instrumentacao.span("relatorio"):
+        con = armazem.conectar(caminho_banco)
+        try:
+            nome_log = registrar_com_nome_livre(con, agora, resultados, motor, pasta_logs)
+        finally:
+            con.close()
+        caminho_log = os.path.join(pasta_logs, nome_log)
+
+        # Temporário + rename: o observador do dashboard nunca lê um relatório pela metade
+        with open(caminho_log + ".tmp", "w", encoding="utf-8") as f:
+            f.write(f"RELATÓRIO MOODLE BOT - {data_hora}\n")
+            f.write("="*60 + "\n")
+            for m, s in resultados.items():
+                simbolo = "❌" if s["pendente"] else "✅" if s["trabalho_encontrado"] else "🔍"
+                f.write(f"{simbolo} {m} - {s['observacao']}\n")
+        os.replace(caminho_log + ".tmp", caminho_log)
+
+    tempos = {m: s["tempos"]["total"] for m, s in resultados.items() if s.get("tempos")}
+    if tempos:
+        print(f"⏱️ Tempo por matéria: média {sum(tempos.values()) / len(tempos):.2f}s, "
+              f"mais lenta {max(tempos, key=tempos.get)} ({max(tempos.values()):.2f}s)")
 
     print(f"📁 Relatório salvo em: {caminho_log}")
+    print(f"🗄️ Resultados gravados em: {caminho_banco}")
     print("="*50)
 
+    if CONFIGURACOES["compactacao"]["automatica"]:
+        compactar_logs(os.path.dirname(caminho_log))
+
+def compactar_logs(pasta_logs):
+    """Compactação automática depois do relatório; uma falha aqui não derruba a execução."""
+    config = CONFIGURACOES["compactacao"]
+    try:
+        resumo = compactacao.compactar(pasta_logs, config["manter_dias"], config["retencao_meses"])
+    except Exception as e:
+        print(f"⚠️ Falha ao compactar os relatórios antigos: {e}")
+        return
+    if resumo["compactados"] or resumo["apagados"]:
+        print(f"🗜️ {resumo['compactados']} relatório(s) antigo(s) compactado(s), "
+              f"{resumo['apagados']} apagado(s) pela retenção.")
+
 # ===============================
 # 🚀 EXECUÇÃO PRINCIPAL
 # ===============================
 
+def executar_selenium(estado=None, materias=None, ao_concluir=None):
+    execucao = CONFIGURACOES["execucao"]
+    sessoes = []
+
+    try:
+        sessoes = criar_pool_sessoes(execucao["sessoes"])
+        if not sessoes:
+            print("❌ Falha no login. Encerrando.")
+            return False
+
+        resultados = verificar_materias_em_paralelo(
+            sessoes, CONFIGURACOES["materias"] if materias is None else materias,
+            execucao["concorrencia"], estado, ao_concluir
+        )
+        status_materias.update(resultados)
+        return True
+    finally:
+        encerrar_pool_sessoes(sessoes or [])
+        encerrar_capturas()
+
+def executar_http(estado=None, materias=None, ao_concluir=None):
+    from motor_http import SessaoMoodleHTTP, verificar_materias_http
+
+    usuario = os.getenv("MOODLE_USER")
+    senha = os.getenv("MOODLE_PASS")
+    if not usuario or not senha:
+        print("❌ Credenciais não encontradas no arquivo .env.")
+        return False
+
+    execucao = CONFIGURACOES["execucao"]
+    limite = execucao["concorrencia"] or execucao["sessoes"]
+    sessao = SessaoMoodleHTTP(
+        CONFIGURACOES["moodle"]["url_login"],
+        tamanho_pool=max(limite, 1),
+        timeout=CONFIGURACOES["moodle"]["timeout_login"],
+        politica=obter_politica(),
+    )
+
+    try:
+        cookies = restaurar_sessao_em_cache()
+        if cookies:
+            sessao.importar_cookies(cookies)
+        else:
+            print("🌐 Fazendo login via HTTP...")
+            if not sessao.login(usuario, senha):
+                print("❌ Falha no login. Encerrando.")
+                return False
+            print("✅ Login realizado com sucesso!")
+            guardar_sessao(sessao.exportar_cookies())
+
+        status_materias.update(verificar_materias_http(
+            sessao, CONFIGURACOES["materias"] if materias is None else materias, limite, estado, ao_concluir
+        ))
+        return True
+    finally:
+        sessao.fechar()
+
+def executar_async(estado=None, materias=None, ao_concluir=None):
+    import asyncio
+    from motor_async import executar_varredura_async
+
+    usuario = os.getenv("MOODLE_USER")
+    senha = os.getenv("MOODLE_PASS")
+    if not usuario or not senha:
+        print("❌ Credenciais não encontradas no arquivo .env.")
+        return False
+
+    execucao = CONFIGURACOES["execucao"]
+    materias = CONFIGURACOES["materias"] if materias is None else materias
+    concluidas = []
+    repassar = ao_concluir
+
+    def ao_concluir(nome, status):
+        concluidas.append(nome)
+        print(f"📥 [{len(concluidas)}/{len(materias)}] {nome} concluída.")
+        if repassar:
+            repassar(nome, status)
+
+    resultados = asyncio.run(executar_varredura_async(
+        CONFIGURACOES["moodle"]["url_login"], usuario, senha, materias,
+        concorrencia=execucao["concorrencia"] or max(execucao["sessoes"], 10),
+        taxa_por_host=execucao["taxa_por_host"],
+        timeout=CONFIGURACOES["moodle"]["timeout_login"],
+        ao_concluir=ao_concluir,
+        cookies=restaurar_sessao_em_cache(),
+        ao_autenticar=guardar_sessao,
+        estado=estado,
+        politica=obter_politica(),
+    ))
+    if resultados is None:
+        print("❌ Falha no login. Encerrando.")
+        return False
+
+    status_materias.update(resultados)
+    return True
+
+def executar_ws(estado=None, materias=None, ao_concluir=None):
+    import requests
+    from cache_sessao import url_base_moodle
+    from motor_ws import ClienteMoodleWS, ErroWS, id_do_curso, varrer_cursos_ws
+
+    execucao = CONFIGURACOES["execucao"]
+    cliente = ClienteMoodleWS(
+        url_base_moodle(CONFIGURACOES["moodle"]["url_login"]),
+        token=os.getenv("MOODLE_WS_TOKEN") or None,
+        tamanho_pool=max(execucao["concorrencia"] or execucao["sessoes"], 4),
+        timeout=CONFIGURACOES["moodle"]["timeout_login"],
+        politica=obter_politica(),
+    )
+
+    try:
+        if not cliente.token:
+            usuario = os.getenv("MOODLE_USER")
+            senha = os.getenv("MOODLE_PASS")
+            if not usuario or not senha:
+                print("❌ Sem MOODLE_WS_TOKEN e sem credenciais no arquivo .env.")
+                return False
+            print("🔑 Obtendo token da API do Moodle...")
+            if not cliente.obter_token(usuario, senha):
+                print("❌ O Moodle não emitiu o token (serviço de web services desativado?). Encerrando.")
+                return False
+
+        # Os nomes configurados continuam valendo para os cursos já conhecidos
+        nomes_por_id = {id_do_curso(url): nome for nome, url in CONFIGURACOES["materias"].items()}
+        # materias=None: todos os cursos que a API descobrir; na retomada, só os que faltaram
+        resultados = varrer_cursos_ws(cliente, nomes_por_id, None if materias is None else set(materias))
+        for nome, status in resultados.items():
+            if ao_concluir:
+                ao_concluir(nome, status)
+        status_materias.update(resultados)
+        return True
+    except ErroWS as e:
+        print(f"❌ Erro na API do Moodle: {e}")
+        return False
+    except (requests.RequestException, ValueError) as e:
+        # Conexão, timeout ou resposta que não é JSON: mesma saída dos outros motores
+        print(f"❌ Falha ao acessar a API do Moodle: {e}")
+        return False
+    finally:
+        cliente.fechar()
+
+def materias_da_execucao(motor, checkpoint, retomar=False):
+    """
+    Abre (ou retoma) o checkpoint e devolve as matérias a verificar
+    ({nome: url}). None = motor ws sem restrição: a API descobre todos os
+    cursos do usuário. Na retomada vêm só as que faltaram ou falharam, e as
+    já concluídas entram em status_materias se o relatório ainda não saiu.
+    """
+    materias = CONFIGURACOES["materias"]
+    if not retomar:
+        interrompida = checkpoint.pendente()
+        if interrompida:
+            print(f"💡 A execução de {interrompida['inicio']} (parada em {interrompida['concluidas']}/"
+                  f"{interrompida['total']} matéria(s)) foi descartada; --retomar continuaria dela.")
+        checkpoint.iniciar(motor, materias)
+        return None if motor == "ws" else dict(materias)
+
+    prontas, relatorio_gravado = checkpoint.retomar(motor, materias)
+    if not relatorio_gravado:
+        # O processo caiu antes do relatório: as matérias já concluídas entram neste
+        status_materias.update(prontas)
+    if motor == "ws" and not prontas:
+        return None
+    faltam = {nome: url for nome, url in materias.items() if nome not in prontas}
+    if motor == "ws":
+        # Cursos descobertos pela API que falharam também são consultados de novo
+        faltam.update({nome: None for nome in checkpoint.com_erro() if nome not in faltam})
+    return faltam
+
+MOTORES = {
+    "selenium": executar_selenium,
+    "http": executar_http,
+    "async": executar_async,
+    "ws": executar_ws,
+}
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Moodle Bot — verificação de pendências")
+    parser.add_argument(
+        "--engine", choices=sorted(MOTORES), default=os.getenv("MOODLE_ENGINE", "selenium"),
+        help="selenium (Chrome, com screenshots), http (sem navegador), async (aiohttp, alto volume) "
+             "ou ws (API de Web Services do Moodle)"
+    )
+    parser.add_argument(
+        "--completo", action="store_true",
+        help="ignora o estado incremental e reclassifica todas as matérias"
+    )
+    parser.add_argument(
+        "--retomar", "--resume", action="store_true",
+        help="continua a última execução interrompida, varrendo só as matérias que faltaram ou falharam"
+    )
+    args = parser.parse_args()
+
     criar_pastas()
-    driver, profile_path = iniciar_driver()
+    instrumentacao.iniciar_execucao(args.engine)
+
+    estado = None
+    if CONFIGURACOES["execucao"]["incremental"]:
+        estado = EstadoIncremental(obter_caminho_completo(CONFIGURACOES["pastas"]["cache"]))
+        if args.completo:
+            estado.materias = {}
+
+    # Cada matéria concluída vai para o checkpoint na hora; se o processo cair, --retomar continua daí
+    from resiliencia import Checkpoint
+    checkpoint = Checkpoint(obter_caminho_completo(CONFIGURACOES["pastas"]["cache"]),
+                            CONFIGURACOES["resiliencia"]["validade_checkpoint_h"])
+    materias = materias_da_execucao(args.engine, checkpoint, args.retomar)
 
     try:
-        if not fazer_login(driver):
-            print("❌ Falha no login. Encerrando.")
-            driver.quit()
+        if materias is not None and not materias and not status_materias:
+            print("ℹ️ Nada a retomar: as matérias concluídas já estão no relatório anterior.")
+            checkpoint.concluir()
+            exit()
+        if (materias is None or materias) and not MOTORES[args.engine](estado, materias, checkpoint.registrar):
             exit()
 
-        for nome, url in CONFIGURACOES["materias"].items():
-            status_materias[nome] = verificar_materia(driver, nome, url)
+        if estado:
+            estado.salvar()
 
-        gerar_relatorio()
+        gerar_relatorio(args.engine)
+        falhas = [m for m, s in status_materias.items() if s.get("observacao", "").startswith("Erro")]
+        if falhas:
+            # Um --retomar depois daqui traz só as matérias varridas de novo: as demais já estão neste relatório
+            checkpoint.registrar_relatorio()
+            print(f"⚠️ {len(falhas)} matéria(s) com erro ({', '.join(falhas)}); "
+                  f"--retomar varre só elas.")
+        else:
+            checkpoint.concluir()
         print("\n🏁 Bot finalizado com sucesso!")
 
     finally:
-        driver.quit()
-        if os.path.exists(profile_path):
-            shutil.rmtree(profile_path, ignore_errors=True)
-            print("🧹 Perfil temporário do Chrome removido.")
+        pasta_metricas = instrumentacao.finalizar_execucao(obter_caminho_completo(CONFIGURACOES["pastas"]["dados"]))
+        print(f"⏱️ Spans e métricas em: {pasta_metricas}")
         print("\n📊 Para abrir o painel:")
         print("   python -m streamlit run dashboard/app.py")
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Cache persistente e criptografado da sessão do Moodle.
+
+Guarda os cookies (MoodleSession incluso) com data de expiração. Na próxima
+execução uma única requisição barata confirma se a sessão ainda vale; só
+se não valer o bot passa pelo login completo.
+
+A chave vem de MOODLE_CACHE_KEY (Fernet, base64) ou de um arquivo gerado
+na primeira execução na pasta de configuração do usuário (%APPDATA% ou
+~/.config, em moodle_bot/), fora de cache/: copiar a pasta do cache não
+leva junto a chave que abre os cookies.
+"""
+import json
+import os
+import time
+
+import requests
+from cryptography.fernet import Fernet, InvalidToken
+
+import instrumentacao
+
+ARQUIVO_CACHE = "sessao.bin"
+ARQUIVO_CHAVE = ".chave_sessao"
+PASTA_CONFIG = "moodle_bot"
+
+
+def url_base_moodle(url_login):
+    """'https://x/moodle/login/index.php' -> 'https://x/moodle'."""
+    return (url_login or "").split("/login/")[0].rstrip("/")
+
+def caminho_chave():
+    """Arquivo da chave gerada, na pasta de configuração do usuário."""
+    base = os.getenv("APPDATA") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, PASTA_CONFIG, ARQUIVO_CHAVE)
+
+def _fernet(pasta):
+    chave = os.getenv("MOODLE_CACHE_KEY")
+    if not chave:
+        caminho = caminho_chave()
+        if not os.path.exists(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            # Versões antigas geravam a chave em cache/: ela é levada para fora
+            # (e sai de lá), para o cache já gravado continuar legível
+            antiga = os.path.join(pasta, ARQUIVO_CHAVE)
+            if os.path.exists(antiga):
+                with open(antiga, "rb") as f:
+                    chave_nova = f.read().strip()
+            else:
+                chave_nova = Fernet.generate_key()
+            with open(caminho, "wb") as f:
+                f.write(chave_nova)
+            os.chmod(caminho, 0o600)
+            if os.path.exists(antiga):
+                os.remove(antiga)
+        with open(caminho, "rb") as f:
+            chave = f.read().strip()
+    return Fernet(chave)
+
+def salvar_sessao(pasta, usuario, cookies, validade_h):
+    """Grava os cookies criptografados, válidos por `validade_h` horas."""
+    dados = {
+        "usuario": usuario,
+        "cookies": cookies,
+        "criado_em": time.time(),
+        "expira_em": time.time() + validade_h * 3600,
+    }
+    caminho = os.path.join(pasta, ARQUIVO_CACHE)
+    with open(caminho, "wb") as f:
+        f.write(_fernet(pasta).encrypt(json.dumps(dados).encode("utf-8")))
+    os.chmod(caminho, 0o600)
+
+def carregar_sessao(pasta, usuario):
+    """Retorna a lista de cookies em cache, ou None se não houver/expirou/for de outro usuário."""
+    caminho = os.path.join(pasta, ARQUIVO_CACHE)
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, "rb") as f:
+            dados = json.loads(_fernet(pasta).decrypt(f.read()))
+    except (InvalidToken, ValueError, OSError) as e:
+        print(f"⚠️ Cache de sessão ilegível ({e.__class__.__name__}) — descartando.")
+        apagar_sessao(pasta)
+        return None
+
+    if dados.get("usuario") != usuario or dados.get("expira_em", 0) < time.time():
+        apagar_sessao(pasta)
+        return None
+    return dados.get("cookies") or None
+
+def apagar_sessao(pasta):
+    caminho = os.path.join(pasta, ARQUIVO_CACHE)
+    if os.path.exists(caminho):
+        os.remove(caminho)
+
+@instrumentacao.span("validacao_sessao")
+def sessao_valida(url_login, cookies, timeout=10):
+    """
+    Uma única requisição ao painel (/my/) sem seguir redirecionamentos:
+    redirecionamento para o login = expirada. Outros redirecionamentos
+    valem como sessão viva (no Moodle 4.x com o painel desativado, /my/
+    manda para /my/courses.php).
+    """
+    try:
+        resposta = requests.get(
+            f"{url_base_moodle(url_login)}/my/",
+            cookies={c["name"]: c["value"] for c in cookies},
+            allow_redirects=False,
+            timeout=timeout,
+        )
+    except requests.RequestException:
+        return False
+    if resposta.is_redirect:
+        return "login/index.php" not in resposta.headers.get("Location", "")
+    return resposta.status_code == 200
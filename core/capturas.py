@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Screenshots das matérias fora do caminho crítico da varredura.
+
+A thread da varredura só pede os bytes PNG ao navegador e os coloca numa
+fila; uma thread de fundo reduz a imagem, calcula o hash perceptual (dHash),
+no modo sempre descarta capturas praticamente iguais à anterior da mesma
+matéria, grava em WebP/JPEG com nome datado e aplica a retenção (idade máxima e quantidade por
+matéria). O índice screenshots/indice.json guarda, por matéria, as capturas
+mantidas e a assinatura do último status capturado.
+
+Modos (MOODLE_CAPTURAS): desligado, mudanca (status mudou desde a última
+captura), erro (só quando a verificação falha) ou sempre. Fora do modo
+desligado, falhas na verificação sempre geram captura.
+"""
+import hashlib
+import io
+import json
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+MODOS = ("desligado", "mudanca", "erro", "sempre")
+FORMATOS = {"webp": ("WEBP", ".webp"), "jpeg": ("JPEG", ".jpg"), "png": ("PNG", ".png")}
+ARQUIVO_INDICE = "indice.json"
+# Distância de Hamming (em 64 bits) abaixo da qual duas capturas são "a mesma tela"
+LIMIAR_DUPLICADA = 4
+RE_NOME_INVALIDO = re.compile(r"[^\w.-]+")
+
+
+def assinatura_status(status):
+    """Resumo do status de uma matéria: muda quando alguma atividade muda de situação."""
+    chave = [status.get("pendente"), status.get("observacao", "")] + sorted(
+        (str(a.get("cmid")), a.get("status")) for a in status.get("detalhe_atividades") or []
+    )
+    return hashlib.sha1(json.dumps(chave).encode("utf-8")).hexdigest()[:16]
+
+def dhash(imagem, tamanho=8):
+    """Hash perceptual por diferença: 64 bits comparando pixels vizinhos em 9x8 tons de cinza."""
+    from PIL import Image
+    pequena = imagem.convert("L").resize((tamanho + 1, tamanho), Image.Resampling.BILINEAR)
+    pixels = list(pequena.getdata())
+    bits = 0
+    for linha in range(tamanho):
+        for coluna in range(tamanho):
+            esquerda = pixels[linha * (tamanho + 1) + coluna]
+            bits = (bits << 1) | (esquerda > pixels[linha * (tamanho + 1) + coluna + 1])
+    return bits
+
+def distancia(hash_a, hash_b):
+    return bin(hash_a ^ hash_b).count("1")
+
+
+class GravadorCapturas:
+    """Fila de screenshots processada por uma única thread de fundo."""
+
+    def __init__(self, pasta, modo="mudanca", formato="webp", qualidade=70, largura_max=1280,
+                 retencao_dias=30, max_por_materia=20):
+        self.pasta = pasta
+        self.modo = modo if modo in MODOS else "mudanca"
+        self.formato, self.extensao = FORMATOS.get(formato, FORMATOS["webp"])
+        self.qualidade = qualidade
+        self.largura_max = largura_max
+        self.retencao_s = retencao_dias * 86400
+        self.max_por_materia = max_por_materia
+
+        self.indice = self._carregar_indice()
+        self.trava = threading.Lock()
+        self.fila = queue.Queue()
+        self.gravadas = self.duplicadas = 0
+        self.thread = None
+
+    def _carregar_indice(self):
+        try:
+            with open(os.path.join(self.pasta, ARQUIVO_INDICE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _salvar_indice(self):
+        caminho = os.path.join(self.pasta, ARQUIVO_INDICE)
+        with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.indice, f, ensure_ascii=False, indent=1)
+        os.replace(caminho + ".tmp", caminho)
+
+    # ---- decisão (thread da varredura) ----
+
+    def deve_capturar(self, materia, status=None, erro=False):
+        """Decide pelo modo; em 'mudanca' compara com a assinatura da última captura da matéria."""
+        if self.modo == "desligado":
+            return False
+        if self.modo == "erro" or erro:
+            return erro
+        if self.modo == "sempre":
+            return True
+        with self.trava:
+            anterior = self.indice.get(materia, {}).get("assinatura")
+        return anterior != assinatura_status(status or {})
+
+    def capturar(self, driver, materia, status=None, erro=False):
+        """Pede os bytes ao navegador (única parte bloqueante) e enfileira o resto."""
+        if not self.deve_capturar(materia, status, erro):
+            return False
+        try:
+            png = driver.get_screenshot_as_png()
+        except Exception as e:
+            print(f"⚠️ Screenshot de {materia} indisponível ({e}).")
+            return False
+        assinatura = None if erro else assinatura_status(status or {})
+        with self.trava:
+            # Marca já: outra varredura da mesma matéria não enfileira a mesma mudança de novo
+            self.indice.setdefault(materia, {"arquivos": []})["assinatura"] = assinatura
+        self._iniciar()
+        self.fila.put((materia, png, datetime.now(), erro))
+        return True
+
+    # ---- processamento (thread de fundo) ----
+
+    def _iniciar(self):
+        with self.trava:
+            if self.thread is None:
+                os.makedirs(self.pasta, exist_ok=True)
+                self.thread = threading.Thread(target=self._trabalhar, name="capturas", daemon=True)
+                self.thread.start()
+
+    def _trabalhar(self):
+        while True:
+            item = self.fila.get()
+            try:
+                if item is None:
+                    return
+                self._processar(*item)
+            except Exception as e:
+                print(f"⚠️ Falha ao gravar screenshot de {item[0]}: {e}")
+            finally:
+                self.fila.task_done()
+
+    def _processar(self, materia, png, quando, erro):
+        from PIL import Image
+
+        imagem = Image.open(io.BytesIO(png))
+        if imagem.width > self.largura_max:
+            imagem = imagem.resize(
+                (self.largura_max, round(imagem.height * self.largura_max / imagem.width)), Image.Resampling.LANCZOS
+            )
+        hash_imagem = dhash(imagem)
+
+        with self.trava:
+            entrada = self.indice.setdefault(materia, {"arquivos": []})
+            ultima = entrada["arquivos"][-1] if entrada["arquivos"] else None
+        # Só no modo 'sempre' a tela pode repetir: mudança de status ou erro sempre ficam gravados
+        if ultima and self.modo == "sempre" and not erro and distancia(int(ultima["dhash"], 16), hash_imagem) <= LIMIAR_DUPLICADA:
+            with self.trava:
+                ultima["visto_em"] = quando.isoformat(timespec="seconds")
+                self._salvar_indice()
+            self.duplicadas += 1
+            return
+
+        base = f"tela_{RE_NOME_INVALIDO.sub('_', materia)}_{quando.strftime('%Y%m%d_%H%M%S')}" + ("_erro" if erro else "")
+        nome, n = base + self.extensao, 1
+        while os.path.exists(os.path.join(self.pasta, nome)):
+            n += 1
+            nome = f"{base}_{n}{self.extensao}"
+        opcoes = {"quality": self.qualidade} if self.formato != "PNG" else {"optimize": True}
+        imagem.convert("RGB").save(os.path.join(self.pasta, nome), self.formato, **opcoes)
+        self.gravadas += 1
+
+        with self.trava:
+            entrada["arquivos"].append({
+                "arquivo": nome,
+                "datahora": quando.isoformat(timespec="seconds"),
+                "dhash": f"{hash_imagem:016x}",
+                "erro": erro,
+            })
+            self._aplicar_retencao(entrada)
+            self._salvar_indice()
+
+    def _aplicar_retencao(self, entrada):
+        limite = datetime.fromtimestamp(time.time() - self.retencao_s).isoformat(timespec="seconds")
+        arquivos = entrada["arquivos"]
+        # A captura mais recente fica sempre, mesmo antiga
+        recentes = [a for a in arquivos[:-1] if a["datahora"] >= limite]
+        manter = recentes[max(0, len(recentes) - self.max_por_materia + 1):] + arquivos[-1:]
+        for antigo in arquivos:
+            if antigo not in manter:
+                try:
+                    os.remove(os.path.join(self.pasta, antigo["arquivo"]))
+                except OSError:
+                    pass
+        entrada["arquivos"] = manter
+
+    def fechar(self):
+        """Espera a fila esvaziar e encerra a thread de fundo."""
+        with self.trava:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return
+        self.fila.put(None)
+        thread.join()
+        if self.gravadas or self.duplicadas:
+            print(f"📸 Screenshots: {self.gravadas} gravado(s), {self.duplicadas} repetido(s) descartado(s) "
+                  f"em {self.pasta}")
+        self.gravadas = self.duplicadas = 0
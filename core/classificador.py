@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Classificação das atividades de uma página de curso do Moodle.
+Usado tanto pelo motor Selenium quanto pelo motor HTTP, que só diferem
+na forma de obter o HTML.
+
+O HTML é lido com lxml e cada bloco de atividade é percorrido uma única
+vez: na mesma passada saem o texto do bloco, o nome, o link e as linhas
+de data. As palavras-chave são casadas por regex pré-compiladas.
+"""
+import re
+import time
+
+from lxml import etree, html as lxml_html
+
+from atividades import Atividade, extrair_cmid, extrair_tipo, extrair_vencimento, resolver_url
+
+# Palavras-chave de status (ajuste conforme seu tema)
+KW_PENDENTE = ["pendente", "não enviado", "nao enviado", "não entregue", "nao entregue", "aguardando envio", "não enviado ainda", "atrasado"]
+KW_ENTREGUE = ["enviado", "entregue", "concluído", "concluido", "em dia", "feito", "submetido", "enviada"]
+
+# Heurísticas por classes conhecidas, quando o texto não diz nada
+KW_CLASSE_PENDENTE = ["notattempted", "submissionnotgraded", "overdue"]
+KW_CLASSE_ENTREGUE = ["completed", "submissionstatussubmitted", "submitted"]
+
+
+def _compilar(palavras):
+    """Uma regex com todas as palavras (maiores primeiro), casando como substring."""
+    return re.compile("|".join(re.escape(p.lower()) for p in sorted(set(palavras), key=len, reverse=True)))
+
+RE_PENDENTE = _compilar(KW_PENDENTE)
+RE_ENTREGUE = _compilar(KW_ENTREGUE)
+RE_CLASSE_PENDENTE = _compilar(KW_CLASSE_PENDENTE)
+RE_CLASSE_ENTREGUE = _compilar(KW_CLASSE_ENTREGUE)
+
+
+def _xpath_classe(*classes):
+    """Predicado XPath equivalente a `.classe` do CSS (qualquer uma das classes)."""
+    return " or ".join(f"contains(concat(' ', normalize-space(@class), ' '), ' {c} ')" for c in classes)
+
+XPATH_ATIVIDADES = etree.XPath(f"//*[(self::li or self::div) and ({_xpath_classe('activity')})]")
+XPATH_ATIVIDADES_ALTERNATIVAS = etree.XPath(
+    f"//*[{_xpath_classe('activityinstance', 'assign', 'modtype_assign', 'activityitem')}]"
+)
+
+CLASSES_NOME = {"instancename", "activityname", "aalink"}
+TAGS_SEM_TEXTO = {"script", "style"}
+
+
+class _LeituraBloco:
+    """
+    Tudo o que a classificação precisa de um bloco, coletado numa única
+    passada. O texto dos badges de status (.badge, .status, ...) já faz
+    parte do texto do bloco, então não há busca separada por eles.
+    """
+
+    __slots__ = ("textos", "nome", "href", "datas", "_nome_achado")
+
+    def __init__(self, bloco):
+        self.textos = []     # pedaços de texto não vazios, na ordem do documento
+        self.nome = None     # texto do primeiro .instancename/.activityname/.aalink
+        self.href = None     # primeiro <a href>
+        self.datas = []      # texto de cada <div> dentro do bloco de datas
+        self._nome_achado = False
+        self._percorrer(bloco, dentro_datas=False)
+
+    def _adicionar(self, texto):
+        if texto:
+            texto = texto.strip()
+            if texto:
+                self.textos.append(texto)
+
+    def _percorrer(self, el, dentro_datas):
+        inicio = len(self.textos)
+        tag = el.tag
+        classes = el.get("class")
+        classes = set(classes.split()) if classes else ()
+
+        if self.href is None and tag == "a":
+            self.href = el.get("href")
+        # O primeiro elemento de nome na ordem do documento (o externo, se aninhados)
+        eh_nome = not self._nome_achado and not CLASSES_NOME.isdisjoint(classes)
+        if eh_nome:
+            self._nome_achado = True
+        # Mesma ordem do documento para as linhas de data: reserva a posição na abertura
+        indice_data = None
+        if dentro_datas and tag == "div":
+            indice_data = len(self.datas)
+            self.datas.append("")
+        dentro_datas = dentro_datas or "activity-dates" in classes or el.get("data-region") == "activity-dates"
+
+        if tag not in TAGS_SEM_TEXTO:
+            self._adicionar(el.text)
+            for filho in el:
+                if isinstance(filho.tag, str):
+                    self._percorrer(filho, dentro_datas)
+                self._adicionar(filho.tail)
+
+        if eh_nome:
+            self.nome = " ".join(self.textos[inicio:])
+        if indice_data is not None:
+            self.datas[indice_data] = " ".join(self.textos[inicio:])
+
+
+def _situacao(texto, classes):
+    if RE_PENDENTE.search(texto):
+        return "pendente"
+    if RE_ENTREGUE.search(texto):
+        return "entregue"
+    classes = classes.lower()
+    if RE_CLASSE_PENDENTE.search(classes):
+        return "pendente"
+    if RE_CLASSE_ENTREGUE.search(classes):
+        return "entregue"
+    return "indefinido"
+
+def ler_documento(html):
+    """Árvore lxml do HTML, ou None se vazio/ilegível."""
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml_html.fromstring(html)
+    except ValueError:
+        # str com declaração de encoding: o lxml exige bytes
+        try:
+            return lxml_html.fromstring(html.encode("utf-8"))
+        except (ValueError, etree.ParserError):
+            # Só a declaração, ou nada legível depois dela: página vazia
+            return None
+    except etree.ParserError:
+        return None
+
+def resumir_status(nome_materia, detalhe):
+    """
+    Monta o status da matéria (o mesmo consumido por gerar_relatorio, pelo
+    armazém e pelo dashboard) a partir do registro de cada atividade.
+    """
+    status = {"trabalho_encontrado": False, "pendente": False, "observacao": "",
+              "pendentes": 0, "entregues": 0, "atividades": 0, "detalhe_atividades": []}
+
+    if not detalhe:
+        status["observacao"] = "Nenhuma atividade detectada"
+        print(f"🔍 {nome_materia}: sem atividades visíveis.")
+        return status
+
+    vistos = len(detalhe)
+    pendentes = sum(1 for a in detalhe if a["status"] == "pendente")
+    entregues = sum(1 for a in detalhe if a["status"] == "entregue")
+    status.update({"pendentes": pendentes, "entregues": entregues, "atividades": vistos,
+                   "detalhe_atividades": detalhe})
+
+    if pendentes > 0:
+        status.update({
+            "trabalho_encontrado": True,
+            "pendente": True,
+            "observacao": f"{pendentes} pendência(s) detectada(s) em {vistos} atividade(s) visível(is)"
+        })
+        print(f"❌ {nome_materia}: {pendentes} pendência(s) ({vistos} atividades analisadas).")
+    elif entregues > 0:
+        status.update({
+            "trabalho_encontrado": True,
+            "pendente": False,
+            "observacao": f"{entregues} tarefa(s) entregue(s) em {vistos} atividade(s)"
+        })
+        print(f"✅ {nome_materia}: em dia ({entregues} entregues, {vistos} atividades).")
+    else:
+        status["observacao"] = f"Sem status identificado (analisadas {vistos} atividades)"
+        print(f"🟣 {nome_materia}: sem status claro ({vistos} atividades).")
+
+    return status
+
+def classificar_html(nome_materia, html, url_base=None):
+    """
+    Lê o HTML de uma matéria e detecta pendências olhando títulos e
+    badges/labels de status.
+    Além do resumo, devolve as contagens e um registro por atividade
+    (cmid, tipo, nome, vencimento, status, url) em `detalhe_atividades`
+    e, em `tempos`, a duração do parse e da classificação (segundos).
+    """
+    inicio = time.perf_counter()
+    raiz = ler_documento(html)
+    lido = time.perf_counter()
+    status = classificar_documento(nome_materia, raiz, url_base)
+    status["tempos"] = {"parse": round(lido - inicio, 4), "classificacao": round(time.perf_counter() - lido, 4)}
+    return status
+
+def classificar_documento(nome_materia, raiz, url_base=None):
+    """Como `classificar_html`, sobre a árvore já lida (permite medir parse e classificação em separado)."""
+    atividades = []
+    if raiz is not None:
+        atividades = XPATH_ATIVIDADES(raiz)
+        if not atividades:
+            # Alternativas comuns de temas
+            atividades = XPATH_ATIVIDADES_ALTERNATIVAS(raiz)
+
+    detalhe = []
+    for bloco in atividades:
+        leitura = _LeituraBloco(bloco)
+        texto_original = " ".join(leitura.textos)
+        texto = texto_original.lower()
+        classes = bloco.get("class") or ""
+
+        situacao = _situacao(texto, classes)
+        url = resolver_url(leitura.href, url_base)
+        detalhe.append(Atividade(
+            nome_materia,
+            extrair_cmid(bloco.get("id"), url, bloco.get("data-id")),
+            extrair_tipo(classes),
+            leitura.nome if leitura.nome is not None else texto[:80],
+            extrair_vencimento(leitura.datas or [texto_original]),
+            situacao,
+            url,
+        ).como_dict())
+
+    return resumir_status(nome_materia, detalhe)
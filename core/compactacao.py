@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Compactação e retenção dos relatórios .txt.
+
+Cada execução deixa um relatorio_*.txt em logs/. Com o tempo a pasta
+acumula dezenas de milhares de arquivos pequenos e listar/abrir cada um
+passa a dominar a leitura do histórico. A compactação junta os relatórios
+mais antigos que `manter_dias` em um segmento colunar por mês
+(logs/arquivo/relatorios_AAAAMM.feather, Feather com zstd) e apaga os .txt
+de origem; os recentes ficam como estão. Com `retencao_meses`, segmentos e
+relatórios de meses mais antigos que isso são apagados.
+
+O segmento guarda as mesmas colunas que o importador extrai dos .txt
+(arquivo, datahora, matéria, status, detalhes), e o armazém lê os segmentos
+junto com os .txt restantes: o histórico do dashboard não muda.
+
+    python core/compactacao.py [--logs logs] [--manter-dias 30] [--retencao-meses 0]
+"""
+import argparse
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import armazem
+
+RE_SEGMENTO = re.compile(r"^relatorios_(\d{4})(\d{2})\.feather$")
+COLUNAS = ("arquivo", "datahora", "materia", "status", "detalhes")
+
+
+def _mes(datahora):
+    return datahora.year * 12 + datahora.month - 1
+
+def listar_segmentos(pasta_logs):
+    """Segmentos mensais (os.DirEntry) da pasta de relatórios, do mais antigo ao mais novo."""
+    pasta = os.path.join(pasta_logs, armazem.PASTA_ARQUIVO)
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(
+        (e for e in os.scandir(pasta) if RE_SEGMENTO.match(e.name) and e.is_file()),
+        key=lambda e: e.name,
+    )
+
+def arquivos_do_segmento(caminho):
+    """Nomes dos relatórios guardados no segmento (só a coluna `arquivo` é lida)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import feather
+
+    coluna = feather.read_table(caminho, columns=["arquivo"]).column("arquivo")
+    return pc.unique(pc.cast(coluna, pa.string())).to_pylist()
+
+def ler_segmento(caminho, ignorar=None):
+    """
+    Colunas (listas paralelas, como em armazem.ler_relatorios_em_lote) de um
+    segmento, sem as linhas dos relatórios em `ignorar` (filtradas no Arrow).
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from pyarrow import feather
+
+    tabela = feather.read_table(caminho)
+    if ignorar:
+        arquivos = pc.cast(tabela.column("arquivo"), pa.string())
+        tabela = tabela.filter(pc.invert(pc.is_in(arquivos, value_set=pa.array(list(ignorar), pa.string()))))
+    # Colunas com dicionário viram texto antes: to_pylist direto nelas é várias vezes mais lento
+    return {
+        coluna: (pc.cast(tabela.column(coluna), pa.string()) if coluna != "datahora" else tabela.column(coluna)).to_pylist()
+        for coluna in COLUNAS
+    }
+
+def gravar_segmento(caminho, colunas):
+    """Grava o segmento de uma vez (arquivo temporário + rename): quem lê nunca vê um pela metade."""
+    import pyarrow as pa
+    from pyarrow import feather
+
+    ordem = sorted(range(len(colunas["arquivo"])), key=lambda i: (colunas["datahora"][i], colunas["arquivo"][i]))
+    tabela = pa.table({
+        "arquivo": pa.array([colunas["arquivo"][i] for i in ordem], pa.string()).dictionary_encode(),
+        "datahora": pa.array([colunas["datahora"][i] for i in ordem], pa.timestamp("s")),
+        # Poucas matérias e três status repetidos em todas as linhas: dicionário
+        "materia": pa.array([colunas["materia"][i] for i in ordem], pa.string()).dictionary_encode(),
+        "status": pa.array([colunas["status"][i] for i in ordem], pa.string()).dictionary_encode(),
+        "detalhes": pa.array([colunas["detalhes"][i] for i in ordem], pa.string()),
+    })
+    temporario = caminho + ".tmp"
+    feather.write_feather(tabela, temporario, compression="zstd")
+    os.replace(temporario, caminho)
+
+def compactar(pasta_logs, manter_dias=30, retencao_meses=0, agora=None):
+    """
+    Compacta os relatórios mais antigos que `manter_dias` nos segmentos do
+    mês e aplica a retenção (`retencao_meses` = 0 guarda tudo). Retorna
+    {"compactados", "segmentos", "apagados"}.
+    """
+    agora = agora or datetime.now()
+    corte = agora - timedelta(days=manter_dias)
+    mes_limite = _mes(agora) - retencao_meses if retencao_meses > 0 else None
+    pasta_arquivo = os.path.join(pasta_logs, armazem.PASTA_ARQUIVO)
+    resumo = {"compactados": 0, "segmentos": 0, "apagados": 0}
+
+    por_mes = defaultdict(list)
+    for entrada in os.scandir(pasta_logs):
+        if not entrada.name.endswith(".txt") or not entrada.is_file():
+            continue
+        datahora = armazem.datahora_do_arquivo(entrada.name)
+        if datahora is None or datahora >= corte:
+            continue
+        if mes_limite is not None and _mes(datahora) < mes_limite:
+            os.remove(entrada.path)
+            resumo["apagados"] += 1
+            continue
+        por_mes[f"{datahora:%Y%m}"].append(entrada.path)
+
+    if por_mes:
+        os.makedirs(pasta_arquivo, exist_ok=True)
+    for mes, caminhos in sorted(por_mes.items()):
+        novas = armazem.ler_relatorios_em_lote(sorted(caminhos))
+        if not novas["arquivo"]:
+            continue
+        segmento = os.path.join(pasta_arquivo, f"relatorios_{mes}.feather")
+        if os.path.exists(segmento):
+            # Um relatório que já está no segmento (compactação interrompida) fica com a versão do .txt
+            existente = ler_segmento(segmento, ignorar=set(novas["arquivo"]))
+            for coluna in COLUNAS:
+                novas[coluna].extend(existente[coluna])
+        gravar_segmento(segmento, novas)
+        resumo["segmentos"] += 1
+
+        # Só sai da pasta o que já está no segmento; ilegíveis e relatórios sem linhas ficam
+        gravados = set(novas["arquivo"])
+        for caminho in caminhos:
+            if os.path.basename(caminho) in gravados:
+                os.remove(caminho)
+                resumo["compactados"] += 1
+
+    if mes_limite is not None:
+        for entrada in listar_segmentos(pasta_logs):
+            ano, mes = RE_SEGMENTO.match(entrada.name).groups()
+            if int(ano) * 12 + int(mes) - 1 < mes_limite:
+                os.remove(entrada.path)
+                resumo["apagados"] += 1
+    return resumo
+
+
+if __name__ == "__main__":
+    from bot_visual import CONFIGURACOES, obter_caminho_completo
+
+    config = CONFIGURACOES["compactacao"]
+    parser = argparse.ArgumentParser(description="Compacta os relatórios .txt antigos em segmentos mensais")
+    parser.add_argument("--logs", default=obter_caminho_completo(CONFIGURACOES["pastas"]["logs"]),
+                        help="pasta dos relatórios (no modo multicontas: contas/<nome>/logs)")
+    parser.add_argument("--manter-dias", type=float, default=config["manter_dias"],
+                        help="relatórios mais novos que isso ficam como .txt")
+    parser.add_argument("--retencao-meses", type=int, default=config["retencao_meses"],
+                        help="apaga relatórios de meses mais antigos que isso (0 = guarda tudo)")
+    args = parser.parse_args()
+
+    resumo = compactar(args.logs, args.manter_dias, args.retencao_meses)
+    print(f"🗜️ {resumo['compactados']} relatório(s) compactado(s) em {resumo['segmentos']} segmento(s), "
+          f"{resumo['apagados']} arquivo(s) apagado(s) pela retenção.")
@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""
+Modo daemon: mantém o bot rodando e varre as matérias periodicamente.
+
+O processo, os imports, o navegador (ou a sessão HTTP / o token da API) e
+o login ficam quentes entre uma varredura e outra; a sessão só é refeita
+quando o Moodle deixa de aceitá-la. Cada matéria tem seu intervalo (com
+variação aleatória), e um endpoint local permite pedir uma varredura na hora:
+
+    python core/daemon.py --engine=http
+
+    curl -X POST http://127.0.0.1:8766/varrer              # todas
+    curl -X POST "http://127.0.0.1:8766/varrer?materia=Redes"
+    curl http://127.0.0.1:8766/status
+    curl http://127.0.0.1:8766/metrics                     # formato Prometheus
+    curl -X POST http://127.0.0.1:8766/parar
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import bot_visual
+import instrumentacao
+from bot_visual import CONFIGURACOES, obter_caminho_completo
+from estado_incremental import EstadoIncremental
+
+
+def ler_intervalos(texto):
+    """'Redes=10, IOT=120' -> {'Redes': 600.0, 'IOT': 7200.0} (segundos)."""
+    intervalos = {}
+    for parte in (texto or "").split(","):
+        nome, _, minutos = parte.partition("=")
+        if nome.strip() and minutos.strip():
+            intervalos[nome.strip()] = float(minutos) * 60
+    return intervalos
+
+
+# ===============================
+# 🗓️ AGENDA
+# ===============================
+
+class Agenda:
+    """Próxima varredura de cada matéria (relógio monotônico), com jitter."""
+
+    def __init__(self, materias, intervalo_s, intervalos=None, jitter=0.1, rnd=None):
+        self.intervalo_s = intervalo_s
+        self.intervalos = intervalos or {}
+        self.jitter = jitter
+        self.rnd = rnd or random.Random()
+        self.proximas = {}
+        self.trava = threading.Lock()
+        self.adicionar(materias)
+
+    def adicionar(self, materias, agora=None):
+        """Matérias novas entram para varredura imediata."""
+        agora = time.monotonic() if agora is None else agora
+        with self.trava:
+            for materia in materias:
+                self.proximas.setdefault(materia, agora)
+
+    def _intervalo(self, materia):
+        base = self.intervalos.get(materia, self.intervalo_s)
+        return base * (1 + self.rnd.uniform(-self.jitter, self.jitter))
+
+    def vencidas(self, agora=None):
+        agora = time.monotonic() if agora is None else agora
+        with self.trava:
+            return [m for m, quando in self.proximas.items() if quando <= agora]
+
+    def reagendar(self, materias, agora=None):
+        agora = time.monotonic() if agora is None else agora
+        with self.trava:
+            for materia in materias:
+                self.proximas[materia] = agora + self._intervalo(materia)
+
+    def antecipar(self, materias=None, agora=None):
+        """Marca as matérias (ou todas) para já. Retorna as que existem na agenda."""
+        agora = time.monotonic() if agora is None else agora
+        with self.trava:
+            alvo = list(self.proximas) if not materias else [m for m in materias if m in self.proximas]
+            for materia in alvo:
+                self.proximas[materia] = agora
+            return alvo
+
+    def espera(self, agora=None):
+        """Segundos até a próxima matéria vencer."""
+        agora = time.monotonic() if agora is None else agora
+        with self.trava:
+            if not self.proximas:
+                return self.intervalo_s
+            return max(0.0, min(self.proximas.values()) - agora)
+
+    def situacao(self):
+        """{matéria: data/hora prevista} para o endpoint de status."""
+        agora_mono, agora = time.monotonic(), time.time()
+        with self.trava:
+            return {
+                m: datetime.fromtimestamp(agora + quando - agora_mono).strftime("%d/%m/%Y %H:%M:%S")
+                for m, quando in sorted(self.proximas.items(), key=lambda item: item[1])
+            }
+
+
+# ===============================
+# 🔥 SESSÕES QUENTES
+# ===============================
+
+def _sessao_aceita(cookies):
+    from cache_sessao import sessao_valida
+    return bool(cookies) and sessao_valida(CONFIGURACOES["moodle"]["url_login"], cookies)
+
+
+class VarredorHTTP:
+    """Sessão `requests` reaproveitada; login só quando o Moodle recusa os cookies."""
+
+    motor = "http"
+
+    def __init__(self):
+        self.sessao = None
+
+    def _autenticar(self):
+        from motor_http import SessaoMoodleHTTP
+
+        execucao = CONFIGURACOES["execucao"]
+        if self.sessao is None:
+            self.sessao = SessaoMoodleHTTP(
+                CONFIGURACOES["moodle"]["url_login"],
+                tamanho_pool=max(execucao["concorrencia"] or execucao["sessoes"], 1),
+                timeout=CONFIGURACOES["moodle"]["timeout_login"],
+                politica=bot_visual.obter_politica(),
+            )
+            cookies = bot_visual.restaurar_sessao_em_cache()
+            if cookies:
+                self.sessao.importar_cookies(cookies)
+                return True
+        print("🌐 Fazendo login via HTTP...")
+        self.sessao.session.cookies.clear()
+        if not self.sessao.login(os.getenv("MOODLE_USER"), os.getenv("MOODLE_PASS")):
+            return False
+        bot_visual.guardar_sessao(self.sessao.exportar_cookies())
+        return True
+
+    def verificar(self, materias, estado):
+        from motor_http import sessao_expirou, verificar_materias_http
+
+        if self.sessao is None and not self._autenticar():
+            raise RuntimeError("falha no login")
+        execucao = CONFIGURACOES["execucao"]
+        limite = execucao["concorrencia"] or execucao["sessoes"]
+        resultados = verificar_materias_http(self.sessao, materias, limite, estado)
+
+        # Sem consulta prévia ao /my/: a sessão só é refeita quando uma página cai no login
+        expiradas = {nome: materias[nome] for nome, status in resultados.items() if sessao_expirou(status)}
+        if expiradas:
+            print("⌛ Sessão HTTP expirou — fazendo login de novo.")
+            if not self._autenticar():
+                raise RuntimeError("falha no login")
+            resultados.update(verificar_materias_http(self.sessao, expiradas, limite, estado))
+        return resultados
+
+    def fechar(self):
+        if self.sessao is not None:
+            self.sessao.fechar()
+            self.sessao = None
+
+
+class VarredorSelenium:
+    """Pool de navegadores mantido aberto; relogin no principal e cópia dos cookies se a sessão cair."""
+
+    motor = "selenium"
+
+    def __init__(self):
+        self.sessoes = None
+
+    def _reautenticar(self):
+        principal = self.sessoes[0][0]
+        print("⌛ Sessão do navegador expirou — fazendo login de novo.")
+        if not bot_visual.fazer_login(principal):
+            raise RuntimeError("falha no login")
+        bot_visual.guardar_sessao(principal.get_cookies())
+        for driver, _ in self.sessoes[1:]:
+            bot_visual.copiar_cookies(principal, driver)
+
+    def verificar(self, materias, estado):
+        if self.sessoes is None:
+            self.sessoes = bot_visual.criar_pool_sessoes(CONFIGURACOES["execucao"]["sessoes"])
+            if not self.sessoes:
+                self.sessoes = None
+                raise RuntimeError("falha no login")
+        elif not _sessao_aceita(self.sessoes[0][0].get_cookies()):
+            self._reautenticar()
+        try:
+            return bot_visual.verificar_materias_em_paralelo(
+                self.sessoes, materias, CONFIGURACOES["execucao"]["concorrencia"], estado
+            )
+        except Exception:
+            # Navegador travado ou fechado: recomeça o pool na próxima varredura
+            self.fechar()
+            raise
+
+    def fechar(self):
+        if self.sessoes:
+            bot_visual.encerrar_pool_sessoes(self.sessoes)
+        self.sessoes = None
+        bot_visual.encerrar_capturas()
+
+
+class VarredorWS:
+    """Cliente da API com token reaproveitado; um token novo só quando o Moodle recusa o atual."""
+
+    motor = "ws"
+
+    def __init__(self):
+        from cache_sessao import url_base_moodle
+        from motor_ws import ClienteMoodleWS, id_do_curso
+
+        execucao = CONFIGURACOES["execucao"]
+        self.cliente = ClienteMoodleWS(
+            url_base_moodle(CONFIGURACOES["moodle"]["url_login"]),
+            token=os.getenv("MOODLE_WS_TOKEN") or None,
+            tamanho_pool=max(execucao["concorrencia"] or execucao["sessoes"], 4),
+            timeout=CONFIGURACOES["moodle"]["timeout_login"],
+            politica=bot_visual.obter_politica(),
+        )
+        self.nomes_por_id = {id_do_curso(url): nome for nome, url in CONFIGURACOES["materias"].items()}
+        self.descobertas = False
+
+    def verificar(self, materias, estado):
+        from motor_ws import TokenInvalido, varrer_cursos_ws
+
+        # A primeira varredura descobre os cursos; depois só os vencidos são consultados
+        somente = set(materias) if self.descobertas else None
+        for tentativa in range(2):
+            try:
+                if not self.cliente.token and not self.cliente.obter_token(os.getenv("MOODLE_USER"), os.getenv("MOODLE_PASS")):
+                    raise RuntimeError("o Moodle não emitiu o token da API")
+                resultados = varrer_cursos_ws(self.cliente, self.nomes_por_id, somente)
+                self.descobertas = True
+                return resultados
+            except TokenInvalido:
+                if tentativa:
+                    raise
+                print("⌛ Token da API recusado — pedindo outro.")
+                self.cliente.token = None
+
+    def fechar(self):
+        self.cliente.fechar()
+
+
+VARREDORES = {"http": VarredorHTTP, "selenium": VarredorSelenium, "ws": VarredorWS}
+
+
+# ===============================
+# 🔁 LAÇO PRINCIPAL
+# ===============================
+
+class DaemonMoodle:
+    def __init__(self, varredor, agenda, estado=None):
+        self.varredor = varredor
+        self.agenda = agenda
+        self.estado = estado
+        self.materias = dict(CONFIGURACOES["materias"])
+        self.gatilho = threading.Event()
+        self.encerrar = threading.Event()
+        self.em_execucao = False
+        self.ultima = None
+
+    def solicitar_varredura(self, materias=None):
+        alvo = self.agenda.antecipar(materias)
+        self.gatilho.set()
+        return alvo
+
+    def parar(self):
+        self.encerrar.set()
+        self.gatilho.set()
+
+    def situacao(self):
+        return {
+            "motor": self.varredor.motor,
+            "em_execucao": self.em_execucao,
+            "disjuntor": bot_visual.obter_politica().disjuntor.estado,
+            "ultima_varredura": self.ultima,
+            "proximas": self.agenda.situacao(),
+        }
+
+    def _ciclo(self, vencidas):
+        inicio = time.perf_counter()
+        self.em_execucao = True
+        instrumentacao.iniciar_execucao(self.varredor.motor)
+        try:
+            try:
+                alvo = {m: self.materias.get(m) for m in vencidas}
+                resultados = self.varredor.verificar(alvo, self.estado)
+            finally:
+                self.em_execucao = False
+            # Motor ws: cursos descobertos pela API entram na agenda
+            self.agenda.adicionar([m for m in resultados if m not in self.agenda.proximas])
+            self.agenda.reagendar(list(vencidas) + list(resultados))
+
+            if resultados:
+                bot_visual.status_materias.update(resultados)
+                bot_visual.gerar_relatorio(self.varredor.motor, resultados)
+                if self.estado:
+                    self.estado.salvar()
+        finally:
+            # Ciclos que falharam também deixam seus spans (o login que caiu, por exemplo)
+            instrumentacao.finalizar_execucao(obter_caminho_completo(CONFIGURACOES["pastas"]["dados"]))
+        duracao = time.perf_counter() - inicio
+        self.ultima = {
+            "datahora": datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+            "materias": sorted(resultados),
+            "duracao_s": round(duracao, 2),
+        }
+        print(f"⏱️ Varredura de {len(resultados)} matéria(s) em {duracao:.2f}s")
+
+    def executar(self):
+        while not self.encerrar.is_set():
+            vencidas = self.agenda.vencidas()
+            if vencidas:
+                try:
+                    self._ciclo(vencidas)
+                except Exception as e:
+                    print(f"❌ Varredura falhou ({e}); nova tentativa no próximo intervalo.")
+                    self.agenda.reagendar(vencidas)
+                continue
+            espera = self.agenda.espera()
+            print(f"💤 Próxima varredura em {espera / 60:.1f} min.")
+            self.gatilho.wait(espera)
+            self.gatilho.clear()
+        self.varredor.fechar()
+
+
+# ===============================
+# 🎛️ ENDPOINT DE CONTROLE
+# ===============================
+
+def criar_servidor_controle(daemon, porta):
+    """Servidor HTTP em 127.0.0.1. Com MOODLE_CONTROLE_TOKEN, exige o cabeçalho X-Token."""
+    token = os.getenv("MOODLE_CONTROLE_TOKEN")
+
+    class ManipuladorControle(BaseHTTPRequestHandler):
+        def log_message(self, formato, *args):
+            pass
+
+        def _json(self, codigo, dados):
+            corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def _autorizado(self):
+            if token and self.headers.get("X-Token") != token:
+                self._json(403, {"erro": "token inválido"})
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._autorizado():
+                return
+            caminho = urlparse(self.path).path
+            if caminho == "/status":
+                return self._json(200, daemon.situacao())
+            if caminho == "/metrics":
+                corpo = instrumentacao.exposicao_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                return self.wfile.write(corpo)
+            self._json(404, {"erro": "rota inexistente"})
+
+        def do_POST(self):
+            if not self._autorizado():
+                return
+            url = urlparse(self.path)
+            if url.path == "/varrer":
+                materias = parse_qs(url.query).get("materia")
+                return self._json(202, {"agendadas": daemon.solicitar_varredura(materias)})
+            if url.path == "/parar":
+                daemon.parar()
+                return self._json(202, {"parando": True})
+            self._json(404, {"erro": "rota inexistente"})
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), ManipuladorControle)
+    servidor.daemon_threads = True
+    return servidor
+
+
+if __name__ == "__main__":
+    agendamento = CONFIGURACOES["agendamento"]
+    parser = argparse.ArgumentParser(description="Moodle Bot — modo daemon")
+    parser.add_argument("--engine", choices=sorted(VARREDORES), default=os.getenv("MOODLE_ENGINE", "http"))
+    parser.add_argument("--intervalo", type=float, default=agendamento["intervalo_min"], help="minutos entre varreduras")
+    parser.add_argument("--porta", type=int, default=agendamento["porta_controle"], help="porta do endpoint de controle")
+    args = parser.parse_args()
+
+    bot_visual.criar_pastas()
+    estado = None
+    if CONFIGURACOES["execucao"]["incremental"]:
+        estado = EstadoIncremental(obter_caminho_completo(CONFIGURACOES["pastas"]["cache"]))
+
+    # No motor ws a primeira varredura também descobre os cursos que não estão na configuração
+    agenda = Agenda(
+        CONFIGURACOES["materias"],
+        args.intervalo * 60,
+        ler_intervalos(agendamento["intervalos"]),
+        agendamento["jitter"],
+    )
+
+    daemon = DaemonMoodle(VARREDORES[args.engine](), agenda, estado)
+    servidor = criar_servidor_controle(daemon, args.porta)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda *_: daemon.parar())
+    print(f"🛰️ Daemon ({args.engine}) ativo; controle em http://127.0.0.1:{args.porta}")
+
+    try:
+        daemon.executar()
+    except KeyboardInterrupt:
+        daemon.varredor.fechar()
+    finally:
+        servidor.shutdown()
+        print("👋 Daemon encerrado.")
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Resolução do chromedriver com cache local.
+
+`ChromeDriverManager().install()` consulta a internet a cada execução para
+descobrir a versão do driver. Aqui o caminho resolvido fica num manifesto
+(cache/drivers/manifesto.json) junto com a versão principal do Chrome para a
+qual ele serve; enquanto o Chrome instalado não mudar de versão principal, o
+driver é reaproveitado sem rede e sem importar o webdriver_manager.
+
+Ordem de resolução:
+  1. MOODLE_CHROMEDRIVER (caminho fixo);
+  2. manifesto, se o arquivo existe e a versão bate (ou MOODLE_CHROMEDRIVER_VERSAO);
+  3. webdriver_manager (rede), gravando o resultado no manifesto;
+  4. sem rede: o driver do manifesto mesmo com versão diferente, um
+     `chromedriver` no PATH ou, por fim, o Selenium Manager (retorna None).
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+from datetime import datetime
+
+ARQUIVO_MANIFESTO = "manifesto.json"
+RE_VERSAO = re.compile(r"(\d+)\.\d+\.\d+(?:\.\d+)?")
+EXECUTAVEIS_CHROME = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+CHROME_MAC = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+
+_trava = threading.Lock()
+_resolvido = {}
+
+
+def _versao_do_executavel(caminho):
+    try:
+        saida = subprocess.run([caminho, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = RE_VERSAO.search(saida or "")
+    return match.group(0) if match else None
+
+def versao_chrome():
+    """Versão do Chrome instalado ('130.0.6723.91') ou None se não der para descobrir."""
+    if sys.platform.startswith("win"):
+        import winreg
+        for raiz in (winreg.HKEY_CURRENT_USER, winreg.HKEY_LOCAL_MACHINE):
+            try:
+                with winreg.OpenKey(raiz, r"Software\Google\Chrome\BLBeacon") as chave:
+                    return winreg.QueryValueEx(chave, "version")[0]
+            except OSError:
+                continue
+        return None
+    if sys.platform == "darwin" and os.path.exists(CHROME_MAC):
+        return _versao_do_executavel(CHROME_MAC)
+    for nome in EXECUTAVEIS_CHROME:
+        caminho = shutil.which(nome)
+        if caminho:
+            return _versao_do_executavel(caminho)
+    return None
+
+def versao_principal(versao):
+    return versao.split(".")[0] if versao else None
+
+
+# ===============================
+# 📒 MANIFESTO
+# ===============================
+
+def carregar_manifesto(pasta):
+    try:
+        with open(os.path.join(pasta, ARQUIVO_MANIFESTO), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def salvar_manifesto(pasta, manifesto):
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, ARQUIVO_MANIFESTO)
+    temporario = caminho + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+def _entrada_serve(entrada, principal_chrome, versao_fixa):
+    if not entrada or not os.path.exists(entrada.get("caminho") or ""):
+        return False
+    if versao_fixa:
+        return entrada.get("versao_driver") == versao_fixa
+    # Sem conseguir ler a versão do Chrome, confia no último driver que funcionou
+    return principal_chrome is None or entrada.get("principal_chrome") == principal_chrome
+
+
+# ===============================
+# 🚗 RESOLUÇÃO
+# ===============================
+
+def _baixar(versao_fixa):
+    from webdriver_manager.chrome import ChromeDriverManager
+    gerenciador = ChromeDriverManager(driver_version=versao_fixa) if versao_fixa else ChromeDriverManager()
+    return gerenciador.install()
+
+def resolver_chromedriver(pasta, caminho_fixo=None, versao_fixa=None):
+    """
+    Caminho do chromedriver a usar, ou None para deixar o Selenium Manager
+    resolver. O resultado fica guardado em memória (o daemon recria o pool
+    sem resolver de novo) e em `pasta`/manifesto.json.
+    """
+    if caminho_fixo:
+        return caminho_fixo
+    with _trava:
+        if pasta in _resolvido:
+            return _resolvido[pasta]
+        manifesto = carregar_manifesto(pasta)
+        principal_chrome = None if versao_fixa else versao_principal(versao_chrome())
+
+        if _entrada_serve(manifesto, principal_chrome, versao_fixa):
+            caminho = manifesto["caminho"]
+        else:
+            try:
+                caminho = _baixar(versao_fixa)
+                salvar_manifesto(pasta, {
+                    "caminho": caminho,
+                    "versao_driver": versao_fixa or _versao_do_executavel(caminho),
+                    "principal_chrome": principal_chrome,
+                    "origem": "webdriver_manager",
+                    "resolvido_em": datetime.now().isoformat(timespec="seconds"),
+                })
+                print(f"🚗 chromedriver resolvido e guardado no manifesto: {caminho}")
+            except Exception as e:
+                caminho = _sem_rede(manifesto, e)
+
+        _resolvido[pasta] = caminho
+        return caminho
+
+def _sem_rede(manifesto, erro):
+    """Fallback quando o webdriver_manager falha (sem internet, GitHub/CDN fora do ar...)."""
+    if os.path.exists(manifesto.get("caminho") or ""):
+        print(f"⚠️ Não foi possível atualizar o chromedriver ({erro}); usando o do manifesto "
+              f"({manifesto.get('versao_driver')}).")
+        return manifesto["caminho"]
+    no_path = shutil.which("chromedriver")
+    if no_path:
+        print(f"⚠️ Não foi possível baixar o chromedriver ({erro}); usando o do PATH: {no_path}")
+        return no_path
+    print(f"⚠️ Não foi possível baixar o chromedriver ({erro}); deixando o Selenium Manager resolver.")
+    return None
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Estado por matéria para varreduras incrementais.
+
+Para cada matéria guarda ETag/Last-Modified (quando o servidor envia), o hash
+do conteúdo normalizado do curso e o último status. Se a página não mudou, o
+status anterior é reaproveitado sem nova classificação nem screenshot.
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from classificador import classificar_html
+
+ARQUIVO_ESTADO = "estado_materias.json"
+
+# Trechos que mudam a cada requisição sem o conteúdo do curso mudar
+_RE_VOLATEIS = [
+    re.compile(r"<script\b.*?</script>", re.S | re.I),
+    re.compile(r"<style\b.*?</style>", re.S | re.I),
+    re.compile(r"sesskey[\"'=:\s]+[\w-]+", re.I),
+    re.compile(r"\byui_[\w-]+"),
+    re.compile(r"\s+"),
+]
+
+
+def hash_conteudo(html):
+    """
+    Hash do conteúdo do curso: do início de `.course-content` até o rodapé,
+    sem scripts, sesskey e ids gerados pelo YUI.
+    """
+    html = html or ""
+    inicio = html.find("course-content")
+    fim = html.find('id="page-footer"', max(inicio, 0))
+    trecho = html[max(inicio, 0):fim if fim != -1 else len(html)]
+    for regex in _RE_VOLATEIS:
+        trecho = regex.sub(" ", trecho)
+    return hashlib.sha256(trecho.encode("utf-8")).hexdigest()
+
+
+class EstadoIncremental:
+    """Registro persistente (JSON) do último conteúdo visto de cada matéria."""
+
+    def __init__(self, pasta):
+        self.caminho = os.path.join(pasta, ARQUIVO_ESTADO)
+        self._trava = threading.Lock()
+        self.materias = {}
+        if os.path.exists(self.caminho):
+            try:
+                with open(self.caminho, "r", encoding="utf-8") as f:
+                    self.materias = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Estado incremental ilegível ({e}) — varredura completa.")
+
+    def cabecalhos_condicionais(self, nome, url):
+        """If-None-Match / If-Modified-Since para a última versão conhecida."""
+        anterior = self.materias.get(nome)
+        if not anterior or anterior.get("url") != url:
+            return {}
+        cabecalhos = {}
+        if anterior.get("etag"):
+            cabecalhos["If-None-Match"] = anterior["etag"]
+        if anterior.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = anterior["last_modified"]
+        return cabecalhos
+
+    def reaproveitar(self, nome, url, hash_atual=None):
+        """
+        Retorna uma cópia do status anterior se a matéria não mudou
+        (sem `hash_atual` = o servidor respondeu 304), senão None.
+        """
+        anterior = self.materias.get(nome)
+        if not anterior or anterior.get("url") != url or "status" not in anterior:
+            return None
+        if hash_atual is not None and anterior.get("hash") != hash_atual:
+            return None
+        with self._trava:
+            anterior["verificado_em"] = time.time()
+        print(f"♻️ {nome}: sem mudanças desde a última varredura — status reaproveitado.")
+        return copy.deepcopy(anterior["status"])
+
+    def atualizar(self, nome, url, status, hash_atual, etag=None, last_modified=None):
+        # Erros não entram no estado: a próxima varredura tenta de novo
+        if status.get("observacao", "").startswith("Erro"):
+            return
+        registro = {
+            "url": url,
+            "hash": hash_atual,
+            "etag": etag,
+            "last_modified": last_modified,
+            "status": {k: v for k, v in status.items() if k != "tempos"},
+            "verificado_em": time.time(),
+        }
+        with self._trava:
+            self.materias[nome] = registro
+
+    def salvar(self):
+        with self._trava:
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(self.materias, f, ensure_ascii=False, indent=2)
+            os.replace(temporario, self.caminho)
+
+
+def classificar_incremental(estado, nome_materia, url_materia, html, etag=None, last_modified=None):
+    """Classifica o HTML só se o conteúdo mudou desde a última varredura."""
+    if estado is None:
+        return classificar_html(nome_materia, html, url_materia)
+
+    hash_atual = hash_conteudo(html)
+    status = estado.reaproveitar(nome_materia, url_materia, hash_atual)
+    if status is None:
+        status = classificar_html(nome_materia, html, url_materia)
+    estado.atualizar(nome_materia, url_materia, status, hash_atual, etag, last_modified)
+    return status
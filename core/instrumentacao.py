@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentação da varredura: spans por etapa, logs JSON e métricas Prometheus.
+
+Cada etapa (login, download/carregamento, rolagem, parse, classificação,
+screenshot, relatório...) vira um span com duração, matéria e a origem
+provável do tempo gasto: `moodle` (rede/servidor), `chrome` (navegador) ou
+`bot` (o nosso processamento). Os spans de uma execução vão, um por linha,
+para dados/metricas/spans_<AAAAMMDD>.jsonl; os histogramas acumulados no
+processo vão para dados/metricas/moodle_bot.prom (formato texto do
+Prometheus, lido pelo textfile collector do node_exporter) e para o
+/metrics do modo daemon.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PASTA_METRICAS = "metricas"
+ARQUIVO_PROMETHEUS = "moodle_bot.prom"
+PREFIXO = "moodle_bot"
+BALDES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+ORIGENS = {
+    "login": "moodle", "validacao_sessao": "moodle", "download": "moodle", "api": "moodle",
+    "carregamento": "moodle", "rolagem": "chrome", "screenshot": "chrome",
+    "parse": "bot", "classificacao": "bot", "relatorio": "bot", "fila": "bot",
+}
+
+_trava = threading.Lock()
+# Conta da varredura em andamento (modo multicontas): cada tarefa asyncio tem a sua
+_conta = contextvars.ContextVar("conta", default=None)
+
+
+class Histograma:
+    """Histograma cumulativo no formato do Prometheus (baldes `le`, soma e contagem)."""
+
+    __slots__ = ("baldes", "contagens", "soma", "total")
+
+    def __init__(self, baldes=BALDES):
+        self.baldes = baldes
+        self.contagens = [0] * len(baldes)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.soma += valor
+        self.total += 1
+        for i, limite in enumerate(self.baldes):
+            if valor <= limite:
+                self.contagens[i] += 1
+
+
+class Execucao:
+    """Spans de uma execução (ou de um ciclo do daemon) ainda não gravados."""
+
+    def __init__(self, motor):
+        self.id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.motor = motor
+        self.inicio = time.perf_counter()
+        self.spans = []
+        self.paginas = 0
+
+
+_execucao = None
+_histogramas = {}   # (etapa, motor) -> Histograma
+_erros = {}         # (etapa, motor) -> int
+_paginas = {}       # motor -> int
+_vazao = {}         # motor -> páginas/s da última execução
+_ultima = {}        # motor -> timestamp da última execução
+
+
+def iniciar_execucao(motor=None):
+    """Abre uma execução nova; spans registrados antes disso abrem uma automaticamente."""
+    global _execucao
+    with _trava:
+        _execucao = Execucao(motor)
+    return _execucao
+
+def definir_conta(nome):
+    """Marca os spans seguintes deste contexto (thread ou tarefa asyncio) com a conta."""
+    _conta.set(nome)
+
+def _execucao_atual():
+    global _execucao
+    if _execucao is None:
+        _execucao = Execucao(None)
+    return _execucao
+
+def registrar(etapa, duracao_s, materia=None, erro=None, conta=None, motor=None):
+    """Guarda um span já medido (duração em segundos)."""
+    with _trava:
+        execucao = _execucao_atual()
+        motor = motor or execucao.motor
+        conta = conta or _conta.get()
+        execucao.spans.append({
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "execucao": execucao.id,
+            "motor": motor,
+            "conta": conta,
+            "materia": materia,
+            "etapa": etapa,
+            "origem": ORIGENS.get(etapa, "bot"),
+            "duracao_ms": round(duracao_s * 1000, 2),
+            "erro": erro,
+        })
+        chave = (etapa, motor)
+        if chave not in _histogramas:
+            _histogramas[chave] = Histograma()
+        _histogramas[chave].observar(duracao_s)
+        if erro:
+            _erros[chave] = _erros.get(chave, 0) + 1
+
+@contextmanager
+def span(etapa, materia=None, conta=None):
+    """Mede o bloco como um span; uma exceção fica registrada no span e segue adiante."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        registrar(etapa, time.perf_counter() - inicio, materia, f"{e.__class__.__name__}: {e}", conta)
+        raise
+    registrar(etapa, time.perf_counter() - inicio, materia, None, conta)
+
+def completar_tempos(status, tempos, inicio):
+    """Junta `tempos` medidos pelo motor aos do classificador e fecha o total da matéria."""
+    status["tempos"] = {**tempos, **(status.get("tempos") or {}), "total": round(time.perf_counter() - inicio, 3)}
+    return status
+
+def registrar_materia(nome, status, conta=None):
+    """Spans das etapas em status['tempos'] (segundos) + o span 'materia' com o total."""
+    tempos = dict(status.get("tempos") or {})
+    erro = status.get("observacao") if str(status.get("observacao", "")).startswith("Erro") else None
+    total = tempos.pop("total", None)
+    for etapa, duracao in tempos.items():
+        registrar(etapa, duracao, nome, None, conta)
+    if total is not None:
+        registrar("materia", total, nome, erro, conta)
+    with _trava:
+        execucao = _execucao_atual()
+        execucao.paginas += 1
+        if erro and total is None:
+            # Sem duração (ex.: motor WS), a falha só entra na contagem de erros
+            chave = ("materia", execucao.motor)
+            _erros[chave] = _erros.get(chave, 0) + 1
+
+
+# ===============================
+# 💾 SAÍDA (JSON E PROMETHEUS)
+# ===============================
+
+def finalizar_execucao(pasta_dados):
+    """Grava os spans pendentes em JSON Lines e atualiza o arquivo .prom. Retorna a pasta usada."""
+    global _execucao
+    with _trava:
+        execucao, _execucao = _execucao_atual(), None
+        duracao = time.perf_counter() - execucao.inicio
+        motor = execucao.motor
+        if execucao.paginas:
+            _paginas[motor] = _paginas.get(motor, 0) + execucao.paginas
+            _vazao[motor] = execucao.paginas / duracao if duracao > 0 else 0.0
+        _ultima[motor] = time.time()
+        texto = _exposicao_prometheus()
+
+    pasta = os.path.join(pasta_dados, PASTA_METRICAS)
+    os.makedirs(pasta, exist_ok=True)
+    spans = execucao.spans + [{
+        "ts": datetime.now().isoformat(timespec="milliseconds"), "execucao": execucao.id, "motor": motor,
+        "conta": None, "materia": None, "etapa": "execucao", "origem": "bot",
+        "duracao_ms": round(duracao * 1000, 2), "erro": None, "paginas": execucao.paginas,
+    }]
+    with open(os.path.join(pasta, f"spans_{datetime.now():%Y%m%d}.jsonl"), "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(s, ensure_ascii=False) + "\n" for s in spans)
+
+    # Escrita atômica: o coletor nunca lê um arquivo pela metade
+    caminho = os.path.join(pasta, ARQUIVO_PROMETHEUS)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(caminho + ".tmp", caminho)
+    return pasta
+
+def _rotulos(**rotulos):
+    return ",".join(f'{k}="{v if v is not None else ""}"' for k, v in rotulos.items())
+
+def exposicao_prometheus():
+    """Métricas acumuladas no processo, no formato texto do Prometheus."""
+    with _trava:
+        return _exposicao_prometheus()
+
+def _exposicao_prometheus():
+    linhas = [
+        f"# HELP {PREFIXO}_etapa_segundos Duração de cada etapa da varredura.",
+        f"# TYPE {PREFIXO}_etapa_segundos histogram",
+    ]
+    for (etapa, motor), h in sorted(_histogramas.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        for limite, contagem in zip(h.baldes, h.contagens):
+            linhas.append(f"{PREFIXO}_etapa_segundos_bucket{{{_rotulos(etapa=etapa, motor=motor, le=limite)}}} {contagem}")
+        linhas.append(f"{PREFIXO}_etapa_segundos_bucket{{{_rotulos(etapa=etapa, motor=motor, le='+Inf')}}} {h.total}")
+        linhas.append(f"{PREFIXO}_etapa_segundos_sum{{{_rotulos(etapa=etapa, motor=motor)}}} {h.soma:.6f}")
+        linhas.append(f"{PREFIXO}_etapa_segundos_count{{{_rotulos(etapa=etapa, motor=motor)}}} {h.total}")
+
+    linhas += [f"# HELP {PREFIXO}_erros_total Etapas que terminaram em erro.", f"# TYPE {PREFIXO}_erros_total counter"]
+    for (etapa, motor), n in sorted(_erros.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        linhas.append(f"{PREFIXO}_erros_total{{{_rotulos(etapa=etapa, motor=motor)}}} {n}")
+
+    linhas += [f"# HELP {PREFIXO}_paginas_total Matérias verificadas.", f"# TYPE {PREFIXO}_paginas_total counter"]
+    linhas += [f"{PREFIXO}_paginas_total{{{_rotulos(motor=m)}}} {n}" for m, n in _paginas.items()]
+    linhas += [f"# HELP {PREFIXO}_paginas_por_segundo Vazão da última execução.",
+               f"# TYPE {PREFIXO}_paginas_por_segundo gauge"]
+    linhas += [f"{PREFIXO}_paginas_por_segundo{{{_rotulos(motor=m)}}} {v:.3f}" for m, v in _vazao.items()]
+    linhas += [f"# HELP {PREFIXO}_ultima_execucao_timestamp_seconds Fim da última execução.",
+               f"# TYPE {PREFIXO}_ultima_execucao_timestamp_seconds gauge"]
+    linhas += [f"{PREFIXO}_ultima_execucao_timestamp_seconds{{{_rotulos(motor=m)}}} {t:.0f}" for m, t in _ultima.items()]
+    return "\n".join(linhas) + "\n"
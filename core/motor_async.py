@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+Motor assíncrono: baixa as páginas das matérias ao mesmo tempo com aiohttp,
+respeitando um limite de conexões simultâneas e um token bucket por host do
+Moodle. O parse/classificação roda num pool de processos assim que cada
+página chega, e cada resultado é entregue a `ao_concluir` na hora.
+"""
+import asyncio
+import time
+from http.cookies import SimpleCookie
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+import aiohttp
+from yarl import URL
+
+import instrumentacao
+from classificador import classificar_html
+from estado_incremental import hash_conteudo
+from resiliencia import PoliticaRepeticao
+from motor_http import MENSAGEM_EXPIRADA, USER_AGENT, SessaoExpirada, acao_formulario_login, extrair_logintoken, eh_pagina_login
+
+
+class LimitadorTaxa:
+    """Token bucket: no máximo `taxa` requisições/s, com rajadas de até `capacidade`."""
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = taxa
+        self.capacidade = capacidade or max(1.0, taxa)
+        self.tokens = self.capacidade
+        self.ultimo = time.monotonic()
+        self._trava = asyncio.Lock()
+
+    async def adquirir(self):
+        if self.taxa <= 0:
+            return
+        async with self._trava:
+            while True:
+                agora = time.monotonic()
+                self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * self.taxa)
+                self.ultimo = agora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.taxa)
+
+
+class SessaoMoodleAsync:
+    """
+    Sessão aiohttp autenticada, com um limitador de taxa por host.
+    Várias sessões (uma por conta) podem dividir o mesmo `conector`, os
+    mesmos `limitadores` e a mesma `politica` (e com ela o disjuntor), cada
+    uma com seus próprios cookies.
+    """
+
+    def __init__(self, url_login, concorrencia=10, taxa_por_host=5.0, timeout=20, conector=None, limitadores=None,
+                 politica=None):
+        self.url_login = url_login
+        self.concorrencia = max(1, concorrencia)
+        self.taxa_por_host = taxa_por_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.limitadores = {} if limitadores is None else limitadores
+        self.conector = conector
+        self.politica = politica or PoliticaRepeticao()
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=self.conector or aiohttp.TCPConnector(limit=self.concorrencia),
+            connector_owner=self.conector is None,
+            cookie_jar=aiohttp.CookieJar(unsafe=True),  # aceita cookies em hosts por IP (stub local)
+            headers={"User-Agent": USER_AGENT},
+            timeout=self.timeout,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def _limitador(self, url):
+        host = urlparse(url).netloc
+        if host not in self.limitadores:
+            self.limitadores[host] = LimitadorTaxa(self.taxa_por_host)
+        return self.limitadores[host]
+
+    async def _requisitar(self, metodo, url, **kwargs):
+        resposta = await self._requisitar_completo(metodo, url, **kwargs)
+        return resposta["url"], resposta["html"]
+
+    async def _requisitar_completo(self, metodo, url, **kwargs):
+        await self._limitador(url).adquirir()
+        async with self.session.request(metodo, url, **kwargs) as resposta:
+            if resposta.status != 304:
+                resposta.raise_for_status()
+            return {
+                "url": str(resposta.url),
+                "codigo": resposta.status,
+                "etag": resposta.headers.get("ETag"),
+                "last_modified": resposta.headers.get("Last-Modified"),
+                "html": await resposta.text() if resposta.status != 304 else "",
+            }
+
+    async def login(self, usuario, senha):
+        with instrumentacao.span("login"):
+            url_final, html = await self._requisitar("GET", self.url_login)
+            logintoken = extrair_logintoken(html)
+
+            acao = acao_formulario_login(html, url_final)
+
+            dados = {"username": usuario, "password": senha, "anchor": ""}
+            if logintoken:
+                dados["logintoken"] = logintoken
+
+            url_final, _ = await self._requisitar("POST", acao, data=dados)
+        tem_cookie = any(c.key == "MoodleSession" for c in self.session.cookie_jar)
+        return tem_cookie and (not eh_pagina_login(url_final) or "testsession" in url_final)
+
+    def exportar_cookies(self):
+        """Cookies no mesmo formato do Selenium (name/value/domain/path)."""
+        return [
+            {"name": c.key, "value": c.value, "domain": c["domain"], "path": c["path"] or "/"}
+            for c in self.session.cookie_jar
+        ]
+
+    def importar_cookies(self, cookies):
+        jar = SimpleCookie()
+        for c in cookies:
+            jar[c["name"]] = c["value"]
+            jar[c["name"]]["path"] = c.get("path") or "/"
+        self.session.cookie_jar.update_cookies(jar, response_url=URL(self.url_login))
+
+    async def obter_resposta(self, url, cabecalhos=None):
+        """
+        Como `_requisitar_completo`, mas lança SessaoExpirada se cair no login.
+        Falhas transitórias são repetidas conforme a `politica`.
+        """
+        resposta = await self.politica.executar_async(
+            self._requisitar_completo, "GET", url, headers=cabecalhos, descricao=f"GET {url}"
+        )
+        if eh_pagina_login(resposta["url"]):
+            raise SessaoExpirada(f"{MENSAGEM_EXPIRADA} {url}")
+        return resposta
+
+    async def obter_html(self, url):
+        return (await self.obter_resposta(url))["html"]
+
+
+# ===============================
+# 🔍 PIPELINE DE VERIFICAÇÃO
+# ===============================
+
+async def verificar_materia_async(sessao, semaforo, pool, nome_materia, url_materia, estado=None):
+    """Uma matéria: download sob `semaforo`, classificação no `pool` de processos."""
+    loop = asyncio.get_running_loop()
+    tempos = {}
+    inicio = time.perf_counter()
+    try:
+        cabecalhos = estado.cabecalhos_condicionais(nome_materia, url_materia) if estado else None
+        async with semaforo:
+            # Espera por uma vaga (limite de concorrência) fica fora do tempo de download
+            antes = time.perf_counter()
+            tempos["fila"] = round(antes - inicio, 3)
+            resposta = await sessao.obter_resposta(url_materia, cabecalhos)
+            status = None
+            if resposta["codigo"] == 304:
+                status = estado.reaproveitar(nome_materia, url_materia)
+                if status is None:
+                    resposta = await sessao.obter_resposta(url_materia)
+            tempos["download"] = round(time.perf_counter() - antes, 3)
+        if status is not None:
+            return nome_materia, instrumentacao.completar_tempos(status, tempos, inicio)
+
+        hash_atual = None
+        if estado is not None:
+            hash_atual = hash_conteudo(resposta["html"])
+            status = estado.reaproveitar(nome_materia, url_materia, hash_atual)
+            if status is not None:
+                estado.atualizar(nome_materia, url_materia, status, hash_atual,
+                                 resposta["etag"], resposta["last_modified"])
+                return nome_materia, instrumentacao.completar_tempos(status, tempos, inicio)
+
+        # A classificação é CPU: vai para o pool enquanto outros downloads seguem
+        status = await loop.run_in_executor(pool, classificar_html, nome_materia, resposta["html"], url_materia)
+        if estado is not None:
+            estado.atualizar(nome_materia, url_materia, status, hash_atual,
+                             resposta["etag"], resposta["last_modified"])
+        return nome_materia, instrumentacao.completar_tempos(status, tempos, inicio)
+    except Exception as e:
+        print(f"❌ Erro ao processar {nome_materia}: {e}")
+        status = {"trabalho_encontrado": False, "pendente": False, "observacao": f"Erro ({e})"}
+        return nome_materia, instrumentacao.completar_tempos(status, tempos, inicio)
+
+async def verificar_materias_async(sessao, materias, ao_concluir=None, workers_parse=None, estado=None):
+    """
+    Verifica todas as matérias com a sessão já autenticada.
+    `ao_concluir(nome, status)` é chamado na ordem de conclusão; o dicionário
+    retornado segue a ordem de `materias`.
+    """
+    semaforo = asyncio.Semaphore(sessao.concorrencia)
+    resultados = {}
+
+    with ProcessPoolExecutor(max_workers=workers_parse) as pool:
+        tarefas = [verificar_materia_async(sessao, semaforo, pool, nome, url, estado) for nome, url in materias.items()]
+        for proxima in asyncio.as_completed(tarefas):
+            nome, status = await proxima
+            resultados[nome] = status
+            if ao_concluir:
+                ao_concluir(nome, status)
+
+    return {nome: resultados[nome] for nome in materias}
+
+async def executar_varredura_async(url_login, usuario, senha, materias, concorrencia=10,
+                                   taxa_por_host=5.0, timeout=20, ao_concluir=None,
+                                   cookies=None, ao_autenticar=None, estado=None, politica=None):
+    """
+    Login + varredura completa. Retorna None se o login falhar.
+    Com `cookies` (sessão já validada) o login é pulado; após um login novo,
+    `ao_autenticar(cookies)` recebe a sessão para ser guardada.
+    """
+    async with SessaoMoodleAsync(url_login, concorrencia, taxa_por_host, timeout, politica=politica) as sessao:
+        if cookies:
+            sessao.importar_cookies(cookies)
+        else:
+            print("🌐 Fazendo login via HTTP (async)...")
+            if not await sessao.login(usuario, senha):
+                return None
+            print("✅ Login realizado com sucesso!")
+            if ao_autenticar:
+                ao_autenticar(sessao.exportar_cookies())
+        return await verificar_materias_async(sessao, materias, ao_concluir, estado=estado)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Motor HTTP: faz login pelo formulário do Moodle com uma sessão `requests`
+e baixa as páginas das matérias sem abrir o Chrome.
+"""
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentacao
+from classificador import classificar_html
+from estado_incremental import classificar_incremental
+from resiliencia import PoliticaRepeticao
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) MoodleBot/2.0"
+
+_RE_LOGINTOKEN = re.compile(r'name="logintoken"\s+value="([^"]+)"')
+
+
+MENSAGEM_EXPIRADA = "sessão expirada ao abrir"
+
+
+class SessaoExpirada(Exception):
+    """O Moodle redirecionou para a tela de login no meio da varredura."""
+
+
+def sessao_expirou(status):
+    """True se a matéria falhou por ter caído na tela de login (SessaoExpirada)."""
+    return str(status.get("observacao", "")).startswith(f"Erro ({MENSAGEM_EXPIRADA}")
+
+
+def extrair_logintoken(html):
+    """Retorna o `logintoken` do formulário de login (ou '' se o tema não usar)."""
+    match = _RE_LOGINTOKEN.search(html or "")
+    if match:
+        return match.group(1)
+    from bs4 import BeautifulSoup
+    campo = BeautifulSoup(html or "", "html.parser").find("input", attrs={"name": "logintoken"})
+    return campo.get("value", "") if campo else ""
+
+def acao_formulario_login(html, url):
+    """URL de envio do formulário de login (o BeautifulSoup só é carregado quando há login)."""
+    from bs4 import BeautifulSoup
+    formulario = BeautifulSoup(html or "", "html.parser").find("form", id="login")
+    return urljoin(url, formulario.get("action")) if formulario and formulario.get("action") else url
+
+def eh_pagina_login(url):
+    return "/login/index.php" in (url or "")
+
+
+class SessaoMoodleHTTP:
+    """Sessão HTTP autenticada no Moodle, com pool de conexões reaproveitáveis."""
+
+    def __init__(self, url_login, tamanho_pool=10, timeout=20, politica=None):
+        self.url_login = url_login
+        self.timeout = timeout
+        self.logintoken = ""
+        self.politica = politica or PoliticaRepeticao()
+
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+        self.session.headers["User-Agent"] = USER_AGENT
+
+    @instrumentacao.span("login")
+    def login(self, usuario, senha):
+        """Envia o formulário de login. Retorna True se o Moodle aceitou a sessão."""
+        resposta = self.session.get(self.url_login, timeout=self.timeout)
+        resposta.raise_for_status()
+        self.logintoken = extrair_logintoken(resposta.text)
+
+        acao = acao_formulario_login(resposta.text, resposta.url)
+
+        dados = {"username": usuario, "password": senha, "anchor": ""}
+        if self.logintoken:
+            dados["logintoken"] = self.logintoken
+
+        resposta = self.session.post(acao, data=dados, timeout=self.timeout)
+        resposta.raise_for_status()
+
+        # Login inválido devolve a própria tela de login; o válido passa por
+        # ?testsession= e termina no painel do aluno
+        return "MoodleSession" in self.session.cookies and (
+            not eh_pagina_login(resposta.url) or "testsession" in resposta.url
+        )
+
+    def exportar_cookies(self):
+        """Cookies no mesmo formato do Selenium (name/value/domain/path)."""
+        return [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+            for c in self.session.cookies
+        ]
+
+    def importar_cookies(self, cookies):
+        for c in cookies:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+
+    def obter_resposta(self, url, cabecalhos=None):
+        """
+        Baixa uma página autenticada (aceita cabeçalhos condicionais; um 304
+        volta sem corpo). Lança SessaoExpirada se cair no login. Falhas
+        transitórias são repetidas conforme a `politica`.
+        """
+        resposta = self.politica.executar(self._baixar, url, cabecalhos, descricao=f"GET {url}")
+        if resposta.status_code != 304 and eh_pagina_login(resposta.url):
+            raise SessaoExpirada(f"{MENSAGEM_EXPIRADA} {url}")
+        return resposta
+
+    def _baixar(self, url, cabecalhos):
+        resposta = self.session.get(url, headers=cabecalhos, timeout=self.timeout)
+        if resposta.status_code != 304:
+            resposta.raise_for_status()
+        return resposta
+
+    def obter_html(self, url):
+        return self.obter_resposta(url).text
+
+    def fechar(self):
+        self.session.close()
+
+
+# ===============================
+# 🔍 VERIFICAÇÃO VIA HTTP
+# ===============================
+
+def verificar_materia_http(sessao, nome_materia, url_materia, estado=None):
+    """
+    Equivalente HTTP de `verificar_materia`: sem rolagem e sem screenshot.
+    Com `estado`, faz GET condicional e só reclassifica se o conteúdo mudou.
+    """
+    print(f"\n📘 Verificando matéria (HTTP): {nome_materia}")
+    tempos = {}
+    inicio = time.perf_counter()
+
+    def baixar(cabecalhos=None):
+        antes = time.perf_counter()
+        try:
+            return sessao.obter_resposta(url_materia, cabecalhos)
+        finally:
+            tempos["download"] = round(tempos.get("download", 0) + time.perf_counter() - antes, 3)
+
+    try:
+        if estado is None:
+            status = classificar_html(nome_materia, baixar().text, url_materia)
+            return instrumentacao.completar_tempos(status, tempos, inicio)
+
+        resposta = baixar(estado.cabecalhos_condicionais(nome_materia, url_materia))
+        if resposta.status_code == 304:
+            status = estado.reaproveitar(nome_materia, url_materia)
+            if status is not None:
+                return instrumentacao.completar_tempos(status, tempos, inicio)
+            resposta = baixar()
+
+        status = classificar_incremental(
+            estado, nome_materia, url_materia, resposta.text,
+            resposta.headers.get("ETag"), resposta.headers.get("Last-Modified"),
+        )
+        return instrumentacao.completar_tempos(status, tempos, inicio)
+    except Exception as e:
+        print(f"❌ Erro ao processar {nome_materia}: {e}")
+        status = {"trabalho_encontrado": False, "pendente": False, "observacao": f"Erro ({e})"}
+        return instrumentacao.completar_tempos(status, tempos, inicio)
+
+def verificar_materias_http(sessao, materias, limite=1, estado=None, ao_concluir=None):
+    """
+    Verifica as matérias com até `limite` requisições simultâneas, mantendo a ordem.
+    `ao_concluir(nome, status)` é chamado (da thread de cada matéria) assim que ela termina.
+    """
+    def tarefa(nome, url):
+        status = verificar_materia_http(sessao, nome, url, estado)
+        if ao_concluir:
+            ao_concluir(nome, status)
+        return status
+
+    with ThreadPoolExecutor(max_workers=max(1, limite)) as executor:
+        futuros = {nome: executor.submit(tarefa, nome, url) for nome, url in materias.items()}
+        return {nome: futuros[nome].result() for nome in materias}
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Motor WS: consulta o status das atividades pela API REST de Web Services
+do Moodle, sem baixar nem interpretar páginas.
+
+Os cursos do usuário são descobertos pela própria API
+(core_enrol_get_users_courses). O conteúdo, a conclusão e os envios de
+tarefa vêm em poucas idas ao servidor: as chamadas por curso e por tarefa
+são agrupadas com tool_mobile_call_external_functions (serviço do app
+móvel). Se o site não permitir o agrupamento, as mesmas chamadas são
+feitas em paralelo. O resultado usa o mesmo modelo de status do
+classificador de HTML.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import instrumentacao
+from atividades import Atividade, ROTULOS_VENCIMENTO
+from classificador import resumir_status
+from resiliencia import PoliticaRepeticao
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) MoodleBot/2.0"
+SERVICO_PADRAO = "moodle_mobile_app"
+LOTE_MAXIMO = 50
+
+# Estados de core_completion_get_activities_completion_status
+CONCLUSAO_INCOMPLETA, CONCLUSAO_COMPLETA, CONCLUSAO_APROVADA, CONCLUSAO_REPROVADA = 0, 1, 2, 3
+ENVIO_ENTREGUE = {"submitted"}
+# Módulos de entrega: neles a conclusão incompleta é pendência (nos demais, como material e
+# fórum sem prazo, a página do curso não mostra nada e o classificador de HTML também não)
+MODULOS_ENTREGAVEIS = {"assign", "quiz", "workshop"}
+# Envio nunca começado: a página do curso não mostra nada, quem decide é a conclusão
+ENVIO_NAO_INICIADO = {"new"}
+
+
+class ErroWS(Exception):
+    """Erro devolvido pela API (exception/errorcode no JSON)."""
+
+    def __init__(self, mensagem, codigo=None):
+        super().__init__(mensagem)
+        self.codigo = codigo
+
+
+class TokenInvalido(ErroWS):
+    """Token ausente, expirado ou revogado: é preciso pedir outro."""
+
+
+def achatar_parametros(valor, prefixo=""):
+    """{'courseids': [1, 2]} -> {'courseids[0]': 1, 'courseids[1]': 2} (formato da API REST)."""
+    if isinstance(valor, dict):
+        itens = valor.items()
+    elif isinstance(valor, (list, tuple)):
+        itens = enumerate(valor)
+    else:
+        return {prefixo: int(valor) if isinstance(valor, bool) else valor}
+    saida = {}
+    for chave, filho in itens:
+        saida.update(achatar_parametros(filho, f"{prefixo}[{chave}]" if prefixo else str(chave)))
+    return saida
+
+def _verificar_erro(dados):
+    if isinstance(dados, dict) and "exception" in dados:
+        classe = TokenInvalido if dados.get("errorcode") == "invalidtoken" else ErroWS
+        raise classe(dados.get("message", dados["exception"]), dados.get("errorcode"))
+    return dados
+
+
+class ClienteMoodleWS:
+    """Cliente da API REST do Moodle, com pool de conexões e chamadas em lote."""
+
+    def __init__(self, url_base, token=None, tamanho_pool=10, timeout=20, servico=SERVICO_PADRAO, politica=None):
+        self.url_base = url_base.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self.servico = servico
+        self.politica = politica or PoliticaRepeticao()
+        self.tamanho_pool = tamanho_pool
+        # None = ainda não sabemos se o site aceita tool_mobile_call_external_functions
+        self.lote_disponivel = None
+
+        self.session = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=tamanho_pool, pool_maxsize=tamanho_pool)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+        self.session.headers["User-Agent"] = USER_AGENT
+
+    @instrumentacao.span("login")
+    def obter_token(self, usuario, senha):
+        """Pede um token ao /login/token.php. Retorna True se o Moodle aceitou as credenciais."""
+        resposta = self.session.post(
+            f"{self.url_base}/login/token.php",
+            data={"username": usuario, "password": senha, "service": self.servico},
+            timeout=self.timeout,
+        )
+        resposta.raise_for_status()
+        self.token = resposta.json().get("token")
+        return bool(self.token)
+
+    def chamar(self, funcao, **parametros):
+        """Uma chamada à API. Lança ErroWS/TokenInvalido se o Moodle devolver uma exceção."""
+        if not self.token:
+            raise TokenInvalido("sem token da API")
+        dados = {"wstoken": self.token, "wsfunction": funcao, "moodlewsrestformat": "json"}
+        dados.update(achatar_parametros(parametros))
+        resposta = self.politica.executar(self._enviar, dados, descricao=funcao)
+        return _verificar_erro(resposta.json())
+
+    def _enviar(self, dados):
+        resposta = self.session.post(f"{self.url_base}/webservice/rest/server.php", data=dados, timeout=self.timeout)
+        resposta.raise_for_status()
+        return resposta
+
+    @instrumentacao.span("api")
+    def chamar_em_lote(self, chamadas):
+        """
+        Executa [(funcao, parametros), ...] e devolve os resultados na mesma
+        ordem; chamadas que falharam voltam como instâncias de ErroWS.
+        """
+        if not chamadas:
+            return []
+        if self.lote_disponivel is not False:
+            try:
+                resultados = []
+                for inicio in range(0, len(chamadas), LOTE_MAXIMO):
+                    resultados.extend(self._lote(chamadas[inicio:inicio + LOTE_MAXIMO]))
+                self.lote_disponivel = True
+                return resultados
+            except TokenInvalido:
+                raise
+            except ErroWS as e:
+                if self.lote_disponivel:
+                    raise
+                print(f"⚠️ Chamadas em lote indisponíveis ({e}); usando chamadas paralelas.")
+                self.lote_disponivel = False
+        return self._paralelo(chamadas)
+
+    def _lote(self, chamadas):
+        pedidos = [
+            {"function": funcao, "arguments": json.dumps(parametros), "settingfilter": 1, "settingraw": 0}
+            for funcao, parametros in chamadas
+        ]
+        respostas = self.chamar("tool_mobile_call_external_functions", requests=pedidos)["responses"]
+        resultados = []
+        for resposta in respostas:
+            if resposta.get("error"):
+                erro = json.loads(resposta.get("exception") or "{}")
+                resultados.append(ErroWS(erro.get("message", "erro na chamada"), erro.get("errorcode")))
+            else:
+                resultados.append(json.loads(resposta["data"]))
+        return resultados
+
+    def _paralelo(self, chamadas):
+        def executar(chamada):
+            funcao, parametros = chamada
+            try:
+                return self.chamar(funcao, **parametros)
+            except TokenInvalido:
+                raise
+            except ErroWS as e:
+                return e
+        with ThreadPoolExecutor(max_workers=max(1, self.tamanho_pool)) as executor:
+            return list(executor.map(executar, chamadas))
+
+    def fechar(self):
+        self.session.close()
+
+
+# ===============================
+# 🔍 STATUS DAS ATIVIDADES
+# ===============================
+
+def _data(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M") if timestamp else None
+
+def _vencimento_modulo(modulo):
+    """Data de vencimento pelas datas do módulo (Moodle 4: [{label, timestamp}])."""
+    for data in modulo.get("dates") or []:
+        if any(rotulo in (data.get("label") or "").lower() for rotulo in ROTULOS_VENCIMENTO):
+            return _data(data.get("timestamp"))
+    return None
+
+def _status_envio(resposta):
+    """'entregue'/'pendente' pelo mod_assign_get_submission_status (None se não der para saber)."""
+    if isinstance(resposta, ErroWS) or not resposta:
+        return None
+    tentativa = resposta.get("lastattempt") or {}
+    if tentativa.get("gradingstatus") == "graded":
+        return "entregue"
+    envio = tentativa.get("submission") or tentativa.get("teamsubmission")
+    if not envio or envio.get("status") in ENVIO_NAO_INICIADO:
+        return None
+    return "entregue" if envio.get("status") in ENVIO_ENTREGUE else "pendente"
+
+def _status_conclusao(estado_conclusao, entregavel=True):
+    """
+    Situação pela conclusão; None = atividade sem acompanhamento de conclusão.
+    Incompleta só é pendente em módulos `entregavel` (de entrega ou com vencimento).
+    """
+    if estado_conclusao in (CONCLUSAO_COMPLETA, CONCLUSAO_APROVADA):
+        return "entregue"
+    if estado_conclusao == CONCLUSAO_REPROVADA or (estado_conclusao == CONCLUSAO_INCOMPLETA and entregavel):
+        return "pendente"
+    return "indefinido"
+
+def id_do_curso(url):
+    """'.../course/view.php?id=6450' -> 6450 (ou None)."""
+    valores = parse_qs(urlparse(url or "").query).get("id")
+    return int(valores[0]) if valores and valores[0].isdigit() else None
+
+def atividades_do_curso(nome_materia, conteudo, conclusao, tarefas, envios):
+    """Junta as respostas da API num registro por atividade (mesmo formato do classificador)."""
+    estados = {}
+    if not isinstance(conclusao, ErroWS):
+        estados = {s["cmid"]: s.get("state") for s in (conclusao or {}).get("statuses", [])}
+    detalhe = []
+    for secao in conteudo if not isinstance(conteudo, ErroWS) else []:
+        for modulo in secao.get("modules", []):
+            if modulo.get("uservisible") is False or modulo.get("modname") == "label":
+                continue
+            cmid = modulo["id"]
+            tarefa = tarefas.get(cmid)
+            vencimento = (_data(tarefa.get("duedate")) if tarefa else None) or _vencimento_modulo(modulo)
+            situacao = _status_envio(envios.get(tarefa["id"])) if tarefa else None
+            if situacao is None:
+                entregavel = modulo.get("modname") in MODULOS_ENTREGAVEIS or vencimento is not None
+                situacao = _status_conclusao(estados.get(cmid), entregavel)
+            detalhe.append(Atividade(
+                nome_materia, cmid, modulo.get("modname"), modulo.get("name", ""),
+                vencimento, situacao, modulo.get("url"),
+            ).como_dict())
+    return detalhe
+
+def nome_do_curso(curso, nomes_por_id):
+    return nomes_por_id.get(curso["id"]) or curso.get("fullname") or curso.get("shortname") or str(curso["id"])
+
+def varrer_cursos_ws(cliente, nomes_por_id=None, somente=None):
+    """
+    Descobre os cursos do usuário e devolve {nome da matéria: status}.
+    Cursos cujo id aparece em `nomes_por_id` usam o nome configurado, para
+    o histórico continuar com os mesmos nomes; os demais usam o nome completo.
+    Com `somente` (nomes), só esses cursos são consultados.
+    """
+    nomes_por_id = nomes_por_id or {}
+    with instrumentacao.span("api"):
+        usuario = cliente.chamar("core_webservice_get_site_info")["userid"]
+        cursos = cliente.chamar("core_enrol_get_users_courses", userid=usuario)
+    print(f"📚 {len(cursos)} curso(s) encontrado(s) pela API.")
+    if somente is not None:
+        cursos = [c for c in cursos if nome_do_curso(c, nomes_por_id) in somente]
+    if not cursos:
+        return {}
+    ids = [c["id"] for c in cursos]
+
+    # 1º lote: conteúdo e conclusão de cada curso + todas as tarefas de uma vez
+    chamadas = [("mod_assign_get_assignments", {"courseids": ids})]
+    for id_curso in ids:
+        chamadas.append(("core_course_get_contents", {"courseid": id_curso}))
+        chamadas.append(("core_completion_get_activities_completion_status", {"courseid": id_curso, "userid": usuario}))
+    respostas = cliente.chamar_em_lote(chamadas)
+
+    tarefas_por_curso = {}
+    if not isinstance(respostas[0], ErroWS):
+        for curso in respostas[0].get("courses", []):
+            tarefas_por_curso[curso["id"]] = {t["cmid"]: t for t in curso.get("assignments", [])}
+
+    # 2º lote: situação do envio de cada tarefa
+    ids_tarefas = [t["id"] for tarefas in tarefas_por_curso.values() for t in tarefas.values()]
+    envios = dict(zip(ids_tarefas, cliente.chamar_em_lote(
+        [("mod_assign_get_submission_status", {"assignid": id_tarefa}) for id_tarefa in ids_tarefas]
+    )))
+
+    resultados = {}
+    for i, curso in enumerate(cursos):
+        nome = nome_do_curso(curso, nomes_por_id)
+        conteudo, conclusao = respostas[1 + 2 * i], respostas[2 + 2 * i]
+        if isinstance(conteudo, ErroWS):
+            print(f"❌ Erro ao processar {nome}: {conteudo}")
+            resultados[nome] = {"trabalho_encontrado": False, "pendente": False, "observacao": f"Erro ({conteudo})"}
+            continue
+        detalhe = atividades_do_curso(nome, conteudo, conclusao, tarefas_por_curso.get(curso["id"], {}), envios)
+        resultados[nome] = resumir_status(nome, detalhe)
+    return resultados
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Modo multicontas: varre as matérias de vários alunos num único processo.
+
+Cada conta (contas.json) tem suas credenciais, sua lista de matérias, sua
+sessão (cookies próprios, cache de sessão e estado incremental em
+contas/<nome>/cache) e seus resultados (contas/<nome>/logs e
+contas/<nome>/dados/moodle_bot.db, no mesmo formato da conta principal).
+
+Todas as contas dividem um único laço asyncio, o mesmo pool de conexões, o
+limitador de taxa por host, o disjuntor do Moodle e um pool de processos
+para a classificação, que escala com os núcleos. A justiça entre contas vem do limite por conta: cada
+uma ocupa no máximo `limite` das vagas globais, então uma conta com centenas
+de matérias não atrasa as outras.
+
+    python core/multicontas.py --contas contas.json
+    python core/multicontas.py --somente ana bruno --concorrencia 40
+
+Formato de contas.json (url/materias ausentes = MOODLE_URL / CONFIGURACOES):
+    [
+      {"nome": "ana", "usuario": "ana.souza", "senha_env": "SENHA_ANA",
+       "materias": {"Redes": "https://.../course/view.php?id=6545"}},
+      {"nome": "bruno", "usuario": "bruno", "senha": "...", "limite": 2}
+    ]
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import aiohttp
+
+import armazem
+import instrumentacao
+from bot_visual import CONFIGURACOES, gerar_relatorio, obter_caminho_completo, obter_politica
+from estado_incremental import EstadoIncremental
+from motor_async import SessaoMoodleAsync, verificar_materia_async
+
+PASTA_CONTAS = "contas"
+RE_NOME_CONTA = re.compile(r"^[\w.-]+$")
+
+
+class Conta:
+    """Uma conta do Moodle com suas matérias e suas pastas de trabalho."""
+
+    def __init__(self, nome, usuario, senha, url_login, materias, limite=4):
+        if not RE_NOME_CONTA.match(nome or ""):
+            raise ValueError(f"nome de conta inválido: {nome!r} (use letras, números, '.', '-' ou '_')")
+        self.nome = nome
+        self.usuario = usuario
+        self.senha = senha
+        self.url_login = url_login
+        self.materias = materias
+        self.limite = max(1, limite)
+
+    def pasta(self, tipo=""):
+        """contas/<nome>/<tipo> (logs, dados ou cache), criada sob demanda."""
+        caminho = obter_caminho_completo(PASTA_CONTAS, os.path.join(self.nome, tipo))
+        os.makedirs(caminho, exist_ok=True)
+        return caminho
+
+    @property
+    def caminho_banco(self):
+        return os.path.join(self.pasta("dados"), armazem.ARQUIVO_BANCO)
+
+    def __repr__(self):
+        return f"Conta({self.nome!r}, {len(self.materias)} matéria(s))"
+
+
+def carregar_contas(caminho, limite_padrao=4):
+    """Lê contas.json. A senha vem de `senha` ou da variável de ambiente em `senha_env`."""
+    with open(caminho, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    contas = []
+    for item in dados.get("contas", []) if isinstance(dados, dict) else dados:
+        senha = os.getenv(item["senha_env"]) if item.get("senha_env") else item.get("senha")
+        if not item.get("usuario") or not senha:
+            raise ValueError(f"conta {item.get('nome')!r} sem usuário ou senha")
+        contas.append(Conta(
+            item["nome"], item["usuario"], senha,
+            item.get("url") or CONFIGURACOES["moodle"]["url_login"],
+            item.get("materias") or dict(CONFIGURACOES["materias"]),
+            item.get("limite", limite_padrao),
+        ))
+    nomes = [c.nome for c in contas]
+    repetidos = {n for n in nomes if nomes.count(n) > 1}
+    if repetidos:
+        raise ValueError(f"contas repetidas em {caminho}: {', '.join(sorted(repetidos))}")
+    return contas
+
+
+class VagaConta:
+    """Uma vaga da conta e, dentro dela, uma vaga global (nessa ordem, para a fila global ser justa)."""
+
+    def __init__(self, da_conta, global_):
+        self.da_conta = da_conta
+        self.global_ = global_
+
+    async def __aenter__(self):
+        await self.da_conta.acquire()
+        try:
+            await self.global_.acquire()
+        except BaseException:
+            self.da_conta.release()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        self.global_.release()
+        self.da_conta.release()
+
+
+# ===============================
+# 🔁 VARREDURA DE UMA CONTA
+# ===============================
+
+def _cookies_em_cache(conta):
+    if not CONFIGURACOES["sessao"]["cache"]:
+        return None
+    from cache_sessao import apagar_sessao, carregar_sessao, sessao_valida
+    cookies = carregar_sessao(conta.pasta("cache"), conta.usuario)
+    if cookies and not sessao_valida(conta.url_login, cookies):
+        apagar_sessao(conta.pasta("cache"))
+        return None
+    return cookies
+
+def _guardar_cookies(conta, cookies):
+    if CONFIGURACOES["sessao"]["cache"] and cookies:
+        from cache_sessao import salvar_sessao
+        salvar_sessao(conta.pasta("cache"), conta.usuario, cookies, CONFIGURACOES["sessao"]["validade_h"])
+
+async def varrer_conta(conta, vaga_global, conector, limitadores, pool, motor="async"):
+    """Login (ou sessão em cache) + todas as matérias da conta; grava relatório e armazém da conta."""
+    loop = asyncio.get_running_loop()
+    execucao = CONFIGURACOES["execucao"]
+    vaga = VagaConta(asyncio.Semaphore(conta.limite), vaga_global)
+    estado = EstadoIncremental(conta.pasta("cache")) if execucao["incremental"] else None
+    inicio = time.perf_counter()
+    # Cada conta roda na sua tarefa asyncio: os spans dela saem marcados com o nome
+    instrumentacao.definir_conta(conta.nome)
+
+    async with SessaoMoodleAsync(conta.url_login, conta.limite, execucao["taxa_por_host"],
+                                 CONFIGURACOES["moodle"]["timeout_login"], conector, limitadores,
+                                 obter_politica()) as sessao:
+        cookies = await loop.run_in_executor(None, contextvars.copy_context().run, _cookies_em_cache, conta)
+        if cookies:
+            sessao.importar_cookies(cookies)
+        else:
+            async with vaga:
+                autenticado = await sessao.login(conta.usuario, conta.senha)
+            if not autenticado:
+                print(f"❌ [{conta.nome}] Falha no login.")
+                return None
+            await loop.run_in_executor(None, _guardar_cookies, conta, sessao.exportar_cookies())
+
+        tarefas = [verificar_materia_async(sessao, vaga, pool, nome, url, estado) for nome, url in conta.materias.items()]
+        resultados = dict(await asyncio.gather(*tarefas))
+
+    resultados = {nome: resultados[nome] for nome in conta.materias}
+    # Gravação do relatório e do armazém fora do laço de eventos: as outras contas seguem varrendo
+    if estado:
+        await loop.run_in_executor(None, estado.salvar)
+    await loop.run_in_executor(
+        None, contextvars.copy_context().run,
+        gerar_relatorio, motor, resultados, conta.pasta("logs"), conta.caminho_banco,
+    )
+    print(f"🏁 [{conta.nome}] {len(resultados)} matéria(s) em {time.perf_counter() - inicio:.2f}s")
+    return resultados
+
+async def varrer_contas(contas, concorrencia=20, workers_parse=None):
+    """
+    Varre todas as contas ao mesmo tempo. `concorrencia` é o total de
+    requisições simultâneas somando as contas. Retorna {conta: resultados}
+    (None para contas cujo login falhou).
+    """
+    vaga_global = asyncio.Semaphore(max(1, concorrencia))
+    limitadores = {}
+    conector = aiohttp.TCPConnector(limit=max(1, concorrencia))
+    try:
+        with ProcessPoolExecutor(max_workers=workers_parse) as pool:
+            tarefas = [varrer_conta(c, vaga_global, conector, limitadores, pool) for c in contas]
+            saida = await asyncio.gather(*tarefas, return_exceptions=True)
+    finally:
+        await conector.close()
+
+    resultados = {}
+    for conta, resultado in zip(contas, saida):
+        if isinstance(resultado, Exception):
+            print(f"❌ [{conta.nome}] Varredura interrompida: {resultado}")
+            resultado = None
+        resultados[conta.nome] = resultado
+    return resultados
+
+
+if __name__ == "__main__":
+    execucao = CONFIGURACOES["execucao"]
+    parser = argparse.ArgumentParser(description="Moodle Bot — várias contas num só processo")
+    parser.add_argument("--contas", default=os.getenv("MOODLE_CONTAS", obter_caminho_completo("contas.json")))
+    parser.add_argument("--somente", nargs="+", help="nomes das contas a varrer (padrão: todas)")
+    parser.add_argument("--concorrencia", type=int, default=execucao["concorrencia"] or max(execucao["sessoes"], 20),
+                        help="requisições simultâneas somando todas as contas")
+    parser.add_argument("--limite-por-conta", type=int, default=int(os.getenv("MOODLE_LIMITE_POR_CONTA", "4")))
+    parser.add_argument("--processos", type=int, default=None, help="processos de classificação (padrão: nº de núcleos)")
+    args = parser.parse_args()
+
+    contas = carregar_contas(args.contas, args.limite_por_conta)
+    if args.somente:
+        contas = [c for c in contas if c.nome in args.somente]
+    print(f"👥 {len(contas)} conta(s), {sum(len(c.materias) for c in contas)} matéria(s), "
+          f"concorrência {args.concorrencia} (até {args.limite_por_conta} por conta)")
+
+    inicio = time.perf_counter()
+    instrumentacao.iniciar_execucao("async")
+    try:
+        resultados = asyncio.run(varrer_contas(contas, args.concorrencia, args.processos))
+    finally:
+        # Spans de todas as contas juntos, cada um com sua conta, nas métricas da conta principal
+        instrumentacao.finalizar_execucao(obter_caminho_completo(CONFIGURACOES["pastas"]["dados"]))
+    falhas = [nome for nome, r in resultados.items() if r is None]
+    print(f"\n🏁 {len(contas) - len(falhas)}/{len(contas)} conta(s) concluída(s) em {time.perf_counter() - inicio:.2f}s")
+    if falhas:
+        print(f"❌ Falharam: {', '.join(falhas)}")
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Tolerância a falhas da varredura: repetição com espera, disjuntor e checkpoint.
+
+- Falhas transitórias (timeout, conexão recusada/derrubada, HTTP 429/5xx)
+  são repetidas com espera exponencial e variação aleatória.
+- O disjuntor conta falhas seguidas do Moodle: passado o limite, ele abre e
+  as requisições seguintes falham na hora, sem bater no servidor, até o fim
+  da pausa; então uma única requisição de teste decide se ele fecha de novo.
+- O checkpoint grava o status de cada matéria assim que ela termina
+  (cache/checkpoint_execucao.jsonl). Se o processo cair, `--retomar` varre
+  só as matérias que faltaram ou falharam.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+ARQUIVO_CHECKPOINT = "checkpoint_execucao.jsonl"
+
+# Exceções de rede/tempo esgotado, pelo nome da classe (requests, aiohttp, selenium e builtins),
+# para não importar as bibliotecas dos motores que não estão em uso
+ERROS_TRANSITORIOS = {
+    "ConnectionError", "Timeout", "TimeoutError", "TimeoutException", "ChunkedEncodingError",
+    "ClientConnectionError", "ClientPayloadError", "ServerDisconnectedError", "ServerTimeoutError",
+}
+CODIGOS_TRANSITORIOS = {429, 500, 502, 503, 504}
+
+
+class CircuitoAberto(Exception):
+    """O disjuntor está aberto: o Moodle falhou demais e as requisições estão suspensas."""
+
+
+def eh_transitoria(erro):
+    """True para falhas que valem uma nova tentativa (rede, tempo esgotado, HTTP 429/5xx)."""
+    if isinstance(erro, CircuitoAberto):
+        return False
+    if any(classe.__name__ in ERROS_TRANSITORIOS for classe in type(erro).__mro__):
+        return True
+    # requests.HTTPError traz a resposta; aiohttp.ClientResponseError traz o código
+    codigo = getattr(getattr(erro, "response", None), "status_code", None) or getattr(erro, "status", None)
+    if codigo in CODIGOS_TRANSITORIOS:
+        return True
+    # Selenium: falhas de rede do Chrome chegam como WebDriverException com net::ERR_*
+    return "net::ERR_" in str(erro)
+
+
+# ===============================
+# 🔌 DISJUNTOR
+# ===============================
+
+class Disjuntor:
+    """Disjuntor (circuit breaker) compartilhado entre as threads/tarefas que falam com o mesmo Moodle."""
+
+    def __init__(self, falhas_limite=5, pausa_s=60.0, relogio=time.monotonic):
+        self.falhas_limite = max(1, falhas_limite)
+        self.pausa_s = pausa_s
+        self.relogio = relogio
+        self.falhas = 0
+        self.aberto_ate = None
+        self.em_teste = False
+        self.trava = threading.Lock()
+
+    @property
+    def estado(self):
+        with self.trava:
+            if self.aberto_ate is None:
+                return "fechado"
+            return "meio-aberto" if self.relogio() >= self.aberto_ate else "aberto"
+
+    def verificar(self):
+        """Lança CircuitoAberto se a requisição não deve sair agora."""
+        with self.trava:
+            if self.aberto_ate is None:
+                return
+            restante = self.aberto_ate - self.relogio()
+            if restante > 0:
+                raise CircuitoAberto(f"Moodle instável, requisições suspensas por mais {restante:.0f}s")
+            # Meio-aberto: só uma requisição de teste por vez
+            if self.em_teste:
+                raise CircuitoAberto("Moodle instável, aguardando a requisição de teste")
+            self.em_teste = True
+
+    def sucesso(self):
+        with self.trava:
+            if self.aberto_ate is not None:
+                print("🔌 Moodle respondeu de novo — requisições liberadas.")
+            self.falhas = 0
+            self.aberto_ate = None
+            self.em_teste = False
+
+    def falha(self):
+        with self.trava:
+            self.falhas += 1
+            if self.em_teste or self.falhas >= self.falhas_limite:
+                print(f"🔌 Moodle instável ({self.falhas} falha(s) seguida(s)) — "
+                      f"requisições suspensas por {self.pausa_s:.0f}s.")
+                self.aberto_ate = self.relogio() + self.pausa_s
+                self.em_teste = False
+
+
+class PoliticaRepeticao:
+    """Tentativas com espera exponencial (com variação) sob um disjuntor."""
+
+    def __init__(self, tentativas=3, espera_s=1.0, espera_max_s=30.0, disjuntor=None, rnd=None):
+        self.tentativas = max(1, tentativas)
+        self.espera_s = espera_s
+        self.espera_max_s = espera_max_s
+        self.disjuntor = disjuntor or Disjuntor()
+        self.rnd = rnd or random.Random()
+
+    def espera(self, tentativa):
+        """Espera antes da próxima tentativa: base * 2^(n-1), limitada, entre 50% e 100% do valor."""
+        return min(self.espera_max_s, self.espera_s * 2 ** (tentativa - 1)) * self.rnd.uniform(0.5, 1.0)
+
+    def _falhou(self, erro, tentativa, descricao):
+        """Registra a falha; retorna a espera antes de tentar de novo ou None para desistir."""
+        if not eh_transitoria(erro):
+            # O Moodle respondeu (404, sessão expirada...): o servidor em si está de pé
+            if not isinstance(erro, CircuitoAberto):
+                self.disjuntor.sucesso()
+            return None
+        self.disjuntor.falha()
+        if tentativa >= self.tentativas:
+            return None
+        espera = self.espera(tentativa)
+        print(f"🔁 {descricao or 'Requisição'} falhou ({erro}); tentativa {tentativa + 1}/{self.tentativas} "
+              f"em {espera:.1f}s.")
+        return espera
+
+    def executar(self, funcao, *args, descricao=None, **kwargs):
+        for tentativa in range(1, self.tentativas + 1):
+            self.disjuntor.verificar()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except Exception as e:
+                espera = self._falhou(e, tentativa, descricao)
+                if espera is None:
+                    raise
+                time.sleep(espera)
+                continue
+            self.disjuntor.sucesso()
+            return resultado
+
+    async def executar_async(self, funcao, *args, descricao=None, **kwargs):
+        for tentativa in range(1, self.tentativas + 1):
+            self.disjuntor.verificar()
+            try:
+                resultado = await funcao(*args, **kwargs)
+            except Exception as e:
+                espera = self._falhou(e, tentativa, descricao)
+                if espera is None:
+                    raise
+                await asyncio.sleep(espera)
+                continue
+            self.disjuntor.sucesso()
+            return resultado
+
+
+# ===============================
+# 💾 CHECKPOINT DA EXECUÇÃO
+# ===============================
+
+class Checkpoint:
+    """
+    Status de cada matéria gravado (e sincronizado em disco) assim que ela
+    termina, uma linha JSON por matéria, depois de uma linha de cabeçalho.
+    Uma linha {"tipo": "relatorio"} marca que o relatório da execução já
+    foi gravado (e o checkpoint ficou só por causa das matérias com erro).
+    """
+
+    def __init__(self, pasta, validade_h=12):
+        self.caminho = os.path.join(pasta, ARQUIVO_CHECKPOINT)
+        self.validade = timedelta(hours=validade_h)
+        self.trava = threading.Lock()
+
+    def _ler(self):
+        """
+        (cabeçalho, {matéria: status}, relatório gravado?) do arquivo,
+        ignorando uma última linha cortada pela queda.
+        """
+        cabecalho, concluidas, relatorio = None, {}, False
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except ValueError:
+                        continue
+                    if registro.get("tipo") == "inicio":
+                        cabecalho = registro
+                    elif registro.get("tipo") == "materia":
+                        concluidas[registro["materia"]] = registro["status"]
+                    elif registro.get("tipo") == "relatorio":
+                        relatorio = True
+        except OSError:
+            pass
+        return cabecalho, concluidas, relatorio
+
+    def pendente(self):
+        """Resumo de uma execução interrompida ainda válida, ou None."""
+        cabecalho, concluidas, _ = self._ler()
+        if not cabecalho or datetime.now() - datetime.fromisoformat(cabecalho["inicio"]) > self.validade:
+            return None
+        ok = sum(1 for s in concluidas.values() if not s.get("observacao", "").startswith("Erro"))
+        return {"motor": cabecalho.get("motor"), "inicio": cabecalho["inicio"],
+                "concluidas": ok, "total": len(cabecalho.get("materias", []))}
+
+    def retomar(self, motor, materias):
+        """
+        (status já concluídos sem erro, relatório gravado?) da execução
+        interrompida, que continua neste mesmo checkpoint. Sem checkpoint
+        válido, começa um novo e retorna ({}, False). Vêm todas as matérias
+        concluídas, inclusive cursos descobertos pela API (motor ws) que não
+        estão em `materias`. Se o relatório já foi gravado, elas já estão
+        nele e não devem entrar de novo no próximo.
+        """
+        cabecalho, concluidas, relatorio = self._ler()
+        if not cabecalho or datetime.now() - datetime.fromisoformat(cabecalho["inicio"]) > self.validade:
+            print("ℹ️ Nenhuma execução interrompida para retomar — varrendo tudo.")
+            self.iniciar(motor, materias)
+            return {}, False
+        if cabecalho.get("motor") != motor:
+            print(f"ℹ️ A execução interrompida usava o motor {cabecalho.get('motor')}; os resultados valem igual.")
+        prontas = {
+            nome: status for nome, status in concluidas.items()
+            if not status.get("observacao", "").startswith("Erro")
+        }
+        print(f"⏯️ Retomando a execução de {cabecalho['inicio']}: "
+              f"{len(prontas.keys() & set(materias))}/{len(materias)} matéria(s) já concluída(s)"
+              + (", já no relatório anterior." if relatorio else "."))
+        return prontas, relatorio
+
+    def com_erro(self):
+        """Matérias que terminaram com erro no checkpoint atual."""
+        _, concluidas, _ = self._ler()
+        return [nome for nome, status in concluidas.items() if status.get("observacao", "").startswith("Erro")]
+
+    def iniciar(self, motor, materias):
+        """Descarta o checkpoint anterior e abre um novo para esta execução."""
+        with self.trava:
+            with open(self.caminho, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"tipo": "inicio", "motor": motor, "materias": list(materias),
+                                    "inicio": datetime.now().isoformat(timespec="seconds")}, ensure_ascii=False) + "\n")
+
+    def registrar(self, nome, status):
+        """Grava uma matéria concluída (chamado de várias threads/tarefas)."""
+        linha = json.dumps({
+            "tipo": "materia",
+            "materia": nome,
+            "status": {k: v for k, v in status.items() if k != "tempos"},
+        }, ensure_ascii=False) + "\n"
+        with self.trava:
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(linha)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def registrar_relatorio(self):
+        """Marca que o relatório desta execução foi gravado (o checkpoint fica pelas matérias com erro)."""
+        with self.trava:
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"tipo": "relatorio"}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def concluir(self):
+        """Execução completa e relatório gravado: o checkpoint não serve mais."""
+        with self.trava:
+            if os.path.exists(self.caminho):
+                os.remove(self.caminho)
@@ -1,10 +1,10 @@
 # dashboard/app.py
 import streamlit as st
 import pandas as pd
-import os
+import shutil
 import plotly.express as px
 from datetime import datetime, timedelta
-import re
+import sys
 import logging
 from pathlib import Path
 
@@ -20,112 +20,122 @@ logger = logging.getLogger(__name__)
 SCRIPT_DIR = Path(__file__).parent
 LOGS_DIR = SCRIPT_DIR.parent / "logs"
 
+# O armazém é compartilhado com o bot (core/armazem.py)
+sys.path.insert(0, str(SCRIPT_DIR.parent / "core"))
+import armazem
+
+from ingestao import IngestorHistorico, STATUS_ORDER, filtrar_rollup
+from observador import ObservadorLogs
+import latencia
+import tabela
+
+BANCO_PATH = SCRIPT_DIR.parent / "dados" / armazem.ARQUIVO_BANCO
+# Spans do bot (core/instrumentacao.py); os das outras contas vêm marcados com o nome
+METRICAS_DIR = SCRIPT_DIR.parent / "dados" / "metricas"
+CACHE_DIR = SCRIPT_DIR.parent / "cache"
+# Modo multicontas (core/multicontas.py): contas/<nome>/{logs,dados,cache}
+CONTAS_DIR = SCRIPT_DIR.parent / "contas"
+CONTA_PRINCIPAL = "Principal"
+
 # Verificação segura do diretório de logs
 if not LOGS_DIR.exists():
     logger.error(f"O diretório de logs não foi encontrado em: {LOGS_DIR}")
     LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
-STATUS_MAP = {"❌": "Pendente", "✅": "Em dia", "🔍": "Sem trabalho"}
-STATUS_ORDER = ["Pendente", "Em dia", "Sem trabalho"]
+# Exportações CSV que versões anteriores do painel gravavam em disco e nunca apagavam
+shutil.rmtree(CACHE_DIR / "exportacoes", ignore_errors=True)
+
 STATUS_COLORS = {"Pendente": "#E63946", "Em dia": "#2A9D8F", "Sem trabalho": "#8D99AE"}
+ORIGEM_COLORS = {"moodle": "#F4A261", "chrome": "#457B9D", "bot": "#2A9D8F"}
+
+# Até quantos dias a linha do tempo usa o agregado por hora em vez do diário
+PERIODO_MAX_POR_HORA_DIAS = 3
 
 # ===============================
-# 🧠 FUNÇÕES DE DADOS (COM CACHE)
+# 🧠 FUNÇÕES DE DADOS (INGESTÃO INCREMENTAL)
 # ===============================
 
-@st.cache_data(ttl=300)  # Cache expira após 5 minutos
-def carregar_historico_logs():
+def listar_contas():
+    """Conta principal + contas do modo multicontas que já têm resultados."""
+    contas = []
+    if CONTAS_DIR.exists():
+        contas = sorted(p.name for p in CONTAS_DIR.iterdir() if (p / "dados").exists() or (p / "logs").exists())
+    return [CONTA_PRINCIPAL] + contas
+
+def pastas_da_conta(conta):
+    """(banco, logs, cache) da conta escolhida."""
+    if conta == CONTA_PRINCIPAL:
+        return BANCO_PATH, LOGS_DIR, CACHE_DIR
+    raiz = CONTAS_DIR / conta
+    (raiz / "logs").mkdir(parents=True, exist_ok=True)
+    return raiz / "dados" / armazem.ARQUIVO_BANCO, raiz / "logs", raiz / "cache"
+
+@st.cache_resource
+def obter_ingestor(conta=CONTA_PRINCIPAL):
+    """Um único ingestor por conta e por processo, compartilhado entre as sessões."""
+    ingestor = IngestorHistorico(*pastas_da_conta(conta))
+    try:
+        ingestor.atualizar()
+    except Exception as e:
+        logger.error(f"Erro ao carregar logs: {e}")
+    return ingestor
+
+@st.cache_resource
+def obter_observador(conta=CONTA_PRINCIPAL):
+    """Observa a pasta de logs da conta em segundo plano e ingere cada relatório novo assim que ele aparece."""
+    return ObservadorLogs(obter_ingestor(conta), pastas_da_conta(conta)[1]).iniciar()
+
+def carregar_historico_logs(conta=CONTA_PRINCIPAL):
     """
-    Lê TODOS os logs da pasta e os consolida em um único DataFrame histórico.
-    Compatível com arquivos 'relatorio_YYYYMMDD_HHMMSS.txt' e 'log_YYYY-MM-DD_HH-MM-SS.txt'.
+    Histórico consolidado (mais recente primeiro), já mantido em dia pelo
+    observador: a execução do script só lê o DataFrame em memória.
     """
-    historico = []
+    observador = obter_observador(conta)
+    st.session_state.versao_dados = observador.versao
+    return observador.ingestor
 
-    filename_pattern = re.compile(
-        r"(?:log_|relatorio_)?(\d{4})[-_]?(\d{2})[-_]?(\d{2})[-_]?(\d{2})(\d{2})(\d{2})\.txt"
-    )
-    line_pattern = re.compile(r"^(?P<icon>❌|✅|🔍)\s*(?P<materia>.+?)(?:\s*-\s*(?P<detalhes>.+))?$")
+@st.cache_data(ttl=60, show_spinner=False)
+def carregar_spans(conta, inicio, fim):
+    """Spans do período para a aba de latência (relidos no máximo a cada minuto)."""
+    return latencia.carregar_spans(METRICAS_DIR, inicio, fim, None if conta == CONTA_PRINCIPAL else conta)
 
-    try:
-        log_files = [f for f in LOGS_DIR.glob("*.txt")]
-        if not log_files:
-            logger.warning("Nenhum arquivo de log encontrado")
-            return pd.DataFrame()
-
-        for filepath in log_files:
-            filename = filepath.name
-            match = filename_pattern.match(filename)
-            if not match:
-                logger.warning(f"Nome de arquivo não corresponde ao padrão esperado: {filename}")
-                continue
-
-            ano, mes, dia, hora, minuto, segundo = match.groups()
-            timestamp = datetime(int(ano), int(mes), int(dia), int(hora), int(minuto), int(segundo))
-
-            try:
-                with open(filepath, "r", encoding="utf-8") as f:
-                    for linha in f:
-                        linha = linha.strip()
-                        if not linha:
-                            continue
-
-                        line_match = line_pattern.match(linha)
-                        if line_match:
-                            icon = line_match.group("icon")
-                            materia = line_match.group("materia").strip()
-                            detalhes = line_match.group("detalhes").strip() if line_match.group("detalhes") else ""
-                            historico.append({
-                                "DataHora": timestamp,
-                                "Matéria": materia,
-                                "Status": STATUS_MAP.get(icon, "Desconhecido"),
-                                "Detalhes": detalhes
-                            })
-            except IOError as e:
-                logger.error(f"Não foi possível ler o arquivo `{filename}`. Erro: {e}")
-                st.warning(f"Não foi possível ler o arquivo `{filename}`. Erro: {e}")
-
-        if not historico:
-            logger.warning("Nenhum dado de log válido encontrado")
-            return pd.DataFrame()
-
-        df = pd.DataFrame(historico)
-        df['Status'] = pd.Categorical(df['Status'], categories=STATUS_ORDER, ordered=True)
-        return df.sort_values("DataHora", ascending=False)
-    except Exception as e:
-        logger.error(f"Erro ao carregar logs: {e}")
-        st.error(f"Ocorreu um erro ao carregar os logs: {e}")
-        return pd.DataFrame()
+def contagem_por_status(df_rollup):
+    """Total de linhas por status a partir de um agregado (todos os status, mesmo zerados)."""
+    return df_rollup.groupby('Status', observed=False)['Quantidade'].sum().reindex(STATUS_ORDER, fill_value=0)
 
-def converter_df_para_csv(df):
-    return df.to_csv(index=False).encode('utf-8')
+@st.fragment(run_every=1)
+def acompanhar_novas_execucoes():
+    """Redesenha o painel quando o observador ingeriu uma execução nova."""
+    if obter_observador(st.session_state.get('conta', CONTA_PRINCIPAL)).versao != st.session_state.get('versao_dados'):
+        st.rerun()
 
 # ===============================
 # 🎨 COMPONENTES DE UI
 # ===============================
 
-def render_kpi_cards(df):
-    if df.empty:
+def render_kpi_cards(df_rollup):
+    if df_rollup.empty:
         st.warning("Nenhum dado disponível para exibir os KPIs")
         return
     
-    total_materias_unicas = df['Matéria'].nunique()
-    contagem_status = df['Status'].value_counts().reindex(STATUS_ORDER, fill_value=0)
+    total_materias_unicas = df_rollup['Matéria'].nunique()
+    contagem_status = contagem_por_status(df_rollup)
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("📚 Matérias Monitoradas", total_materias_unicas)
     col2.metric("✅ Em Dia", contagem_status.get("Em dia", 0))
     col3.metric("❌ Pendentes", contagem_status.get("Pendente", 0))
     col4.metric("🔍 Sem Trabalho", contagem_status.get("Sem trabalho", 0))
 
-def render_filters(df):
-    """Renderiza os filtros na barra lateral."""
+def render_filters(df_diario):
+    """Renderiza os filtros na barra lateral (limites tirados do agregado diário)."""
     st.sidebar.header("🔍 Filtros e Controles")
     
-    if df.empty:
+    if df_diario.empty:
         st.sidebar.warning("Nenhum dado disponível para filtrar")
         return None, None, None, None
     
-    min_date = df['DataHora'].min().to_pydatetime()
-    max_date = df['DataHora'].max().to_pydatetime()
+    min_date = df_diario['Periodo'].min().to_pydatetime()
+    max_date = df_diario['Periodo'].max().to_pydatetime()
 
     # Evita erro caso só exista uma data no dataset
     default_start = max(min_date, max_date - timedelta(days=30))
@@ -145,7 +155,7 @@ def render_filters(df):
         max_value=max_date.date()
     )
 
-    materias_disponiveis = sorted(df['Matéria'].unique())
+    materias_disponiveis = sorted(df_diario['Matéria'].unique())
     materias_selecionadas = st.sidebar.multiselect(
         "Filtrar por Matérias", materias_disponiveis, default=materias_disponiveis
     )
@@ -164,78 +174,76 @@ st.set_page_config(page_title="Moodle Bot Dashboard", layout="wide", initial_sid
 # Inicialização do estado da sessão
 if 'filters_applied' not in st.session_state:
     st.session_state.filters_applied = False
-if 'last_data_refresh' not in st.session_state:
-    st.session_state.last_data_refresh = datetime.now()
 
-# Verificar se é necessário recarregar os dados (cache de 5 minutos)
-if (datetime.now() - st.session_state.last_data_refresh).seconds > 300:
-    st.cache_data.clear()
-    st.session_state.last_data_refresh = datetime.now()
+contas_disponiveis = listar_contas()
+if len(contas_disponiveis) > 1:
+    st.sidebar.selectbox("👤 Conta", contas_disponiveis, key='conta')
 
 with st.spinner("Carregando dados históricos..."):
-    df_historico = carregar_historico_logs()
+    ingestor = carregar_historico_logs(st.session_state.get('conta', CONTA_PRINCIPAL))
+    df_historico = ingestor.historico()
+    df_diario = ingestor.rollup("diario")
+    df_horario = ingestor.rollup("horario")
+
+acompanhar_novas_execucoes()
 
 if df_historico.empty:
     st.warning("Nenhum dado de log encontrado. Execute o bot para gerar relatórios.")
     st.stop()
 
-start_date, end_date, materias_selecionadas, status_selecionados = render_filters(df_historico)
+start_date, end_date, materias_selecionadas, status_selecionados = render_filters(df_diario)
 
 if st.sidebar.button("🔄 Aplicar Filtros"):
     st.session_state.filters_applied = True
     st.rerun()
 
-# Se os filtros ainda não foram aplicados, usar todos os dados
+# Gráficos e KPIs leem só os agregados; as linhas brutas ficam para a tabela detalhada
 if not st.session_state.filters_applied:
-    df_filtrado = df_historico.copy()
-    start_date = df_historico['DataHora'].min().date()
-    end_date = df_historico['DataHora'].max().date()
+    start_date = df_diario['Periodo'].min().date()
+    end_date = df_diario['Periodo'].max().date()
+    filtros = dict(inicio=None, fim=None, materias=None, status=None)
 else:
-    start_datetime = datetime.combine(start_date, datetime.min.time())
-    end_datetime = datetime.combine(end_date, datetime.max.time())
-    df_filtrado = df_historico[
-        (df_historico['DataHora'] >= start_datetime) &
-        (df_historico['DataHora'] <= end_datetime) &
-        (df_historico['Matéria'].isin(materias_selecionadas)) &
-        (df_historico['Status'].isin(status_selecionados))
-    ].copy()
+    filtros = dict(inicio=start_date, fim=end_date, materias=materias_selecionadas, status=status_selecionados)
+df_resumo = filtrar_rollup(df_diario, **filtros)
 
 st.title("🤖 Moodle Bot — Painel de Análise Inteligente")
 st.markdown(f"Analisando dados de **{start_date}** a **{end_date}** com base nos filtros aplicados.")
 
-render_kpi_cards(df_filtrado)
+render_kpi_cards(df_resumo)
 st.divider()
 
-tab_timeline, tab_resumo, tab_detalhes = st.tabs(["📈 Linha do Tempo", "📊 Resumo Geral", "📋 Tabela Detalhada"])
+tab_timeline, tab_resumo, tab_detalhes, tab_latencia = st.tabs(
+    ["📈 Linha do Tempo", "📊 Resumo Geral", "📋 Tabela Detalhada", "⏱️ Latência"]
+)
 
 with tab_timeline:
     st.subheader("Evolução do Status das Matérias ao Longo do Tempo")
-    if not df_filtrado.empty:
-        df_timeline = df_filtrado.copy()
-        df_timeline['Data'] = df_timeline['DataHora'].dt.date
-        df_contagem_diaria = df_timeline.groupby(['Data', 'Status']).size().reset_index(name='Quantidade')
-        fig_timeline = px.area(df_contagem_diaria, x="Data", y="Quantidade", color="Status", color_discrete_map=STATUS_COLORS)
+    if not df_resumo.empty:
+        # Períodos curtos ficam mais legíveis hora a hora
+        if end_date - start_date <= timedelta(days=PERIODO_MAX_POR_HORA_DIAS):
+            df_linha = filtrar_rollup(df_horario, **filtros)
+        else:
+            df_linha = df_resumo
+        df_contagem = (
+            df_linha.groupby(['Periodo', 'Status'], observed=True)['Quantidade']
+            .sum()
+            .reset_index()
+            .rename(columns={'Periodo': 'Data'})
+        )
+        fig_timeline = px.area(df_contagem, x="Data", y="Quantidade", color="Status", color_discrete_map=STATUS_COLORS)
         st.plotly_chart(fig_timeline, use_container_width=True)
     else:
         st.info("Nenhum dado para exibir com os filtros atuais.")
 
 with tab_resumo:
     st.subheader("Análise Comparativa de Status")
-    if not df_filtrado.empty:
+    if not df_resumo.empty:
+        df_bar = contagem_por_status(df_resumo).rename('Quantidade').reset_index()
         col1, col2 = st.columns(2)
         with col1:
-            fig_pie = px.pie(df_filtrado, names='Status', color='Status', color_discrete_map=STATUS_COLORS, title="Distribuição de Status")
+            fig_pie = px.pie(df_bar, names='Status', values='Quantidade', color='Status', color_discrete_map=STATUS_COLORS, title="Distribuição de Status")
             st.plotly_chart(fig_pie, use_container_width=True)
         with col2:
-            # Correção do gráfico de barras
-            df_bar = (
-                df_filtrado['Status']
-                .value_counts()
-                .reindex(STATUS_ORDER, fill_value=0)
-                .reset_index()
-                .rename(columns={'index': 'Status', 'count': 'Quantidade'})
-            )
-
             fig_bar = px.bar(
                 df_bar,
                 x='Status',
@@ -252,31 +260,85 @@ with tab_resumo:
 
 with tab_detalhes:
     st.subheader("Log de Eventos Filtrado")
-    search_term = st.text_input("🔎 Buscar por uma matéria específica...")
-    if not df_filtrado.empty:
-        df_exibicao = df_filtrado.copy()
-        if search_term:
-            df_exibicao = df_exibicao[df_exibicao['Matéria'].str.contains(search_term, case=False, na=False)]
-        
-        # Formatação segura da data
-        df_exibicao['DataHora'] = df_exibicao['DataHora'].dt.strftime('%d/%m/%Y %H:%M:%S')
-        
-        # Estilização mais eficiente usando style.apply em vez de applymap
+    col_busca, col_ordem, col_tamanho = st.columns([3, 1, 1])
+    search_term = col_busca.text_input("🔎 Buscar por uma matéria específica...")
+    ordenacao = col_ordem.selectbox("Ordenar por", tabela.ORDENACOES)
+    tamanho_pagina = col_tamanho.selectbox("Linhas por página", tabela.TAMANHOS_PAGINA)
+
+    # Só posições: nenhuma cópia do histórico até a página visível
+    posicoes = tabela.filtrar_posicoes(df_historico, busca=search_term.strip(), **filtros)
+    posicoes = tabela.ordenar_posicoes(df_historico, posicoes, ordenacao)
+
+    # Um CSV preparado só vale para os filtros com que foi gerado: mudou algo, o arquivo é descartado
+    chave_csv = tabela.chave_exportacao(filtros, search_term.strip(), ordenacao, len(df_historico))
+    csv_exportado = st.session_state.get('csv_exportado')
+    if csv_exportado and csv_exportado[0] != chave_csv:
+        csv_exportado[2].close()
+        del st.session_state['csv_exportado']
+
+    if len(posicoes):
+        paginas = tabela.total_paginas(len(posicoes), tamanho_pagina)
+        numero_pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, value=1, step=1)
+        df_exibicao = tabela.pagina(df_historico, posicoes, numero_pagina, tamanho_pagina)
+
         def highlight_status(row):
             color = STATUS_COLORS.get(row['Status'], 'black')
             return [f'color: {color}; font-weight: bold;' if col == 'Status' else '' for col in row.index]
-        
+
         styled_df = df_exibicao.style.apply(highlight_status, axis=1)
         st.dataframe(styled_df, use_container_width=True, hide_index=True)
-        
-        csv = converter_df_para_csv(df_exibicao)
-        st.download_button(
-            label="📥 Baixar dados filtrados (CSV)",
-            data=csv,
-            file_name=f"moodle_bot_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-            mime="text/csv"
-        )
+        st.caption(f"{len(posicoes):,} linha(s) no total".replace(",", "."))
+
+        # O CSV só é gerado quando pedido, em blocos, num temporário anônimo (só o último fica na sessão)
+        if st.button("📄 Preparar CSV dos dados filtrados"):
+            anterior = st.session_state.get('csv_exportado')
+            if anterior:
+                anterior[2].close()
+            st.session_state.csv_exportado = (
+                chave_csv,
+                f"moodle_bot_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+                tabela.csv_em_arquivo(df_historico, posicoes),
+            )
+        csv_exportado = st.session_state.get('csv_exportado')
+        if csv_exportado:
+            _, nome_csv, arquivo_csv = csv_exportado
+            arquivo_csv.seek(0)
+            st.download_button(
+                label="📥 Baixar dados filtrados (CSV)",
+                data=arquivo_csv,
+                file_name=nome_csv,
+                mime="text/csv"
+            )
     else:
         st.info("Nenhum dado para exibir com os filtros atuais.")
 
+with tab_latencia:
+    st.subheader("Tempo de Varredura por Etapa")
+    df_spans = carregar_spans(st.session_state.get('conta', CONTA_PRINCIPAL), start_date, end_date)
+    if not df_spans.empty:
+        frequencia = "h" if end_date - start_date <= timedelta(days=PERIODO_MAX_POR_HORA_DIAS) else "D"
+        col1, col2 = st.columns(2)
+        with col1:
+            fig_tendencia = px.line(
+                latencia.tendencia(df_spans, frequencia), x="Periodo", y="ms", color="Percentil",
+                markers=True, title="Tempo por matéria (p50 / p95)"
+            )
+            st.plotly_chart(fig_tendencia, use_container_width=True)
+        with col2:
+            fig_origem = px.bar(
+                latencia.por_origem(df_spans, frequencia), x="Periodo", y="Segundos", color="Origem",
+                color_discrete_map=ORIGEM_COLORS, category_orders={"Origem": latencia.ORIGENS},
+                title="Onde o tempo foi gasto (Moodle, Chrome ou o próprio bot)"
+            )
+            st.plotly_chart(fig_origem, use_container_width=True)
+        col3, col4 = st.columns(2)
+        with col3:
+            st.markdown("**Etapas**")
+            st.dataframe(latencia.por_etapa(df_spans), use_container_width=True, hide_index=True)
+        with col4:
+            st.markdown("**Matérias mais lentas**")
+            st.dataframe(latencia.materias_mais_lentas(df_spans), use_container_width=True, hide_index=True)
+    else:
+        st.info("Nenhum span no período. As execuções do bot gravam os tempos em dados/metricas/.")
+
 st.caption(f"📅 Painel atualizado em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
\ No newline at end of file
@@ -0,0 +1,352 @@
+# dashboard/ingestao.py
+"""
+Ingestão incremental do histórico para o dashboard.
+
+Mantém o histórico em memória e num snapshot Feather em cache/. A cada
+atualização só os relatórios .txt de nome novo são examinados (o armazém
+lembra mtime e tamanho de cada arquivo; sem mudança no mtime da pasta,
+nem a listagem é feita) e só as linhas do banco com id
+acima da última vista são buscadas. Elas viram mais uma parte do
+histórico em memória e mais um arquivo do snapshot; a concatenação com o
+resto só acontece quando o histórico é lido, e a consolidação do snapshot,
+a cada MAX_PARTES_SNAPSHOT atualizações. O custo de uma atualização depende
+do número de execuções novas, não do histórico todo.
+Relatórios antigos compactados em logs/arquivo/ (core/compactacao.py)
+entram pelo mesmo importador, junto com os .txt recentes.
+"""
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+import armazem
+
+logger = logging.getLogger(__name__)
+
+STATUS_ORDER = ["Pendente", "Em dia", "Sem trabalho"]
+COLUNAS_CONTAGEM = ["Pendentes", "Entregues", "Atividades"]
+
+# Agregados mantidos junto do histórico: nome -> frequência do pandas
+FREQUENCIAS_ROLLUP = {"diario": "D", "horario": "h"}
+
+# Histórico direto do armazém, já com o nome das colunas usado na interface
+SQL_HISTORICO = """
+    SELECT id,
+           datahora   AS DataHora,
+           materia    AS "Matéria",
+           status     AS Status,
+           detalhes   AS Detalhes,
+           pendentes  AS Pendentes,
+           entregues  AS Entregues,
+           atividades AS Atividades
+      FROM resultados
+     WHERE id > ?
+     ORDER BY id
+"""
+
+# Partes do snapshot (uma por atualização) antes de consolidar tudo numa base nova
+MAX_PARTES_SNAPSHOT = 16
+# Linhas na cauda dos agregados antes de os períodos fechados irem para o corpo
+LIMITE_CAUDA_ROLLUP = 5000
+# Intervalo entre as varreduras completas da pasta de relatórios (ver armazem.importar_logs)
+VARREDURA_COMPLETA_S = 600
+
+
+def tipar_historico(df):
+    """Matéria e Status como categorias: poucas dezenas de valores em milhões de linhas."""
+    df['Matéria'] = df['Matéria'].astype('category')
+    df['Status'] = pd.Categorical(df['Status'], categories=STATUS_ORDER, ordered=True)
+    # Relatórios importados de .txt não têm contagens
+    for coluna in COLUNAS_CONTAGEM:
+        if coluna in df:
+            df[coluna] = df[coluna].astype('Int64')
+    return df
+
+def concatenar_historicos(*partes):
+    """pd.concat que preserva Matéria como categoria (une as categorias antes)."""
+    partes = [p for p in partes if p is not None and not p.empty]
+    categorias = union_categoricals([p['Matéria'] for p in partes]).categories
+    for p in partes:
+        p['Matéria'] = p['Matéria'].cat.set_categories(categorias)
+    return pd.concat(partes, ignore_index=True)
+
+def agregar(df, frequencia):
+    """Nº de linhas por período × matéria × status (só as combinações presentes)."""
+    periodo = df['DataHora'].dt.floor(frequencia).rename('Periodo')
+    return (
+        df.groupby([periodo, 'Matéria', 'Status'], observed=True, sort=True)
+        .size()
+        .reset_index(name='Quantidade')
+    )
+
+def somar_rollup(rollup, parcial):
+    """
+    Soma um agregado parcial (linhas novas) ao existente. Só os períodos a
+    partir do mais antigo do parcial são reagrupados; no caso comum (execução
+    nova) isso é o último dia/hora, e o resto do agregado é só reaproveitado.
+    """
+    if rollup is None or rollup.empty:
+        return parcial
+    if parcial.empty:
+        return rollup
+    corte = parcial['Periodo'].min()
+    antigos = rollup['Periodo'] < corte
+    cauda = concatenar_historicos(rollup[~antigos].copy(), parcial.copy())
+    cauda = (
+        cauda.groupby(['Periodo', 'Matéria', 'Status'], observed=True, sort=True)['Quantidade']
+        .sum()
+        .reset_index()
+    )
+    return concatenar_historicos(rollup[antigos].copy(), cauda)
+
+def filtrar_rollup(rollup, inicio=None, fim=None, materias=None, status=None):
+    """Recorte de um agregado (diário ou horário) pelos filtros do painel; `fim` inclui o dia todo."""
+    mascara = pd.Series(True, index=rollup.index)
+    if inicio is not None:
+        mascara &= rollup['Periodo'] >= pd.Timestamp(inicio)
+    if fim is not None:
+        mascara &= rollup['Periodo'] < pd.Timestamp(fim).normalize() + pd.Timedelta(days=1)
+    if materias is not None:
+        mascara &= rollup['Matéria'].isin(materias)
+    if status is not None:
+        mascara &= rollup['Status'].isin(status)
+    return rollup[mascara]
+
+def historico_de_relatorios(caminhos):
+    """
+    Caminho em lote: lê os relatórios .txt direto para um DataFrame (uma regex
+    multilinha por arquivo, colunas montadas de uma vez, categorias desde o
+    início), sem passar pelo banco. Usado em reconstruções e benchmarks.
+    """
+    colunas = armazem.ler_relatorios_em_lote(caminhos)
+    df = pd.DataFrame({
+        "DataHora": pd.to_datetime(colunas["datahora"]),
+        "Matéria": pd.Categorical(colunas["materia"]),
+        "Status": pd.Categorical(colunas["status"], categories=STATUS_ORDER, ordered=True),
+        "Detalhes": colunas["detalhes"],
+    })
+    return df.sort_values("DataHora", ascending=False, kind="stable", ignore_index=True)
+
+
+class IngestorHistorico:
+    """Histórico consolidado que cresce só com as linhas novas."""
+
+    def __init__(self, banco, pasta_logs, pasta_cache):
+        self.banco = Path(banco)
+        self.pasta_logs = Path(pasta_logs)
+        self.pasta_cache = Path(pasta_cache)
+        self.meta = self.pasta_cache / "historico.json"
+        # Partes do histórico em memória, da mais nova para a mais antiga; só
+        # viram um DataFrame único quando alguém pede o histórico
+        self.partes = []
+        self.df = None
+        self.ordenado = True
+        self.mais_recente = None
+        self.carregado = False
+        # Snapshot em disco: uma base + uma parte por atualização (ver _gravar_parte)
+        self.base_snapshot = None
+        self.partes_snapshot = []
+        # Agregados em duas partes: corpo (períodos fechados) e cauda (a partir
+        # do último período), onde as linhas novas costumam cair
+        self.rollups_partes = {}
+        self.rollups = {}
+        self.ultimo_id = 0
+        # O que o importador já viu de logs/; esquecido a cada VARREDURA_COMPLETA_S
+        self.memoria = armazem.MemoriaImportacao()
+        self.ultima_varredura = 0.0
+        self._trava = threading.RLock()
+
+    # -------- snapshot --------
+
+    def _carregar_snapshot(self):
+        try:
+            meta = json.loads(self.meta.read_text(encoding="utf-8"))
+            base = meta.get("base", "historico.feather")
+            partes = [pd.read_feather(self.pasta_cache / nome) for nome in [base] + meta.get("partes", [])]
+        except (OSError, ValueError) as e:
+            if self.meta.exists():
+                logger.warning(f"Snapshot do histórico ilegível ({e}); reconstruindo.")
+            return
+        self.partes = [self._tipar(p) for p in reversed(partes) if not p.empty]
+        self.df = None
+        # Partes gravadas fora de ordem (relatório antigo importado depois) são conferidas na leitura
+        self.ordenado = len(self.partes) <= 1
+        self.mais_recente = max((p["DataHora"].max() for p in self.partes), default=None)
+        self.base_snapshot, self.partes_snapshot = base, list(meta.get("partes", []))
+        self.ultimo_id = meta.get("ultimo_id", 0)
+        self._recalcular_rollups()
+
+    def _gravar_meta(self):
+        temporario = self.meta.with_suffix(".tmp")
+        temporario.write_text(json.dumps({
+            "ultimo_id": self.ultimo_id, "base": self.base_snapshot, "partes": self.partes_snapshot,
+        }), encoding="utf-8")
+        temporario.replace(self.meta)
+
+    def _gravar_feather(self, df, nome):
+        temporario = self.pasta_cache / f"{nome}.tmp"
+        df.reset_index(drop=True).to_feather(temporario)
+        temporario.replace(self.pasta_cache / nome)
+
+    def _salvar_snapshot(self):
+        """Consolida tudo numa base nova e descarta as partes (custo proporcional ao histórico)."""
+        self.pasta_cache.mkdir(parents=True, exist_ok=True)
+        base = f"historico_{time.time_ns()}.feather"
+        self._gravar_feather(self.historico(), base)
+        self.base_snapshot, self.partes_snapshot = base, []
+        # O meta troca de uma vez: até aqui, quem lê ainda vê a base e as partes antigas
+        self._gravar_meta()
+        for arquivo in self.pasta_cache.glob("historico*.feather"):
+            if arquivo.name != base:
+                arquivo.unlink(missing_ok=True)
+
+    def _gravar_parte(self, novos):
+        """
+        Grava só as linhas novas como mais uma parte do snapshot. A cada
+        MAX_PARTES_SNAPSHOT partes o snapshot é consolidado numa base só.
+        """
+        if self.base_snapshot is None or len(self.partes_snapshot) >= MAX_PARTES_SNAPSHOT:
+            self._salvar_snapshot()
+            return
+        nome = f"historico_parte_{self.ultimo_id}.feather"
+        self._gravar_feather(novos, nome)
+        self.partes_snapshot.append(nome)
+        self._gravar_meta()
+
+    def _descartar(self):
+        self.partes = []
+        self.df = None
+        self.ordenado = True
+        self.mais_recente = None
+        self.rollups_partes = {}
+        self.rollups = {}
+        self.ultimo_id = 0
+        self.base_snapshot = None
+
+    # -------- agregados --------
+
+    @staticmethod
+    def _dividir_rollup(rollup):
+        """(corpo, cauda): a cauda são as linhas do último período."""
+        if rollup.empty:
+            return rollup, rollup
+        corte = rollup['Periodo'].searchsorted(rollup['Periodo'].iloc[-1])
+        return rollup.iloc[:corte], rollup.iloc[corte:]
+
+    def _recalcular_rollups(self):
+        df = self.historico()
+        self.rollups = {}
+        self.rollups_partes = {
+            nome: self._dividir_rollup(agregar(df, freq)) for nome, freq in FREQUENCIAS_ROLLUP.items()
+        }
+
+    def _acrescentar_rollups(self, novos):
+        """
+        Soma as linhas novas aos agregados. No caso comum elas caem a partir
+        do último período e só a cauda é refeita; quando ela passa de
+        LIMITE_CAUDA_ROLLUP linhas, os períodos fechados vão para o corpo.
+        """
+        for nome, freq in FREQUENCIAS_ROLLUP.items():
+            parcial = agregar(novos, freq)
+            corpo, cauda = self.rollups_partes.get(nome, (None, None))
+            if cauda is not None and not cauda.empty and parcial['Periodo'].min() >= cauda['Periodo'].iloc[0]:
+                cauda = somar_rollup(cauda, parcial)
+                if len(cauda) > LIMITE_CAUDA_ROLLUP:
+                    fechados, cauda = self._dividir_rollup(cauda)
+                    corpo = concatenar_historicos(corpo.copy(), fechados.copy())
+                self.rollups_partes[nome] = (corpo, cauda)
+            else:
+                # Relatório antigo importado agora: refaz a partir do agregado inteiro
+                self.rollups_partes[nome] = self._dividir_rollup(somar_rollup(self.rollup(nome), parcial))
+        self.rollups = {}
+
+    # -------- ingestão --------
+
+    @staticmethod
+    def _tipar(df):
+        return tipar_historico(df)
+
+    def atualizar(self):
+        """Importa o que for novo e anexa ao histórico. Retorna o nº de linhas novas."""
+        with self._trava:
+            if time.monotonic() - self.ultima_varredura > VARREDURA_COMPLETA_S:
+                # De tempos em tempos o importador revisita todos os .txt (edições no lugar)
+                self.memoria.limpar()
+                self.ultima_varredura = time.monotonic()
+            con = armazem.conectar(str(self.banco))
+            try:
+                arquivos, linhas, substituidos = armazem.importar_logs(con, self.pasta_logs, self.memoria)
+                if arquivos:
+                    logger.info(f"{arquivos} relatório(s) .txt importado(s) para o armazém ({linhas} linhas)")
+
+                if not self.carregado:
+                    self.carregado = True
+                    self._carregar_snapshot()
+
+                # Relatório reimportado (linhas apagadas) ou banco recriado: recomeça do zero
+                maior_id = con.execute("SELECT COALESCE(MAX(id), 0) FROM resultados").fetchone()[0]
+                if substituidos or maior_id < self.ultimo_id:
+                    self._descartar()
+
+                novos = pd.read_sql_query(SQL_HISTORICO, con, params=(self.ultimo_id,), parse_dates=["DataHora"])
+            finally:
+                con.close()
+
+            if novos.empty:
+                if not self.partes:
+                    self.partes = [self._tipar(novos.drop(columns="id"))]
+                    self._recalcular_rollups()
+                return 0
+
+            self.ultimo_id = int(novos["id"].max())
+            # A consulta vem na ordem do id (só o intervalo novo é lido); a ordem da
+            # interface (mais recente primeiro) é aplicada aqui, só nas linhas novas
+            novos = novos.sort_values(["DataHora", "id"], ascending=False, kind="stable", ignore_index=True)
+            novos = self._tipar(novos.drop(columns="id"))
+            mais_recente = novos["DataHora"].max()
+            if not any(not p.empty for p in self.partes):
+                self.partes, self.df, self.ordenado = [novos], None, True
+                self.mais_recente = mais_recente
+                self._recalcular_rollups()
+                self._salvar_snapshot()
+            else:
+                self._acrescentar_rollups(novos)
+                # Em geral as linhas novas são as mais recentes e entram no topo; só um
+                # relatório antigo importado agora exige reordenar (na próxima leitura)
+                if novos["DataHora"].min() < self.mais_recente:
+                    self.ordenado = False
+                self.mais_recente = max(self.mais_recente, mais_recente)
+                self.partes.insert(0, novos)
+                self.df = None
+                self._gravar_parte(novos)
+            return len(novos)
+
+    def historico(self):
+        """Histórico inteiro, mais recente primeiro. As partes só são concatenadas aqui, e uma vez por mudança."""
+        with self._trava:
+            if self.df is None:
+                partes = [p for p in self.partes if not p.empty] or self.partes
+                if not partes:
+                    return pd.DataFrame()
+                df = partes[0] if len(partes) == 1 else concatenar_historicos(*partes)
+                if not self.ordenado and not df["DataHora"].is_monotonic_decreasing:
+                    df = df.sort_values("DataHora", ascending=False, kind="stable", ignore_index=True)
+                self.partes, self.df, self.ordenado = [df], df, True
+            return self.df
+
+    def rollup(self, nome):
+        """Agregado 'diario' ou 'horario' (Periodo, Matéria, Status, Quantidade)."""
+        with self._trava:
+            if nome not in self.rollups:
+                if nome not in self.rollups_partes:
+                    return pd.DataFrame(columns=["Periodo", "Matéria", "Status", "Quantidade"])
+                corpo, cauda = self.rollups_partes[nome]
+                if corpo.empty or cauda.empty:
+                    self.rollups[nome] = cauda if corpo.empty else corpo
+                else:
+                    self.rollups[nome] = concatenar_historicos(corpo.copy(), cauda.copy())
+            return self.rollups[nome]
@@ -0,0 +1,109 @@
+# dashboard/latencia.py
+"""
+Leitura dos spans gravados pelo bot (dados/metricas/spans_AAAAMMDD.jsonl,
+ver core/instrumentacao.py) para a aba de latência do dashboard.
+
+Os spans de etapa dizem onde o tempo foi gasto: `moodle` (login, download,
+carregamento da página, API), `chrome` (rolagem, screenshot) ou `bot`
+(parse, classificação, relatório). O span `materia` é o total de cada
+matéria e o `execucao`, o de cada execução/ciclo inteiro.
+"""
+import re
+from pathlib import Path
+
+import pandas as pd
+
+RE_ARQUIVO_SPANS = re.compile(r"^spans_(\d{8})\.jsonl$")
+# Spans que somam outros: ficam fora da divisão por origem
+ETAPAS_TOTAIS = ("materia", "execucao")
+ORIGENS = ["moodle", "chrome", "bot"]
+COLUNAS = ["ts", "execucao", "motor", "conta", "materia", "etapa", "origem", "duracao_ms", "erro"]
+
+
+def arquivos_spans(pasta, inicio=None, fim=None):
+    """Arquivos diários de spans dentro do período (datas inclusivas), em ordem."""
+    pasta = Path(pasta)
+    if not pasta.exists():
+        return []
+    arquivos = []
+    for caminho in sorted(pasta.iterdir()):
+        achado = RE_ARQUIVO_SPANS.match(caminho.name)
+        if not achado:
+            continue
+        dia = pd.to_datetime(achado.group(1), format="%Y%m%d").date()
+        if (inicio is None or dia >= inicio) and (fim is None or dia <= fim):
+            arquivos.append(caminho)
+    return arquivos
+
+def carregar_spans(pasta, inicio=None, fim=None, conta=None):
+    """
+    DataFrame com um span por linha. `conta` None = conta principal (spans
+    sem conta); um nome filtra os spans do modo multicontas.
+    """
+    partes = [pd.read_json(caminho, lines=True, dtype=False) for caminho in arquivos_spans(pasta, inicio, fim)]
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=COLUNAS)
+    df = pd.concat(partes, ignore_index=True).reindex(columns=COLUNAS)
+    df["ts"] = pd.to_datetime(df["ts"])
+    df["duracao_ms"] = pd.to_numeric(df["duracao_ms"], errors="coerce")
+    if conta is None:
+        df = df[df["conta"].isna()]
+    else:
+        df = df[df["conta"].eq(conta)]
+    return df.reset_index(drop=True)
+
+def tendencia(df, frequencia="D"):
+    """p50/p95 (ms) do tempo por matéria em cada período: colunas Periodo, Percentil, ms."""
+    materias = df[df["etapa"].eq("materia")]
+    if materias.empty:
+        return pd.DataFrame(columns=["Periodo", "Percentil", "ms"])
+    grupos = materias.groupby(materias["ts"].dt.floor(frequencia))["duracao_ms"]
+    saida = pd.DataFrame({"p50": grupos.quantile(0.5), "p95": grupos.quantile(0.95)})
+    saida.index.name = "Periodo"
+    return saida.reset_index().melt(id_vars="Periodo", var_name="Percentil", value_name="ms")
+
+def por_origem(df, frequencia="D"):
+    """Tempo somado (s) por origem e período: onde cada período gastou a varredura."""
+    etapas = df[~df["etapa"].isin(ETAPAS_TOTAIS)]
+    if etapas.empty:
+        return pd.DataFrame(columns=["Periodo", "Origem", "Segundos"])
+    saida = (
+        etapas.groupby([etapas["ts"].dt.floor(frequencia), "origem"])["duracao_ms"]
+        .sum().div(1000).round(2)
+        .reset_index()
+    )
+    saida.columns = ["Periodo", "Origem", "Segundos"]
+    return saida
+
+def por_etapa(df):
+    """Resumo por etapa: quantidade, p50/p95 (ms), total (s) e erros, da mais cara para a mais barata."""
+    etapas = df[~df["etapa"].isin(ETAPAS_TOTAIS)]
+    if etapas.empty:
+        return pd.DataFrame(columns=["Etapa", "Origem", "Spans", "p50 (ms)", "p95 (ms)", "Total (s)", "Erros"])
+    saida = etapas.groupby(["etapa", "origem"]).agg(
+        Spans=("duracao_ms", "size"),
+        p50=("duracao_ms", lambda s: s.quantile(0.5)),
+        p95=("duracao_ms", lambda s: s.quantile(0.95)),
+        total=("duracao_ms", "sum"),
+        Erros=("erro", "count"),
+    ).reset_index()
+    saida["total"] = saida["total"].div(1000)
+    saida = saida.rename(columns={"etapa": "Etapa", "origem": "Origem", "p50": "p50 (ms)",
+                                  "p95": "p95 (ms)", "total": "Total (s)"})
+    return saida.sort_values("Total (s)", ascending=False).round(2).reset_index(drop=True)
+
+def materias_mais_lentas(df, n=10):
+    """As `n` matérias com maior p95 do tempo total."""
+    materias = df[df["etapa"].eq("materia")]
+    if materias.empty:
+        return pd.DataFrame(columns=["Matéria", "Verificações", "p50 (ms)", "p95 (ms)", "Erros"])
+    saida = materias.groupby("materia").agg(
+        Verificacoes=("duracao_ms", "size"),
+        p50=("duracao_ms", lambda s: s.quantile(0.5)),
+        p95=("duracao_ms", lambda s: s.quantile(0.95)),
+        Erros=("erro", "count"),
+    ).reset_index()
+    saida = saida.rename(columns={"materia": "Matéria", "Verificacoes": "Verificações",
+                                  "p50": "p50 (ms)", "p95": "p95 (ms)"})
+    return saida.nlargest(n, "p95 (ms)").round(1).reset_index(drop=True)
@@ -0,0 +1,124 @@
+# dashboard/observador.py
+"""
+Observa a pasta de relatórios e mantém o histórico compartilhado em dia.
+
+O bot grava o banco antes do relatório .txt, e o .txt num temporário
+renomeado no fim, então um .txt novo em logs/ indica uma execução completa
+e já vem inteiro. Ao ver um, o observador chama
+`IngestorHistorico.atualizar()` (que só lê o que é novo) e incrementa
+`versao`; as sessões do Streamlit comparam esse número para saber que
+precisam redesenhar, sem recarregar nada do disco.
+
+Usa watchdog (inotify/FSEvents/ReadDirectoryChangesW) quando instalado;
+sem ele, cai para uma varredura leve da pasta a cada segundo.
+"""
+import logging
+import os
+import threading
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog é opcional
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+# Agrupa rajadas de eventos (criação + escritas do mesmo arquivo) numa só ingestão
+ESPERA_AGRUPAMENTO_S = 0.2
+INTERVALO_VARREDURA_S = 1.0
+
+
+class _TratadorEventos(FileSystemEventHandler):
+    def __init__(self, avisar):
+        self.avisar = avisar
+
+    def on_any_event(self, event):
+        if not event.is_directory and str(getattr(event, "dest_path", "") or event.src_path).endswith(".txt"):
+            self.avisar()
+
+
+class ObservadorLogs:
+    """Thread em segundo plano que ingere relatórios novos assim que aparecem."""
+
+    def __init__(self, ingestor, pasta_logs):
+        self.ingestor = ingestor
+        self.pasta_logs = str(pasta_logs)
+        self.versao = 0
+        self._sinal = threading.Event()
+        self._parar = threading.Event()
+        self._observer = None
+        self._thread = None
+
+    @property
+    def modo(self):
+        return "watchdog" if self._observer is not None else "varredura"
+
+    def iniciar(self):
+        if self._thread is not None:
+            return self
+        if Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_TratadorEventos(self._sinal.set), self.pasta_logs, recursive=False)
+                self._observer.daemon = True
+                self._observer.start()
+            except OSError as e:
+                logger.warning(f"watchdog indisponível ({e}); usando varredura periódica.")
+                self._observer = None
+        alvo = self._laco_eventos if self._observer is not None else self._laco_varredura
+        self._thread = threading.Thread(target=alvo, name="observador-logs", daemon=True)
+        self._thread.start()
+        logger.info(f"Observando {self.pasta_logs} ({self.modo})")
+        return self
+
+    def parar(self):
+        self._parar.set()
+        self._sinal.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    # -------- laços --------
+
+    def _ingerir(self):
+        try:
+            novas = self.ingestor.atualizar()
+        except Exception as e:
+            logger.error(f"Erro ao ingerir relatórios novos: {e}")
+            return
+        if novas:
+            self.versao += 1
+            logger.info(f"{novas} linha(s) nova(s) no histórico (versão {self.versao})")
+
+    def _laco_eventos(self):
+        while not self._parar.is_set():
+            self._sinal.wait()
+            if self._parar.is_set():
+                break
+            # Junta os eventos de uma rajada (vários relatórios, compactação) numa só ingestão
+            self._parar.wait(ESPERA_AGRUPAMENTO_S)
+            self._sinal.clear()
+            self._ingerir()
+
+    def _assinatura_pasta(self):
+        try:
+            return frozenset(
+                (e.name, info.st_mtime, info.st_size)
+                for e in os.scandir(self.pasta_logs)
+                if e.name.endswith(".txt")
+                for info in (e.stat(),)
+            )
+        except OSError:
+            return frozenset()
+
+    def _laco_varredura(self):
+        anterior = self._assinatura_pasta()
+        while not self._parar.wait(INTERVALO_VARREDURA_S):
+            atual = self._assinatura_pasta()
+            if atual != anterior:
+                anterior = atual
+                self._ingerir()
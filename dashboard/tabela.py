@@ -0,0 +1,107 @@
+# dashboard/tabela.py
+"""
+Tabela detalhada paginada no servidor.
+
+O histórico em memória fica ordenado por DataHora decrescente, então o
+intervalo de datas vira uma busca binária (searchsorted) e os filtros de
+matéria/status/busca comparam só os códigos das categorias. O resultado é
+um vetor de posições; o DataFrame nunca é copiado inteiro, e só a página
+visível é formatada, estilizada e enviada ao navegador.
+"""
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+ORDENACOES = ["Mais recentes", "Mais antigas", "Matéria", "Status"]
+TAMANHOS_PAGINA = [50, 100, 250, 500]
+LINHAS_POR_BLOCO_CSV = 50_000
+
+
+def _codigos_escolhidos(coluna, valores):
+    """Códigos das categorias de `coluna` presentes em `valores`."""
+    return np.flatnonzero(coluna.cat.categories.isin(list(valores)))
+
+def filtrar_posicoes(df, inicio=None, fim=None, materias=None, status=None, busca=""):
+    """
+    Posições (iloc) das linhas que passam nos filtros, na ordem do histórico.
+    `inicio`/`fim` são datas inclusivas; `busca` procura no nome da matéria.
+    """
+    if df.empty:
+        return np.empty(0, dtype=np.intp)
+
+    # DataHora decrescente: a faixa de datas é um trecho contíguo
+    crescente = df['DataHora'].to_numpy()[::-1]
+    n = len(crescente)
+    primeiro, ultimo = 0, n
+    if fim is not None:
+        limite = np.datetime64(datetime.combine(fim, datetime.max.time()))
+        primeiro = n - np.searchsorted(crescente, limite, side="right")
+    if inicio is not None:
+        limite = np.datetime64(datetime.combine(inicio, datetime.min.time()))
+        ultimo = n - np.searchsorted(crescente, limite, side="left")
+    if primeiro >= ultimo:
+        return np.empty(0, dtype=np.intp)
+
+    mascara = np.ones(ultimo - primeiro, dtype=bool)
+    materia = df['Matéria']
+    codigos_materia = None
+    if materias is not None:
+        codigos_materia = _codigos_escolhidos(materia, materias)
+    if busca:
+        achadas = np.flatnonzero(materia.cat.categories.str.contains(busca, case=False, regex=False))
+        codigos_materia = achadas if codigos_materia is None else np.intersect1d(codigos_materia, achadas)
+    if codigos_materia is not None:
+        mascara &= np.isin(materia.cat.codes.to_numpy()[primeiro:ultimo], codigos_materia)
+    if status is not None:
+        mascara &= np.isin(df['Status'].cat.codes.to_numpy()[primeiro:ultimo], _codigos_escolhidos(df['Status'], status))
+    return np.flatnonzero(mascara) + primeiro
+
+def ordenar_posicoes(df, posicoes, ordenacao):
+    """Reordena as posições sem tocar no DataFrame (desempate: mais recente primeiro)."""
+    if ordenacao == "Mais antigas":
+        return posicoes[::-1]
+    if ordenacao == "Matéria":
+        # Código da categoria -> posição alfabética do nome
+        ranking = np.argsort(np.argsort(df['Matéria'].cat.categories.to_numpy(dtype=str)))
+        chave = ranking[df['Matéria'].cat.codes.to_numpy()[posicoes]]
+        return posicoes[np.argsort(chave, kind="stable")]
+    if ordenacao == "Status":
+        # Status é categoria ordenada (STATUS_ORDER)
+        chave = df['Status'].cat.codes.to_numpy()[posicoes]
+        return posicoes[np.argsort(chave, kind="stable")]
+    return posicoes
+
+def pagina(df, posicoes, numero, tamanho):
+    """Só as linhas da página `numero` (1-based), já prontas para exibição."""
+    inicio = (numero - 1) * tamanho
+    df_pagina = df.iloc[posicoes[inicio:inicio + tamanho]].copy()
+    df_pagina['DataHora'] = df_pagina['DataHora'].dt.strftime('%d/%m/%Y %H:%M:%S')
+    return df_pagina
+
+def total_paginas(total_linhas, tamanho):
+    return max(1, -(-total_linhas // tamanho))
+
+def csv_em_blocos(df, posicoes, linhas_por_bloco=LINHAS_POR_BLOCO_CSV):
+    """Gera o CSV das posições em pedaços de bytes, sem montar o arquivo inteiro de uma vez."""
+    for inicio in range(0, max(len(posicoes), 1), linhas_por_bloco):
+        bloco = df.iloc[posicoes[inicio:inicio + linhas_por_bloco]]
+        yield bloco.to_csv(index=False, header=(inicio == 0), date_format='%d/%m/%Y %H:%M:%S').encode('utf-8')
+
+def csv_em_arquivo(df, posicoes):
+    """
+    CSV das posições gravado bloco a bloco num arquivo temporário anônimo
+    (some do disco quando é fechado). Retorna o arquivo já no início.
+    """
+    arquivo = tempfile.TemporaryFile()
+    for bloco in csv_em_blocos(df, posicoes):
+        arquivo.write(bloco)
+    arquivo.seek(0)
+    return arquivo
+
+def chave_exportacao(filtros, busca, ordenacao, total_linhas):
+    """O que define o conteúdo do CSV: muda com os filtros, a busca, a ordem ou um histórico novo."""
+    return (
+        tuple((nome, tuple(valor) if isinstance(valor, list) else valor) for nome, valor in sorted(filtros.items())),
+        busca, ordenacao, total_linhas,
+    )